@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+用户礼包发放工具 - 本地模拟后端与压测脚本
+在本机启动 /pack/sendSingle 和 /service/content/ledu/right/giveByKefu 的模拟接口，
+用发放引擎按不同并发模式压测，输出吞吐与延迟
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from user_pack_sender import PackSenderEngine, RetryPolicy, default_campaign
+
+API1_PATH = "/pack/sendSingle"
+API2_PATH = "/service/content/ledu/right/giveByKefu"
+
+
+class MockBackendConfig:
+    """
+    模拟后端行为
+
+    latency_ms / jitter_ms: 基础延迟与随机抖动（毫秒）
+    capacity: 同时处理的请求数超过该值后，每多一个请求延迟增加 overload_ms
+    error_rate: 返回 HTTP 500 的概率
+    business_error_rate: 返回业务失败的概率
+    already_rate: 首次请求即返回"已领取"/"已购买"的概率
+    rate_limit: 每个接口每秒允许的请求数，超过返回 HTTP 429（0 表示不限）
+    """
+
+    def __init__(self, latency_ms: float = 20, jitter_ms: float = 10, capacity: int = 16,
+                 overload_ms: float = 5, error_rate: float = 0.0, business_error_rate: float = 0.0,
+                 already_rate: float = 0.05, rate_limit: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.capacity = capacity
+        self.overload_ms = overload_ms
+        self.error_rate = error_rate
+        self.business_error_rate = business_error_rate
+        self.already_rate = already_rate
+        self.rate_limit = rate_limit
+
+
+class MockBackend:
+    """
+    模拟后端状态：记录已发放用户（重复请求返回已领取），统计在途数与限流窗口
+
+    接口1 按 (礼包ID, 用户ID) 记录，同一用户可以领取不同活动的礼包；接口2 按用户ID记录
+    """
+
+    def __init__(self, config: MockBackendConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.granted: Dict[str, set] = {API1_PATH: set(), API2_PATH: set()}
+        self.in_flight = 0
+        self.windows: Dict[str, Tuple[int, int]] = {}
+
+    def reset(self):
+        with self.lock:
+            self.granted = {API1_PATH: set(), API2_PATH: set()}
+            self.windows = {}
+
+    def _rate_limited(self, path: str) -> bool:
+        """按秒计数的简单限流窗口"""
+        if self.config.rate_limit <= 0:
+            return False
+        second = int(time.monotonic())
+        with self.lock:
+            window_second, count = self.windows.get(path, (second, 0))
+            if window_second != second:
+                window_second, count = second, 0
+            count += 1
+            self.windows[path] = (window_second, count)
+            return count > self.config.rate_limit
+
+    def handle(self, path: str, user_id: str, pack_id=None) -> Tuple[int, Optional[Dict]]:
+        """
+        处理一次请求（pack_id 为接口1请求中的礼包ID）
+
+        Returns:
+            (status_code, body): HTTP 状态码与响应 JSON（非 200 时为 None）
+        """
+        if self._rate_limited(path):
+            return 429, None
+
+        with self.lock:
+            self.in_flight += 1
+            overload = max(0, self.in_flight - self.config.capacity)
+        try:
+            delay_ms = (self.config.latency_ms + random.uniform(0, self.config.jitter_ms)
+                        + overload * self.config.overload_ms)
+            time.sleep(delay_ms / 1000)
+
+            if random.random() < self.config.error_rate:
+                return 500, None
+
+            key = (pack_id, user_id) if path == API1_PATH else user_id
+            with self.lock:
+                already = key in self.granted[path] or random.random() < self.config.already_rate
+                business_error = not already and random.random() < self.config.business_error_rate
+                if not already and not business_error:
+                    self.granted[path].add(key)
+
+            if path == API1_PATH:
+                if business_error:
+                    return 200, {"success": False, "code": 500, "message": "礼包发放失败，请稍后重试", "data": None}
+                if already:
+                    return 200, {"success": False, "code": 1001, "message": "用户已领取该礼包", "data": None}
+                return 200, {"success": True, "code": 0, "message": "成功", "data": None}
+
+            if business_error:
+                return 200, {"code": 1, "message": "权益发放失败", "data": ""}
+            if already:
+                return 200, {"code": 0, "message": None, "data": "已购买: 1"}
+            return 200, {"code": 0, "message": None, "data": "发放成功"}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_handler(backend: MockBackend):
+    """生成绑定到指定模拟后端的请求处理类"""
+
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # 长连接上响应头和正文分两次写出，开启 Nagle 时会与客户端的延迟确认叠加出约 40ms 延迟
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(length).decode('utf-8') if length else ""
+
+            user_id = ""
+            pack_id = None
+            if self.path == API1_PATH:
+                try:
+                    request = json.loads(body)
+                    user_id = str(request["userIds"][0])
+                    pack_id = request.get("packId")
+                except (ValueError, KeyError, IndexError, TypeError):
+                    self._send(400, None)
+                    return
+            elif self.path == API2_PATH:
+                user_id = parse_qs(body).get('userId', [""])[0]
+            else:
+                self._send(404, None)
+                return
+
+            status, payload = backend.handle(self.path, user_id, pack_id)
+            self._send(status, payload)
+
+        def _send(self, status: int, payload: Optional[Dict]):
+            data = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b""
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json;charset=UTF-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            # 压测时不输出访问日志
+            pass
+
+    return MockHandler
+
+
+def start_mock_server(config: MockBackendConfig, port: int = 0) -> Tuple[ThreadingHTTPServer, MockBackend]:
+    """在后台线程启动模拟后端，port 为 0 时自动分配端口"""
+    backend = MockBackend(config)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(backend))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, backend
+
+
+def parse_mode(mode: str) -> Tuple[bool, int]:
+    """解析压测模式：'fixed:8' 为固定 8 并发，'adaptive:32' 为自适应（上限 32）"""
+    kind, _, workers = mode.partition(":")
+    if kind not in ("fixed", "adaptive") or not workers.isdigit():
+        raise ValueError(f"无效的压测模式: {mode}（示例: fixed:8 或 adaptive:32）")
+    return kind == "adaptive", int(workers)
+
+
+def run_mode(base_url: str, backend: MockBackend, mode: str, users: int,
+             rate_limit: float, retries: int) -> Dict:
+    """用发放引擎按指定模式跑一轮，返回吞吐、结果计数与各接口指标"""
+    adaptive, workers = parse_mode(mode)
+    backend.reset()
+
+    engine = PackSenderEngine(
+        base_url + API1_PATH, base_url + API2_PATH,
+        rate_limits={'api1': rate_limit, 'api2': rate_limit}
+    )
+    engine.set_adaptive(adaptive, workers)
+    engine.retry_policy = RetryPolicy(max_retries=retries, base_delay=0.05)
+
+    counts = {'ok': 0, 'failed': 0}
+
+    def emit(result: Dict):
+        if not result.get('deferred'):
+            counts['ok' if result['ok'] else 'failed'] += 1
+
+    user_ids = (str(10000000 + i) for i in range(users))
+    started = time.monotonic()
+    summary = engine.run(user_ids, emit, threading.Event(), [default_campaign()],
+                         workers=workers, continue_on_error=True)
+    elapsed = time.monotonic() - started
+
+    return {
+        'mode': mode,
+        'users': users,
+        'seconds': round(elapsed, 2),
+        'users_per_sec': round(users / elapsed, 1) if elapsed else 0.0,
+        'ok': counts['ok'],
+        'failed': counts['failed'],
+        'deferred': summary['deferred'],
+        'final_limits': engine.concurrency_status(),
+        'metrics': summary['metrics'],
+    }
+
+
+def print_report(reports: List[Dict]):
+    """以表格形式输出压测结果"""
+    print()
+    print(f"{'模式':<14}{'用户/秒':>10}{'耗时(秒)':>10}{'成功':>8}{'失败':>6}"
+          f"{'接口1 p50/p99(ms)':>20}{'接口2 p50/p99(ms)':>20}")
+    print("-" * 88)
+    for report in reports:
+        api1 = report['metrics']['api1']
+        api2 = report['metrics']['api2']
+        print(
+            f"{report['mode']:<14}{report['users_per_sec']:>10.1f}{report['seconds']:>10.2f}"
+            f"{report['ok']:>8}{report['failed']:>6}"
+            f"{api1['p50_ms']:>11.0f}/{api1['p99_ms']:<8.0f}{api2['p50_ms']:>11.0f}/{api2['p99_ms']:<8.0f}"
+        )
+        if report['final_limits']:
+            print(f"{'':<14}结束时 {report['final_limits']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户礼包发放工具 - 模拟后端与压测")
+    parser.add_argument("--serve", action="store_true", help="只启动模拟后端（用于手动测试图形界面/命令行）")
+    parser.add_argument("--port", type=int, default=0, help="模拟后端端口，0 表示自动分配")
+    parser.add_argument("--users", type=int, default=2000, help="每种模式的用户数")
+    parser.add_argument("--modes", default="fixed:1,fixed:4,fixed:16,adaptive:32",
+                        help="压测模式，逗号分隔（fixed:N 固定并发，adaptive:N 自适应并发上限 N）")
+    parser.add_argument("--latency-ms", type=float, default=20, help="模拟接口基础延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="模拟接口延迟抖动（毫秒）")
+    parser.add_argument("--capacity", type=int, default=16, help="模拟后端容量（超过后延迟上升）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTP 500 概率")
+    parser.add_argument("--business-error-rate", type=float, default=0.0, help="业务失败概率")
+    parser.add_argument("--already-rate", type=float, default=0.05, help="首次请求即返回已领取的概率")
+    parser.add_argument("--server-rate-limit", type=float, default=0, help="模拟后端每个接口每秒请求上限，超过返回 429")
+    parser.add_argument("--client-rate-limit", type=float, default=0, help="发放引擎的限速（次/秒，0 表示不限）")
+    parser.add_argument("--retries", type=int, default=2, help="发放引擎的重试次数")
+    parser.add_argument("--json", help="把压测结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    config = MockBackendConfig(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, capacity=args.capacity,
+        error_rate=args.error_rate, business_error_rate=args.business_error_rate,
+        already_rate=args.already_rate, rate_limit=args.server_rate_limit
+    )
+    server, backend = start_mock_server(config, args.port)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    if args.serve:
+        print(f"🚀 模拟后端已启动: {base_url}")
+        print(f"  接口1: {base_url}{API1_PATH}")
+        print(f"  接口2: {base_url}{API2_PATH}")
+        print("按 Ctrl+C 停止")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+        return
+
+    print(f"🚀 模拟后端: {base_url}（延迟 {args.latency_ms}±{args.jitter_ms}ms，容量 {args.capacity}）")
+    reports = []
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        print(f"⏱  压测模式 {mode}，{args.users} 个用户...")
+        reports.append(run_mode(base_url, backend, mode, args.users, args.client_rate_limit, args.retries))
+    server.shutdown()
+
+    print_report(reports)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"\n📁 压测结果已保存到: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
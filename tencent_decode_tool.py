@@ -7,18 +7,47 @@
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
+import argparse
 import base64
+import bisect
+import csv
+import ctypes
+import ctypes.util
+import glob
+import hashlib
+import io
+import itertools
+import mmap
 import os
 import sys
 from datetime import datetime
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 import json
 import subprocess
 import platform
+import multiprocessing
+import posixpath
+import queue
+import re
+import select
+import shutil
+import signal
+import threading
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 try:
     import openpyxl
     from openpyxl import Workbook
+    from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+    from openpyxl.utils import get_column_letter
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, WINDOWS_EPOCH, from_excel, from_ISO8601
     OPENPYXL_AVAILABLE = True
 except ImportError:
     OPENPYXL_AVAILABLE = False
@@ -30,6 +59,13 @@ try:
 except ImportError:
     XLRD_AVAILABLE = False
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 
 def get_resource_path(relative_path):
     """
@@ -43,24 +79,2371 @@ def get_resource_path(relative_path):
         # 开发环境
         base_path = os.path.abspath(os.path.dirname(__file__))
     
-    return os.path.join(base_path, relative_path)
-
-
-def open_file_with_system(file_path):
-    """使用系统默认程序打开文件"""
-    try:
-        if platform.system() == 'Darwin':  # macOS
-            subprocess.call(('open', file_path))
-        elif platform.system() == 'Windows':
-            os.startfile(file_path)
-        else:  # Linux
-            subprocess.call(('xdg-open', file_path))
-        return True
-    except Exception as e:
-        return False
+    return os.path.join(base_path, relative_path)
+
+
+def open_file_with_system(file_path):
+    """使用系统默认程序打开文件"""
+    try:
+        if platform.system() == 'Darwin':  # macOS
+            subprocess.call(('open', file_path))
+        elif platform.system() == 'Windows':
+            os.startfile(file_path)
+        else:  # Linux
+            subprocess.call(('xdg-open', file_path))
+        return True
+    except Exception as e:
+        return False
+
+
+def decode_base64_value(encoded_str: str, style: str = 'pretty') -> Tuple[bool, str]:
+    """
+    解码 Base64 字符串（模块级函数，可在子进程中执行）
+    
+    style 决定 JSON 内容的输出形式：'pretty' 缩进格式化（写入 Excel 单元格），
+    'compact' 单行紧凑字符串（CSV/Parquet），'object' 直接返回解析后的对象（JSONL）；
+    非 JSON 内容总是返回原始字符串。
+    
+    Returns:
+        (success, decoded_str): 成功标志和解码后的字符串
+    """
+    try:
+        # 去除可能的空白字符
+        encoded_str = encoded_str.strip()
+        if not encoded_str:
+            return False, "空字符串"
+        
+        # Base64 解码
+        decoded_bytes = base64.b64decode(encoded_str)
+        decoded_str = decoded_bytes.decode('utf-8')
+        
+        # 尝试格式化为 JSON（如果是 JSON 格式）
+        try:
+            json_obj = json.loads(decoded_str)
+            if style == 'object':
+                return True, json_obj
+            if style == 'compact':
+                decoded_str = json.dumps(json_obj, ensure_ascii=False, separators=(',', ':'))
+            else:
+                decoded_str = json.dumps(json_obj, ensure_ascii=False, indent=2)
+        except (json.JSONDecodeError, ValueError):
+            # 不是 JSON 格式，直接返回原始字符串
+            pass
+        
+        return True, decoded_str
+    except Exception as e:
+        return False, f"解码失败: {str(e)}"
+
+
+def decode_chunk(values: List[str], style: str = 'pretty') -> List[Tuple[bool, str]]:
+    """解码一批数据（进程池任务）"""
+    return [decode_base64_value(value, style) for value in values]
+
+
+def default_decode_workers() -> int:
+    """默认解码进程数：CPU 核数（至少 1）"""
+    return max(1, os.cpu_count() or 1)
+
+
+class DecodeCache:
+    """
+    解码结果的有界 LRU 缓存（键为原始 Base64 字符串）
+    
+    上下行命令日志中心跳、相同指令的数据大量重复，命中时直接复用
+    解码并格式化好的结果；超过 maxsize 条时淘汰最久未使用的条目。
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[str, Tuple[bool, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[bool, str]]:
+        """查找缓存；命中时计数并标记为最近使用（未命中不计数，由调用方决定）"""
+        result = self.entries.get(key)
+        if result is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Tuple[bool, str]):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (f"解码缓存命中率: {self.hit_rate() * 100:.1f}%"
+                f"（命中 {self.hits} / 共 {self.hits + self.misses} 个非空数据）")
+
+
+def data_text(value) -> str:
+    """第四列（D列）的数据，空值返回空字符串"""
+    text = str(value) if value else ""
+    return text if text.strip() else ""
+
+
+class RowBatch:
+    """
+    按列存放的一批数据行：columns[i] 为第 i 列的值（各列等长，缺失的单元格为 None），
+    first_row 为第一行在输入文件中的行号（表头为第 1 行）
+    
+    读取、解码、索引、汇总和写出都按批进行，一批内的第四列一次取出交给解码器，
+    解码结果整列写回第五列。
+    """
+    
+    __slots__ = ('columns', 'first_row')
+    
+    def __init__(self, columns: List[List], first_row: int):
+        self.columns = columns
+        self.first_row = first_row
+    
+    @classmethod
+    def from_rows(cls, rows: List[Sequence], first_row: int, width: int = 0) -> "RowBatch":
+        """逐行数据转为按列存放，各列补齐到最长的行（至少 width 列）"""
+        columns = [list(column) for column in itertools.zip_longest(*rows)]
+        columns.extend([None] * len(rows) for _ in range(max(width, 1) - len(columns)))
+        return cls(columns, first_row)
+    
+    def __len__(self) -> int:
+        return len(self.columns[0])
+    
+    def rows(self) -> Iterator[List]:
+        return map(list, zip(*self.columns))
+    
+    def slice(self, start: int, end: Optional[int] = None) -> "RowBatch":
+        return RowBatch([column[start:end] for column in self.columns], self.first_row + start)
+    
+    def ensure_width(self, width: int):
+        """列数不足 width 时补空列"""
+        for _ in range(width - len(self.columns)):
+            self.columns.append([None] * len(self))
+    
+    def data_values(self) -> List[str]:
+        """第四列的数据（调用方保证至少有 4 列）"""
+        return [data_text(value) for value in self.columns[3]]
+
+
+class ParallelDecoder:
+    """
+    多进程解码：把每批的第四列数据交给进程池，按原始顺序取回结果
+    
+    已提交的批按提交顺序排在队列里（重排缓冲），先完成的批在队列中等待，
+    只有队首完成才输出，因此结果顺序与输入一致；在途批数有上限，
+    读取速度快于解码时不会无限占用内存。workers 为 1 时在当前进程内解码。
+    style 为解码结果的形式（见 decode_base64_value），由输出格式决定。
+    
+    解码前先查 LRU 缓存：已缓存或已在途（前面的批中已提交）的数据不再重复提交，
+    每批只把首次出现的数据交给进程池。
+    """
+
+    def __init__(self, workers: int = 1, max_pending_batches: Optional[int] = None,
+                 cache_size: int = 10000, style: str = 'pretty'):
+        self.workers = max(1, workers)
+        self.style = style
+        self.max_pending_batches = max_pending_batches or self.workers * 4
+        self.cache = DecodeCache(cache_size)
+
+    def decode_batches(self, batches: Iterable[RowBatch]) -> Iterator[Tuple[RowBatch, List[Optional[Tuple[bool, str]]]]]:
+        """
+        逐批输出 (batch, results)
+        
+        results 与批内各行一一对应：第四列为空的行为 None，
+        其余为 decode_base64_value 的返回值。
+        """
+        if self.workers == 1:
+            for batch in batches:
+                yield batch, [self._decode_cached(value) if value else None for value in batch.data_values()]
+            return
+        
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        # 已提交但所在批尚未取回的数据 -> (结果占位, 批内位置)
+        in_flight: Dict[str, Tuple[List, int]] = {}
+        try:
+            # 重排缓冲：(批, 第四列数据, 每行结果来源)，按提交顺序排列
+            pending = deque()
+            for batch in batches:
+                pending.append(self._submit_batch(pool, batch, in_flight))
+                while len(pending) >= self.max_pending_batches:
+                    yield self._drain(*pending.popleft(), in_flight)
+            while pending:
+                yield self._drain(*pending.popleft(), in_flight)
+        finally:
+            # 中途取消时丢弃尚未开始的批
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _decode_cached(self, value: str) -> Tuple[bool, str]:
+        result = self.cache.get(value)
+        if result is None:
+            self.cache.misses += 1
+            result = decode_base64_value(value, self.style)
+            self.cache.put(value, result)
+        return result
+
+    def _submit_batch(self, pool: ProcessPoolExecutor, batch: RowBatch,
+                      in_flight: Dict[str, Tuple[List, int]]) -> Tuple[RowBatch, List[str], List]:
+        """
+        提交一批中需要解码的数据
+        
+        每行的结果来源为 None（空数据）、解码结果（缓存命中）或
+        (结果占位, 位置)；占位列表的第一个元素在提交后设为 future。
+        """
+        holder: List = [None]
+        data = batch.data_values()
+        values: List[str] = []
+        sources: List = []
+        for value in data:
+            if not value:
+                sources.append(None)
+                continue
+            cached = self.cache.get(value)
+            if cached is not None:
+                sources.append(cached)
+                continue
+            ref = in_flight.get(value)
+            if ref is not None:
+                # 前面的块已提交相同数据，复用其结果
+                self.cache.hits += 1
+                sources.append(ref)
+                continue
+            self.cache.misses += 1
+            ref = (holder, len(values))
+            in_flight[value] = ref
+            values.append(value)
+            sources.append(ref)
+        if values:
+            holder[0] = pool.submit(decode_chunk, values, self.style)
+        return batch, data, sources
+
+    def _drain(self, batch: RowBatch, data: List[str], sources: List,
+               in_flight: Dict[str, Tuple[List, int]]) -> Tuple[RowBatch, List[Optional[Tuple[bool, str]]]]:
+        results = []
+        for value, source in zip(data, sources):
+            # 缓存命中的来源是 (success, decoded_str)，在途引用是 (结果占位列表, 位置)
+            if isinstance(source, tuple) and isinstance(source[0], list):
+                holder, position = source
+                result = holder[0].result()[position]
+                if in_flight.get(value) is source:
+                    del in_flight[value]
+                    self.cache.put(value, result)
+            else:
+                result = source
+            results.append(result)
+        return batch, results
+
+
+class UnsupportedWorkbook(Exception):
+    """快速读取不支持的输入结构（改用通用的方式读取）"""
+
+
+class SheetReader:
+    """
+    输入工作表的统一读取接口（.xlsx、.xls、CSV 共用）
+    
+    read() 每次调用都从头读取，返回表头与按列存放的数据行批次（RowBatch），
+    之后的解码、索引、汇总和写出都按批进行，与输入格式无关。
+    子类实现 iter_rows() 逐行读取（由 read() 每 BATCH_ROWS 行转为一批），
+    能直接按列取值的读取器可以覆盖 read()。
+    """
+    
+    BATCH_ROWS = 1000
+    title = "Sheet1"
+    
+    def row_count(self) -> int:
+        """数据行数（不含表头；可以是估算值，只用于进度）"""
+        return 0
+    
+    def iter_rows(self) -> Iterator[Sequence]:
+        """从表头开始逐行输出单元格值"""
+        raise NotImplementedError
+    
+    def read(self) -> Tuple[Optional[List], Iterator[RowBatch]]:
+        """从头读取：返回表头（空表为 None）与数据行批次（各批至少与表头等宽）"""
+        rows = self.iter_rows()
+        header = next(rows, None)
+        if header is None:
+            return None, iter(())
+        header = list(header)
+        return header, self._batches(rows, len(header))
+    
+    def _batches(self, rows: Iterator[Sequence], width: int) -> Iterator[RowBatch]:
+        first_row = 2
+        while True:
+            chunk = list(itertools.islice(rows, self.BATCH_ROWS))
+            if not chunk:
+                return
+            yield RowBatch.from_rows(chunk, first_row, width)
+            first_row += len(chunk)
+
+
+class XlsxSheetReader(SheetReader):
+    """
+    直接流式解析 .xlsx 中工作表 XML 的快速读取器
+    
+    打开 zip 包后只解析工作簿结构、共享字符串表和样式中的日期格式，
+    然后用 expat 分块解析工作表 XML，逐行输出单元格的值，不创建单元格对象。
+    取值规则与 openpyxl 只读模式一致（数字、布尔、日期、公式显示为 "=..."）。
+    
+    只处理单个工作表的工作簿；多工作表、共享/数组公式等情况抛出
+    UnsupportedWorkbook，由调用方改用 openpyxl。
+    """
+
+    MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+    # expat 以 "命名空间|标签名" 形式给出元素名
+    ROW = MAIN_NS + "|row"
+    CELL = MAIN_NS + "|c"
+    VALUE = MAIN_NS + "|v"
+    FORMULA = MAIN_NS + "|f"
+    INLINE_STRING = MAIN_NS + "|is"
+    TEXT = MAIN_NS + "|t"
+    PHONETIC = MAIN_NS + "|rPh"
+
+    READ_BLOCK_SIZE = 1 << 16
+
+    def __init__(self, path: str, max_column: Optional[int] = None):
+        self.max_column = max_column
+        try:
+            self.archive = zipfile.ZipFile(path)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise UnsupportedWorkbook(f"无法作为 zip 打开: {e}")
+        try:
+            self._load_workbook()
+            self._load_shared_strings()
+            self._load_styles()
+        except UnsupportedWorkbook:
+            self.archive.close()
+            raise
+        except (KeyError, ET.ParseError, ValueError) as e:
+            self.archive.close()
+            raise UnsupportedWorkbook(f"无法解析工作簿结构: {e}")
+
+    def __enter__(self) -> "XlsxSheetReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.archive.close()
+
+    def _part_path(self, target: str, base: str = "xl") -> str:
+        """关系文件中的目标路径转换为 zip 内路径"""
+        if target.startswith("/"):
+            return target[1:]
+        return posixpath.normpath(posixpath.join(base, target))
+
+    def _load_workbook(self):
+        """读取工作表列表、当前工作表对应的 XML 路径和日期基准"""
+        workbook = ET.fromstring(self.archive.read("xl/workbook.xml"))
+        ns = {'m': self.MAIN_NS}
+        sheets = workbook.findall("m:sheets/m:sheet", ns)
+        if len(sheets) != 1:
+            raise UnsupportedWorkbook(f"工作簿包含 {len(sheets)} 个工作表")
+        self.title = sheets[0].get("name")
+        sheet_rel_id = sheets[0].get(f"{{{self.REL_NS}}}id")
+        
+        workbook_pr = workbook.find("m:workbookPr", ns)
+        date1904 = workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true")
+        self.epoch = CALENDAR_MAC_1904 if date1904 else WINDOWS_EPOCH
+        
+        rels = ET.fromstring(self.archive.read("xl/_rels/workbook.xml.rels"))
+        self.parts: Dict[str, str] = {}
+        self.sheet_path = None
+        for rel in rels.findall(f"{{{self.PKG_REL_NS}}}Relationship"):
+            path = self._part_path(rel.get("Target"))
+            if rel.get("Id") == sheet_rel_id:
+                self.sheet_path = path
+            self.parts[rel.get("Type").rsplit("/", 1)[-1]] = path
+        if self.sheet_path is None:
+            raise UnsupportedWorkbook("找不到工作表数据")
+
+    def _load_shared_strings(self):
+        """读取共享字符串表（富文本只保留文字）"""
+        self.shared_strings: List[str] = []
+        path = self.parts.get("sharedStrings")
+        if path is None or path not in self.archive.namelist():
+            return
+        si_tag = f"{{{self.MAIN_NS}}}si"
+        t_tag = f"{{{self.MAIN_NS}}}t"
+        r_tag = f"{{{self.MAIN_NS}}}r"
+        with self.archive.open(path) as f:
+            for _, node in ET.iterparse(f):
+                if node.tag != si_tag:
+                    continue
+                snippets = []
+                plain = node.find(t_tag)
+                if plain is not None and plain.text:
+                    snippets.append(plain.text)
+                for run in node.findall(r_tag):
+                    text = run.findtext(t_tag)
+                    if text:
+                        snippets.append(text)
+                self.shared_strings.append("".join(snippets).replace('x005F_', ''))
+                node.clear()
+
+    def _load_styles(self):
+        """找出日期/时长格式的样式编号，对应的数字单元格转换为日期"""
+        self.date_styles = set()
+        self.timedelta_styles = set()
+        path = self.parts.get("styles")
+        if path is None or path not in self.archive.namelist():
+            return
+        styles = ET.fromstring(self.archive.read(path))
+        ns = {'m': self.MAIN_NS}
+        custom_formats = {
+            int(fmt.get("numFmtId")): fmt.get("formatCode")
+            for fmt in styles.findall("m:numFmts/m:numFmt", ns)
+        }
+        for style_id, xf in enumerate(styles.findall("m:cellXfs/m:xf", ns)):
+            fmt_id = int(xf.get("numFmtId", 0))
+            fmt = custom_formats.get(fmt_id) or BUILTIN_FORMATS.get(fmt_id)
+            if fmt and is_date_format(fmt):
+                self.date_styles.add(style_id)
+                if is_timedelta_format(fmt):
+                    self.timedelta_styles.add(style_id)
+
+    def row_count(self) -> int:
+        return max(0, self.total_rows() - 1)
+
+    def total_rows(self) -> int:
+        """从工作表的 dimension 估算行数（用于进度），没有时返回 0"""
+        with self.archive.open(self.sheet_path) as f:
+            head = f.read(4096).decode('utf-8', errors='ignore')
+        match = re.search(r'<(?:\w+:)?dimension ref="(?:[A-Z]+\d+:)?[A-Z]+(\d+)"', head)
+        return int(match.group(1)) if match else 0
+
+    @staticmethod
+    def _column_index(ref: str) -> int:
+        """单元格坐标（如 "D12"）转换为从 1 开始的列号"""
+        column = 0
+        for char in ref:
+            if char.isdigit():
+                break
+            column = column * 26 + ord(char) - 64
+        return column
+
+    def iter_rows(self) -> Iterator[List]:
+        """
+        逐行输出单元格值列表（从第 1 行开始，缺失的行输出空列表，行内缺失的单元格为 None）
+        """
+        ready_rows: List[List] = []
+        text: List[str] = []
+        # 解析状态：当前行与行号、当前单元格的列号/类型/样式/值/公式
+        row: List = []
+        row_number = 0
+        column = 0
+        cell_type = 'n'
+        style = 0
+        value = None
+        formula = None
+        capture = False
+        in_inline = False
+        in_phonetic = False
+        max_column = self.max_column
+        column_index = self._column_index
+        CELL, VALUE, ROW, TEXT = self.CELL, self.VALUE, self.ROW, self.TEXT
+        
+        def start(name, attrs):
+            nonlocal row, row_number, column, cell_type, style, value, formula, capture, in_inline, in_phonetic
+            if name == CELL:
+                ref = attrs.get('r')
+                column = column_index(ref) if ref else column + 1
+                cell_type = attrs.get('t', 'n')
+                style = int(attrs.get('s', 0))
+                value = None
+                formula = None
+            elif name == VALUE:
+                text.clear()
+                capture = True
+            elif name == TEXT:
+                if in_inline and not in_phonetic:
+                    capture = True
+            elif name == ROW:
+                number = attrs.get('r')
+                number = int(number) if number else row_number + 1
+                # 补齐没有写入 XML 的空行，保持行号连续
+                while row_number + 1 < number:
+                    row_number += 1
+                    ready_rows.append([])
+                row_number = number
+                row = []
+                column = 0
+            elif name == self.FORMULA:
+                if attrs.get('t') in ('shared', 'array'):
+                    raise UnsupportedWorkbook("工作表包含共享公式或数组公式")
+                text.clear()
+                capture = True
+            elif name == self.INLINE_STRING:
+                in_inline = True
+                text.clear()
+            elif name == self.PHONETIC:
+                in_phonetic = True
+        
+        def end(name):
+            nonlocal value, formula, capture, in_inline, in_phonetic
+            if name == VALUE:
+                capture = False
+                value = "".join(text)
+            elif name == CELL:
+                if max_column is not None and column > max_column:
+                    return
+                if len(row) < column - 1:
+                    row.extend([None] * (column - 1 - len(row)))
+                row.append(self._cell_value(cell_type, value, style, formula))
+            elif name == ROW:
+                ready_rows.append(row)
+            elif name == TEXT:
+                capture = False
+            elif name == self.FORMULA:
+                capture = False
+                formula = "".join(text)
+            elif name == self.INLINE_STRING:
+                in_inline = False
+                value = "".join(text)
+            elif name == self.PHONETIC:
+                in_phonetic = False
+        
+        def characters(data):
+            if capture:
+                text.append(data)
+        
+        parser = expat.ParserCreate(namespace_separator="|")
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = characters
+        
+        with self.archive.open(self.sheet_path) as f:
+            while True:
+                data = f.read(self.READ_BLOCK_SIZE)
+                parser.Parse(data, not data)
+                yield from ready_rows
+                ready_rows.clear()
+                if not data:
+                    break
+
+    def _cell_value(self, cell_type: str, value: Optional[str], style: int, formula: Optional[str]):
+        """按单元格类型转换值，规则与 openpyxl 一致"""
+        if cell_type == 's' and value:
+            return self.shared_strings[int(value)]
+        if formula is not None:
+            return "=" + formula
+        if cell_type == 'inlineStr':
+            return value
+        if not value:
+            return None
+        if cell_type == 'n':
+            number = float(value) if ('.' in value or 'E' in value or 'e' in value) else int(value)
+            if style in self.date_styles:
+                try:
+                    return from_excel(number, self.epoch, timedelta=style in self.timedelta_styles)
+                except (OverflowError, ValueError):
+                    return "#VALUE!"
+            return number
+        if cell_type == 'b':
+            return bool(int(value))
+        if cell_type == 'd':
+            return from_ISO8601(value)
+        # str（公式结果）与 e（错误值）
+        return value
+
+
+# CSV 单个字段的长度上限（Windows 上不能超过 C long 的范围）
+CSV_FIELD_SIZE_LIMIT = 2 ** 31 - 1
+# 子进程中按解码形式保留的解码缓存（同一进程处理的各区间共用）
+_RANGE_CACHES: Dict[str, DecodeCache] = {}
+
+
+def parse_csv_range(path: str, start: int, end: int, delimiter: str, encoding: str) -> List[List[str]]:
+    """
+    解析文件中 [start, end) 字节区间的 CSV 行（区间起止都在行首）
+    
+    区间内引号个数为奇数说明有字段跨越了区间边界（字段内含换行），抛出 UnsupportedWorkbook。
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        data = mapped[start:end]
+    if data.count(b'"') % 2:
+        raise UnsupportedWorkbook("CSV 字段内含换行，不能按行切分")
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+    # 编码只按文件开头采样判断，后面个别无法解码的字节替换掉，不让整个区间失败
+    return list(csv.reader(io.StringIO(data.decode(encoding, errors='replace'), newline=''), delimiter=delimiter))
+
+
+def decode_csv_range(path: str, start: int, end: int, delimiter: str, encoding: str, width: int,
+                     style: str) -> Tuple[RowBatch, List[Optional[Tuple[bool, str]]], int, int]:
+    """
+    解析并解码一个字节区间（进程池任务）
+    
+    Returns:
+        (batch, results, hits, misses): 区间内的行（至少 width 列，行号由调用方设置）、
+        各行的解码结果（第四列为空时为 None）、本区间的缓存命中与未命中数
+    """
+    cache = _RANGE_CACHES.setdefault(style, DecodeCache())
+    hits, misses = cache.hits, cache.misses
+    batch = RowBatch.from_rows(parse_csv_range(path, start, end, delimiter, encoding), 0, width)
+    results = []
+    for value in batch.data_values():
+        result = None
+        if value:
+            result = cache.get(value)
+            if result is None:
+                cache.misses += 1
+                result = decode_base64_value(value, style)
+                cache.put(value, result)
+        results.append(result)
+    return batch, results, cache.hits - hits, cache.misses - misses
+
+
+# 按 CSV/TSV 读取的输入扩展名
+CSV_EXTENSIONS = ('.csv', '.tsv')
+
+
+class CsvInputReader(SheetReader):
+    """
+    CSV/TSV 输入（内存映射，不把文件读入内存）
+    
+    按 CHUNK_BYTES 把表头之后的内容切分为以换行结尾的字节区间，各区间可以在子进程中
+    独立解析和解码（每个区间为一批），结果按区间顺序取回；分隔符按扩展名（.tsv）
+    和表头判断，编码为 UTF-8（可带 BOM），开头的采样无法按 UTF-8 解码时按 GB18030 读取；
+    采样之后个别无法按该编码解码的字节替换为 U+FFFD（Base64 数据列只含 ASCII，不受影响）。
+    read() 为逐行解析（字段内含换行时也正确），工作表名取自文件名。
+    """
+    
+    CHUNK_BYTES = 4 * 1024 * 1024
+    # 估算行数时采样的字节数
+    SAMPLE_BYTES = 1024 * 1024
+    
+    def __init__(self, path: str, chunk_bytes: Optional[int] = None):
+        self.path = path
+        self.title = re.sub(r'[\\/?*\[\]:]', '_', os.path.splitext(os.path.basename(path))[0])[:31] or "Sheet1"
+        self.chunk_bytes = chunk_bytes or self.CHUNK_BYTES
+        self.size = os.path.getsize(path)
+        self.file = open(path, 'rb')
+        self.mapped = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        sample = self.mapped[:self.SAMPLE_BYTES] if self.mapped is not None else b""
+        # 数据列的 Base64 可能超过 csv 模块默认的字段长度上限
+        csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+        
+        # 编码：BOM 之后按 UTF-8，采样无法解码时按 GB18030（截断在多字节字符中间的末尾不计）
+        self.data_start = 3 if sample.startswith(b"\xef\xbb\xbf") else 0
+        text_sample = sample[self.data_start:]
+        try:
+            text_sample.decode('utf-8')
+            self.encoding = 'utf-8'
+        except UnicodeDecodeError as e:
+            self.encoding = 'utf-8' if e.start >= len(text_sample) - 3 else 'gb18030'
+        
+        # 表头行
+        header_end = self.mapped.find(b"\n", self.data_start) + 1 if self.mapped is not None else 0
+        if header_end <= 0:
+            header_end = self.size
+        header_line = self.mapped[self.data_start:header_end].decode(self.encoding, errors='replace') if self.size else ""
+        self.body_start = header_end
+        
+        if os.path.splitext(path)[1].lower() == '.tsv':
+            self.delimiter = '\t'
+        elif ',' not in header_line and '\t' in header_line:
+            self.delimiter = '\t'
+        elif ',' not in header_line and ';' in header_line:
+            self.delimiter = ';'
+        else:
+            self.delimiter = ','
+        rows = list(csv.reader(io.StringIO(header_line, newline=''), delimiter=self.delimiter))
+        self.header: Optional[List[str]] = rows[0] if rows else None
+        
+        # 按采样部分的平均行长估算数据行数（只用于进度）
+        sample_body = sample[self.body_start:]
+        lines = sample_body.count(b"\n")
+        self.estimated_rows = int((self.size - self.body_start) * lines / len(sample_body)) if lines else 0
+    
+    def __enter__(self) -> "CsvInputReader":
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        self.file.close()
+    
+    def byte_ranges(self) -> Iterator[Tuple[int, int]]:
+        """表头之后的字节区间，每个区间在换行之后结束"""
+        start = self.body_start
+        while start < self.size:
+            newline = self.mapped.find(b"\n", min(start + self.chunk_bytes, self.size) - 1)
+            end = self.size if newline < 0 else newline + 1
+            yield start, end
+            start = end
+    
+    def row_count(self) -> int:
+        return self.estimated_rows
+    
+    def iter_rows(self) -> Iterator[List[str]]:
+        """从表头开始逐行读取（逐行解析，字段内含换行时也正确）"""
+        with open(self.path, 'r', encoding='utf-8-sig' if self.encoding == 'utf-8' else self.encoding,
+                  errors='replace', newline='') as f:
+            yield from csv.reader(f, delimiter=self.delimiter)
+    
+    def decode_batches(self, decoder: ParallelDecoder) -> Iterator[Tuple[RowBatch, List[Optional[Tuple[bool, str]]]]]:
+        """
+        按区间解析并解码表头之后的行，按原始顺序输出 (batch, results)（与 ParallelDecoder 相同）
+        
+        decoder 提供进程数、解码形式与缓存统计；workers 为 1 时在当前进程内逐区间处理，
+        否则区间交给进程池，在途区间数有上限。
+        """
+        first_row = 2
+        args = (self.delimiter, self.encoding, len(self.header or ()), decoder.style)
+        
+        def emit(chunk: Tuple[RowBatch, List, int, int]) -> Tuple[RowBatch, List]:
+            nonlocal first_row
+            batch, results, hits, misses = chunk
+            decoder.cache.hits += hits
+            decoder.cache.misses += misses
+            batch.first_row = first_row
+            first_row += len(batch)
+            return batch, results
+        
+        if decoder.workers == 1:
+            for start, end in self.byte_ranges():
+                yield emit(decode_csv_range(self.path, start, end, *args))
+            return
+        
+        pool = ProcessPoolExecutor(max_workers=decoder.workers)
+        try:
+            pending = deque()
+            for start, end in self.byte_ranges():
+                pending.append(pool.submit(decode_csv_range, self.path, start, end, *args))
+                while len(pending) >= decoder.workers * 2:
+                    yield emit(pending.popleft().result())
+            while pending:
+                yield emit(pending.popleft().result())
+        finally:
+            # 中途取消时丢弃尚未开始的区间
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+class OpenpyxlSheetReader(SheetReader):
+    """openpyxl 只读模式的工作表（多工作表等快速读取不支持的 .xlsx）"""
+    
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.title = sheet.title
+        # 表格尺寸记录的行数只用于估算进度
+        self.estimated_rows = max(0, (sheet.max_row or 0) - 1)
+        # 部分导出工具写入的表格尺寸不准确，按实际行读取
+        sheet.reset_dimensions()
+    
+    def row_count(self) -> int:
+        return self.estimated_rows
+    
+    def iter_rows(self) -> Iterator[Tuple]:
+        return self.sheet.iter_rows(values_only=True)
+
+
+class XlrdSheetReader(SheetReader):
+    """
+    xlrd 读取的 .xls 工作表：xlrd 打开时已把整个工作表读入内存，
+    每批直接按列切片取值，不逐个单元格复制；
+    .xls 的日期单元格存为序号，按工作簿的日期基准（datemode）转为 datetime
+    """
+    
+    def __init__(self, sheet, datemode: int = 0):
+        self.sheet = sheet
+        self.title = sheet.name
+        self.datemode = datemode
+    
+    def row_count(self) -> int:
+        return max(0, self.sheet.nrows - 1)
+    
+    def _with_dates(self, values: List, types: List[int]) -> List:
+        """把日期类型单元格的序号转为 datetime（没有日期单元格时原样返回）"""
+        if xlrd.XL_CELL_DATE not in types:
+            return values
+        values = list(values)
+        for i, cell_type in enumerate(types):
+            if cell_type == xlrd.XL_CELL_DATE:
+                try:
+                    values[i] = xlrd.xldate.xldate_as_datetime(values[i], self.datemode)
+                except (xlrd.xldate.XLDateError, ValueError, OverflowError):
+                    pass
+        return values
+    
+    def _row(self, row_idx: int) -> List:
+        sheet = self.sheet
+        return self._with_dates(sheet.row_values(row_idx), sheet.row_types(row_idx))
+    
+    def iter_rows(self) -> Iterator[List]:
+        return (self._row(row_idx) for row_idx in range(self.sheet.nrows))
+    
+    def read(self) -> Tuple[Optional[List], Iterator[RowBatch]]:
+        sheet = self.sheet
+        if sheet.nrows < 1:
+            return None, iter(())
+        
+        def batches() -> Iterator[RowBatch]:
+            for start in range(1, sheet.nrows, self.BATCH_ROWS):
+                end = min(start + self.BATCH_ROWS, sheet.nrows)
+                yield RowBatch([self._with_dates(sheet.col_values(col, start, end), sheet.col_types(col, start, end))
+                                for col in range(sheet.ncols)], start + 1)
+        
+        return self._row(0), batches()
+
+
+# 输出格式 -> 文件扩展名（xlsx 为默认格式）
+OUTPUT_FORMATS = {
+    'xlsx': '.xlsx',
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'parquet': '.parquet',
+}
+
+
+class OutputWriter:
+    """
+    解码结果的流式写入器基类
+    
+    append() 逐行追加（每个工作表的第一行为表头），append_batch() 按批追加数据行，
+    save() 完成输出，
+    discard() 在取消或失败时丢弃，不留下不完整的输出文件。
+    multi_sheet 为 False 的格式只输出解码的工作表。
+    
+    resume_from 为上次的输出文件列表时接着上次的输出追加（增量处理）：
+    上次的数据原样保留，传入的表头不再重复写出，丢弃时恢复为上次的内容。
+    path 可以与上次的输出不同，此时上次的内容转移到 path（上次的文件由调用方在保存后删除）。
+    """
+    
+    # 该格式使用的解码结果形式（见 decode_base64_value）
+    decode_style = 'pretty'
+    multi_sheet = False
+    # 汇总表是否写在输出文件内（否则另存为 JSON 报告）
+    report_in_output = False
+    
+    def __init__(self, path: str, resume_from: Optional[List[str]] = None):
+        self.path = path
+        self.resume_from = resume_from
+    
+    def output_paths(self) -> List[str]:
+        """写出的所有文件"""
+        return [self.path]
+    
+    def add_sheet(self, title: str):
+        """开始一个新的工作表（单工作表格式忽略）"""
+    
+    def expect_rows(self, count: int):
+        """写入前告知预计的数据行数（用于提前检查格式限制）"""
+    
+    def append(self, row: List):
+        raise NotImplementedError
+    
+    def append_batch(self, batch: RowBatch):
+        """追加一批数据行（默认逐行 append，能按列写出的格式覆盖）"""
+        for row in batch.rows():
+            self.append(row)
+    
+    def add_report(self, rows: List[List]):
+        """把汇总表写入输出文件（report_in_output 为 True 的格式）"""
+        raise NotImplementedError
+    
+    def save(self):
+        raise NotImplementedError
+    
+    def discard(self):
+        """丢弃已写入的内容"""
+
+
+class XlsxOutputWriter(OutputWriter):
+    """
+    openpyxl 只写模式，保存前数据只在工作簿内部的临时文件中
+    
+    Excel 的限制在写入时检查，不等到保存时才失败：
+    工作表写满 MAX_ROWS 行后续写到新工作表（split 为 'file' 时续写到新文件），
+    并重复表头；超过 MAX_CELL_CHARS 字符的文本写入 '输出文件名_附件' 目录，
+    单元格中写明附件路径。
+    
+    xlsx 无法原地追加：增量处理时先把上次输出的数据行逐行复制到新工作簿
+    （按同样的规则重新拆分），再写入新增的行，保存时覆盖上次的输出。
+    """
+    
+    multi_sheet = True
+    report_in_output = True
+    REPORT_SHEET_TITLE = "Topic汇总"
+    # Excel 单个工作表的最大行数（含表头）与单元格最大字符数
+    MAX_ROWS = 1048576
+    MAX_CELL_CHARS = 32767
+    # 工作表名称的最大长度
+    MAX_TITLE_CHARS = 31
+    
+    def __init__(self, path: str, split: str = 'sheet', on_info: Optional[Callable[[str], None]] = None,
+                 resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        self.split = split
+        self.on_info = on_info
+        base, ext = os.path.splitext(path)
+        self.spill_dir = f"{base}_附件"
+        # 本次新写出的附件（丢弃时只删除这些，保留上次的附件）
+        self.spilled_files: List[str] = []
+        # 输出换了位置时从上次的附件目录移过来的附件：(原路径, 新路径)，丢弃时移回
+        self.adopted_spills: List[Tuple[str, str]] = []
+        self.copied_rows = 0
+        # 已写满并保存为临时文件的工作簿：(临时路径, 最终路径)
+        self.finished_parts: List[Tuple[str, str]] = []
+        self.part_paths = [path]
+        self.workbook = Workbook(write_only=True)
+        self.sheet = None
+        self.title = "Sheet1"
+        self.header: Optional[List] = None
+        self.sheet_rows = 0
+        self.part_index = 1
+    
+    def report_info(self, message: str):
+        if self.on_info is not None:
+            self.on_info(message)
+    
+    def output_paths(self) -> List[str]:
+        return list(self.part_paths)
+    
+    def add_sheet(self, title: str):
+        self.title = title
+        self.header = None
+        self.part_index = 1
+        self._create_sheet(title)
+    
+    def _create_sheet(self, title: str):
+        self.sheet = self.workbook.create_sheet(title=title)
+        self.sheet_rows = 0
+    
+    def expect_rows(self, count: int):
+        count += self.copied_rows
+        parts = max(1, -(-count // (self.MAX_ROWS - 1)))
+        if parts > 1:
+            unit = "个文件" if self.split == 'file' else "个工作表"
+            self.report_info(f"ℹ️  约 {count} 行数据，超过 Excel 单个工作表 {self.MAX_ROWS} 行的上限，"
+                             f"将拆分为 {parts} {unit}（每个都带表头）\n")
+    
+    def append(self, row: List):
+        if self.sheet is None:
+            self.add_sheet(self.title)
+        if self.sheet_rows >= self.MAX_ROWS:
+            self._roll_over()
+        row = self._spill_long_cells(row)
+        self.sheet.append(row)
+        self.sheet_rows += 1
+        if self.header is None:
+            self.header = list(row)
+            if self.resume_from:
+                self._copy_previous()
+    
+    def _copy_previous(self):
+        """复制上次输出的数据行（跳过各工作表的表头）"""
+        paths, self.resume_from = self.resume_from, None
+        links = self._adopt_previous_spills(paths[0])
+        for path in paths:
+            workbook = openpyxl.load_workbook(path, read_only=True)
+            try:
+                for sheet in workbook.worksheets:
+                    if sheet.title == self.REPORT_SHEET_TITLE:
+                        continue
+                    rows = sheet.iter_rows(values_only=True)
+                    next(rows, None)
+                    for values in rows:
+                        if links is not None:
+                            values = [value.replace(*links) if isinstance(value, str) else value
+                                      for value in values]
+                        self.append(values)
+                        self.copied_rows += 1
+            finally:
+                workbook.close()
+    
+    def _adopt_previous_spills(self, previous_path: str) -> Optional[Tuple[str, str]]:
+        """
+        上次的输出在别的位置时，把它的附件移到本次的附件目录
+        
+        Returns:
+            单元格中需要改写的附件路径前缀 (旧, 新)；不需要改写时为 None
+        """
+        previous_dir = f"{os.path.splitext(previous_path)[0]}_附件"
+        if os.path.abspath(previous_dir) == os.path.abspath(self.spill_dir) or not os.path.isdir(previous_dir):
+            return None
+        os.makedirs(self.spill_dir, exist_ok=True)
+        for name in sorted(os.listdir(previous_dir)):
+            source = os.path.join(previous_dir, name)
+            target = os.path.join(self.spill_dir, name)
+            shutil.move(source, target)
+            self.adopted_spills.append((source, target))
+        os.rmdir(previous_dir)
+        return (f"完整内容见: {os.path.basename(previous_dir)}/",
+                f"完整内容见: {os.path.basename(self.spill_dir)}/")
+    
+    def _roll_over(self):
+        """当前工作表已满：换新工作表或新文件，并重复表头"""
+        self.part_index += 1
+        suffix = f"_{self.part_index}"
+        if self.split == 'file':
+            part_path = self._finish_workbook()
+            self.report_info(f"ℹ️  已写满 {self.MAX_ROWS} 行，续写到文件: {part_path}\n")
+            title = self.title
+        else:
+            title = self.title[:self.MAX_TITLE_CHARS - len(suffix)] + suffix
+            self.report_info(f"ℹ️  工作表 '{self.sheet.title}' 已写满 {self.MAX_ROWS} 行，续写到工作表 '{title}'\n")
+        self._create_sheet(title)
+        if self.header is not None:
+            self.sheet.append(self.header)
+            self.sheet_rows += 1
+    
+    def _finish_workbook(self) -> str:
+        """把写满的工作簿保存为临时文件，换一个新工作簿；返回下一个文件的路径"""
+        current_path = self.part_paths[-1]
+        temp_path = current_path + ".part"
+        self.workbook.save(temp_path)
+        self.finished_parts.append((temp_path, current_path))
+        base, ext = os.path.splitext(self.path)
+        next_path = f"{base}_{len(self.part_paths) + 1}{ext}"
+        self.part_paths.append(next_path)
+        self.workbook = Workbook(write_only=True)
+        return next_path
+    
+    def _spill_long_cells(self, row: List) -> List:
+        """超过单元格上限的文本写入附件文件，单元格中改写为附件的相对路径"""
+        for index, value in enumerate(row):
+            if isinstance(value, str) and len(value) > self.MAX_CELL_CHARS:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                # 按文件拆分时各部分的工作表同名、行号从头计，附件名中带上部分序号
+                prefix = self.sheet.title
+                if self.split == 'file' and self.part_index > 1:
+                    prefix = f"{prefix}_{self.part_index}"
+                name = f"{prefix}_{get_column_letter(index + 1)}{self.sheet_rows + 1}.txt"
+                spill_path = os.path.join(self.spill_dir, name)
+                with open(spill_path, 'w', encoding='utf-8') as f:
+                    f.write(value)
+                self.spilled_files.append(spill_path)
+                row = list(row)
+                relative = posixpath.join(os.path.basename(self.spill_dir), name)
+                row[index] = f"[内容过长（{len(value)} 字符），完整内容见: {relative}]"
+        return row
+    
+    def add_report(self, rows: List[List]):
+        """汇总表写在最后一个输出文件的末尾"""
+        sheet = self.workbook.create_sheet(title=self.REPORT_SHEET_TITLE)
+        for row in rows:
+            sheet.append(row)
+    
+    def save(self):
+        self.workbook.save(self.part_paths[-1])
+        for temp_path, final_path in self.finished_parts:
+            os.replace(temp_path, final_path)
+        if len(self.part_paths) > 1:
+            self.report_info(f"ℹ️  输出已拆分为 {len(self.part_paths)} 个文件: "
+                             f"{', '.join(os.path.basename(path) for path in self.part_paths)}\n")
+        if self.spilled_files:
+            self.report_info(f"ℹ️  {len(self.spilled_files)} 个单元格超过 {self.MAX_CELL_CHARS} 字符，"
+                             f"完整内容已保存到: {self.spill_dir}\n")
+    
+    def discard(self):
+        for temp_path, _ in self.finished_parts:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.finished_parts = []
+        for spill_path in self.spilled_files:
+            if os.path.exists(spill_path):
+                os.remove(spill_path)
+        for source, target in self.adopted_spills:
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            shutil.move(target, source)
+        if ((self.spilled_files or self.adopted_spills) and os.path.isdir(self.spill_dir)
+                and not os.listdir(self.spill_dir)):
+            os.rmdir(self.spill_dir)
+        self.spilled_files = []
+        self.adopted_spills = []
+
+
+class TextOutputWriter(OutputWriter):
+    """
+    文本格式先写入 '.part' 临时文件，保存时改名，取消时删除；
+    增量处理时直接追加到上次的输出（输出位置不同时先移过来），取消时截断回原来的长度并移回
+    """
+    
+    def __init__(self, path: str, resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        # 追加模式下表头已在上次的输出中
+        self.skip_header = bool(resume_from)
+        self.moved_from: Optional[str] = None
+        if resume_from:
+            self.part_path = None
+            if os.path.abspath(resume_from[0]) != os.path.abspath(path):
+                shutil.move(resume_from[0], path)
+                self.moved_from = resume_from[0]
+            self.resume_size = os.path.getsize(path)
+            self.stream = open(path, 'a', encoding='utf-8', newline='')
+        else:
+            self.part_path = path + ".part"
+            self.stream = open(self.part_path, 'w', encoding='utf-8', newline='')
+    
+    def save(self):
+        self.stream.close()
+        if self.part_path is not None:
+            os.replace(self.part_path, self.path)
+    
+    def discard(self):
+        self.stream.close()
+        if self.part_path is None:
+            os.truncate(self.path, self.resume_size)
+            if self.moved_from is not None:
+                shutil.move(self.path, self.moved_from)
+        elif os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+class CsvOutputWriter(TextOutputWriter):
+    """CSV：解码结果为单行紧凑 JSON，日期按 'YYYY-MM-DD HH:MM:SS' 写出"""
+    
+    decode_style = 'compact'
+    
+    def __init__(self, path: str, resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        self.writer = csv.writer(self.stream)
+    
+    def append(self, row: List):
+        if self.skip_header:
+            self.skip_header = False
+            return
+        self.writer.writerow(row)
+    
+    def append_batch(self, batch: RowBatch):
+        self.writer.writerows(zip(*batch.columns))
+
+
+def column_names(header: List) -> List[str]:
+    """表头转为字段名：空白或重复的表头用 '列N' 代替"""
+    names = []
+    for index, value in enumerate(header):
+        name = str(value).strip() if value is not None else ""
+        if not name or name in names:
+            name = f"列{index + 1}"
+        names.append(name)
+    return names
+
+
+class JsonlOutputWriter(TextOutputWriter):
+    """
+    JSONL：每行一个对象，键为表头；解码出的 JSON 作为嵌套对象写入，
+    不再是格式化后的字符串。表头之外的列以 '列N' 为键，空单元格省略。
+    """
+    
+    decode_style = 'object'
+    
+    def __init__(self, path: str, resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        self.keys: Optional[List[str]] = None
+    
+    def append(self, row: List):
+        if self.keys is None:
+            self.keys = column_names(row)
+            return
+        record = {}
+        for index, value in enumerate(row):
+            if value is None or value == "":
+                continue
+            key = self.keys[index] if index < len(self.keys) else f"列{index + 1}"
+            record[key] = value
+        # 日期等非 JSON 类型按字符串写出
+        self.stream.write(json.dumps(record, ensure_ascii=False, default=str))
+        self.stream.write("\n")
+
+
+class ParquetOutputWriter(OutputWriter):
+    """
+    Parquet 列式压缩格式（需要 pyarrow）：按表头建立字符串列，
+    每 BATCH_ROWS 行写出一个行组；表头之外的列不输出。
+    增量处理时先把上次输出的行组复制到新文件，再写入新增的行。
+    """
+    
+    decode_style = 'compact'
+    BATCH_ROWS = 50000
+    
+    def __init__(self, path: str, compression: str = 'zstd', resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        self.part_path = path + ".part"
+        self.compression = compression
+        self.writer = None
+        self.columns: List[List] = []
+    
+    def append(self, row: List):
+        if self.writer is None:
+            names = column_names(row)
+            schema = pa.schema([(name, pa.string()) for name in names])
+            self.writer = pq.ParquetWriter(self.part_path, schema, compression=self.compression)
+            self.columns = [[] for _ in names]
+            if self.resume_from:
+                previous = pq.ParquetFile(self.resume_from[0])
+                try:
+                    for batch in previous.iter_batches(batch_size=self.BATCH_ROWS):
+                        self.writer.write_batch(batch.cast(schema))
+                finally:
+                    previous.close()
+            return
+        for index, column in enumerate(self.columns):
+            value = row[index] if index < len(row) else None
+            column.append(None if value is None or value == "" else str(value))
+        if len(self.columns[0]) >= self.BATCH_ROWS:
+            self._flush()
+    
+    def append_batch(self, batch: RowBatch):
+        for index, column in enumerate(self.columns):
+            values = batch.columns[index] if index < len(batch.columns) else [None] * len(batch)
+            column.extend(None if value is None or value == "" else str(value) for value in values)
+        if len(self.columns[0]) >= self.BATCH_ROWS:
+            self._flush()
+    
+    def _flush(self):
+        if self.columns and self.columns[0]:
+            arrays = [pa.array(column, type=pa.string()) for column in self.columns]
+            self.writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.writer.schema))
+            self.columns = [[] for _ in self.columns]
+    
+    def save(self):
+        if self.writer is None:
+            raise ValueError("没有可写出的数据")
+        self._flush()
+        self.writer.close()
+        os.replace(self.part_path, self.path)
+    
+    def discard(self):
+        if self.writer is not None:
+            self.writer.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+class XlsOutputWriter(OutputWriter):
+    """
+    xlwt 写出 Excel 97-2003 格式（未安装 openpyxl 时代替 xlsx 输出）
+    
+    工作簿保存前整个在内存中，单个工作表最多 MAX_ROWS 行；
+    增量处理时先用 xlrd 读回上次输出的数据行，保存时覆盖上次的输出。
+    """
+    
+    multi_sheet = True
+    MAX_ROWS = 65536
+    
+    def __init__(self, path: str, resume_from: Optional[List[str]] = None):
+        super().__init__(path, resume_from)
+        self.workbook = xlwt.Workbook()
+        self.sheet = None
+        self.sheet_rows = 0
+        self.copied_rows = 0
+    
+    def add_sheet(self, title: str):
+        self.sheet = self.workbook.add_sheet(title)
+        self.sheet_rows = 0
+    
+    def expect_rows(self, count: int):
+        if self.copied_rows + count + 1 > self.MAX_ROWS:
+            raise ValueError(f"约 {self.copied_rows + count} 行数据，超过 .xls 单个工作表 {self.MAX_ROWS} 行的上限"
+                             f"（安装 openpyxl 后可输出 .xlsx）")
+    
+    def append(self, row: List):
+        if self.sheet is None:
+            self.add_sheet("Sheet1")
+        write = self.sheet.write
+        row_idx = self.sheet_rows
+        for col_idx, value in enumerate(row):
+            if value is not None:
+                write(row_idx, col_idx, value)
+        self.sheet_rows += 1
+        if self.resume_from:
+            paths, self.resume_from = self.resume_from, None
+            for path in paths:
+                for sheet in xlrd.open_workbook(path).sheets():
+                    for previous_idx in range(1, sheet.nrows):
+                        self.append(sheet.row_values(previous_idx))
+                        self.copied_rows += 1
+    
+    def save(self):
+        temp_path = self.path + ".part"
+        self.workbook.save(temp_path)
+        os.replace(temp_path, self.path)
+
+
+def create_output_writer(output_format: str, path: str, xlsx_split: str = 'sheet',
+                         on_info: Optional[Callable[[str], None]] = None,
+                         resume_from: Optional[List[str]] = None) -> OutputWriter:
+    """按输出格式创建写入器；缺少依赖库时抛出 ValueError"""
+    if output_format == 'xlsx':
+        if OPENPYXL_AVAILABLE:
+            return XlsxOutputWriter(path, xlsx_split, on_info, resume_from)
+        if XLRD_AVAILABLE:
+            return XlsOutputWriter(path, resume_from)
+        raise ValueError("openpyxl 库未安装，无法输出 .xlsx 文件")
+    if output_format == 'csv':
+        return CsvOutputWriter(path, resume_from)
+    if output_format == 'jsonl':
+        return JsonlOutputWriter(path, resume_from)
+    if output_format == 'parquet':
+        if not PYARROW_AVAILABLE:
+            raise ValueError("pyarrow 库未安装，无法输出 Parquet 文件\n请运行: pip install pyarrow")
+        return ParquetOutputWriter(path, resume_from=resume_from)
+    raise ValueError(f"不支持的输出格式: {output_format}")
+
+
+def manifest_path(input_path: str) -> str:
+    """增量处理记录文件：与输入文件放在一起"""
+    return input_path + ".转码记录.json"
+
+
+def load_manifest(input_path: str) -> Optional[Dict]:
+    """读取增量处理记录，不存在或损坏时返回 None"""
+    try:
+        with open(manifest_path(input_path), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get('version') != 1:
+        return None
+    return manifest
+
+
+def save_manifest(input_path: str, manifest: Dict):
+    """先写临时文件再改名，中途退出不会留下损坏的记录"""
+    path = manifest_path(input_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+class PrefixHasher:
+    """
+    按行累计输入内容的 SHA-256（含表头），用于确认上次处理过的部分没有变化
+    （行末的空单元格不计入，与读取时按批补齐的列数无关）
+    """
+
+    def __init__(self):
+        self.sha = hashlib.sha256()
+        self.rows = 0
+
+    def update(self, row: Sequence):
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        self.sha.update(repr(row).encode('utf-8'))
+        self.sha.update(b"\n")
+        self.rows += 1
+
+    def update_batch(self, batch: RowBatch):
+        for row in batch.rows():
+            self.update(row)
+
+    def wrap_batches(self, batches: Iterable[RowBatch]) -> Iterator[RowBatch]:
+        """读取时逐批累计（在解码结果写入第五列之前）"""
+        for batch in batches:
+            self.update_batch(batch)
+            yield batch
+
+    def hexdigest(self) -> str:
+        return self.sha.hexdigest()
+
+
+class MessageIndex:
+    """
+    解码结果的内存索引（供界面浏览，在解码的同一遍中逐批建立）
+    
+    每行只保存行号、时间、通讯类型与 Topic 的编号和原始 Base64 数据（相同数据共用
+    一个字符串对象），解码内容在显示时再按需解码。通讯类型和 Topic 建立
+    编号 -> 行列表的哈希索引，时间建立排序索引；查询时从候选最少的条件开始，
+    用其余条件逐行筛选（等价于各条件结果集的交集），结果按输入顺序返回。
+    """
+
+    def __init__(self):
+        self.row_numbers = array('I')
+        self.times: List[str] = []
+        self.type_codes = array('I')
+        self.topic_codes = array('I')
+        self.failed = array('b')
+        self.values: List[str] = []
+        self.types: List[str] = []
+        self.topics: List[str] = []
+        self.type_rows: List[array] = []
+        self.topic_rows: List[array] = []
+        self._type_ids: Dict[str, int] = {}
+        self._topic_ids: Dict[str, int] = {}
+        self._interned: Dict[str, str] = {}
+        # 时间排序索引：排序后的时间与对应的行
+        self.sorted_times: List[str] = []
+        self.time_order = array('I')
+
+    def __len__(self) -> int:
+        return len(self.row_numbers)
+
+    @staticmethod
+    def time_key(value) -> str:
+        """时间列转为可按字符串比较的 'YYYY-MM-DD HH:MM:SS'"""
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        return "" if value is None else str(value).strip()
+
+    @staticmethod
+    def _code(value, ids: Dict[str, int], names: List[str], rows: List[array]) -> int:
+        name = "" if value is None else str(value).strip()
+        code = ids.get(name)
+        if code is None:
+            code = ids[name] = len(names)
+            names.append(name)
+            rows.append(array('I'))
+        return code
+
+    def add_batch(self, batch: RowBatch, results: List[Optional[Tuple[bool, str]]]):
+        """加入一批（至少 4 列）及其解码结果"""
+        position = len(self.row_numbers)
+        self.row_numbers.extend(range(batch.first_row, batch.first_row + len(batch)))
+        self.times.extend(map(self.time_key, batch.columns[0]))
+        for msg_type, topic in zip(batch.columns[1], batch.columns[2]):
+            type_code = self._code(msg_type, self._type_ids, self.types, self.type_rows)
+            topic_code = self._code(topic, self._topic_ids, self.topics, self.topic_rows)
+            self.type_codes.append(type_code)
+            self.topic_codes.append(topic_code)
+            self.type_rows[type_code].append(position)
+            self.topic_rows[topic_code].append(position)
+            position += 1
+        interned = self._interned
+        self.values.extend(interned.setdefault(value, value) for value in batch.data_values())
+        self.failed.extend(1 if result is not None and not result[0] else 0 for result in results)
+
+    def topics_by_count(self) -> List[str]:
+        """按消息数从多到少排列的 Topic"""
+        return sorted(self.topics, key=lambda name: -len(self.topic_rows[self._topic_ids[name]]))
+
+    def finish(self):
+        """全部行加入后建立时间排序索引（导出的日志通常已按时间排列，排序接近线性）"""
+        order = sorted(range(len(self.times)), key=self.times.__getitem__)
+        self.time_order = array('I', order)
+        self.sorted_times = [self.times[position] for position in order]
+        self._interned = {}
+
+    def query(self, topic: Optional[str] = None, msg_type: Optional[str] = None,
+              start: Optional[str] = None, end: Optional[str] = None) -> Sequence[int]:
+        """
+        按 Topic、通讯类型和时间范围查询（条件为 None 或空表示不限）
+        
+        start/end 按字符串前缀比较，例如 end 为 '2025-12-12 10' 时包含 10 点整个小时。
+        
+        Returns:
+            符合条件的行位置（按输入顺序）
+        """
+        candidates = []
+        topic_code = type_code = None
+        if topic:
+            topic_code = self._topic_ids.get(topic)
+            if topic_code is None:
+                return []
+            candidates.append(self.topic_rows[topic_code])
+        if msg_type:
+            type_code = self._type_ids.get(msg_type)
+            if type_code is None:
+                return []
+            candidates.append(self.type_rows[type_code])
+        low = bisect.bisect_left(self.sorted_times, start) if start else 0
+        high = bisect.bisect_right(self.sorted_times, end + "\uffff") if end else len(self.sorted_times)
+        by_time = start or end
+        if by_time:
+            candidates.append(self.time_order[low:high])
+        if not candidates:
+            return range(len(self))
+        
+        # 从最小的候选集合开始，用其余条件筛选
+        smallest = min(candidates, key=len)
+        times, type_codes, topic_codes = self.times, self.type_codes, self.topic_codes
+        low_time = self.sorted_times[low] if low < len(self.sorted_times) else None
+        high_time = self.sorted_times[high - 1] if high > 0 else None
+        if by_time and (low_time is None or high_time is None or low >= high):
+            return []
+        result = [
+            position for position in smallest
+            if (topic_code is None or topic_codes[position] == topic_code)
+            and (type_code is None or type_codes[position] == type_code)
+            and (not by_time or low_time <= times[position] <= high_time)
+        ]
+        if smallest is candidates[-1] and by_time:
+            # 时间索引中的候选按时间排列，恢复为输入顺序
+            result.sort()
+        return result
+
+
+class TopicStats:
+    """
+    单个 Topic + 通讯类型的汇总，内存固定：计数、极值、首末时间，
+    数据大小按 2 的幂分桶计数（分位数为所在桶的上界，是近似值）
+    """
+
+    BUCKETS = 40
+
+    def __init__(self):
+        self.messages = 0
+        self.decoded = 0
+        self.failed = 0
+        self.empty = 0
+        self.size_total = 0
+        self.size_min: Optional[int] = None
+        self.size_max = 0
+        self.histogram = [0] * self.BUCKETS
+        self.first_time: Optional[str] = None
+        self.last_time: Optional[str] = None
+
+    def add(self, time_key: str, size: Optional[int], failed: bool):
+        self.messages += 1
+        if time_key:
+            self.add_time(time_key)
+        if size is None:
+            self.empty += 1
+            return
+        if failed:
+            self.failed += 1
+        else:
+            self.decoded += 1
+        self.size_total += size
+        self.size_min = size if self.size_min is None else min(self.size_min, size)
+        self.size_max = max(self.size_max, size)
+        self.histogram[min(size.bit_length(), self.BUCKETS - 1)] += 1
+
+    def merge(self, other: "TopicStats"):
+        self.messages += other.messages
+        self.decoded += other.decoded
+        self.failed += other.failed
+        self.empty += other.empty
+        self.size_total += other.size_total
+        if other.size_min is not None:
+            self.size_min = other.size_min if self.size_min is None else min(self.size_min, other.size_min)
+        self.size_max = max(self.size_max, other.size_max)
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        for time_key in (other.first_time, other.last_time):
+            if time_key:
+                self.add_time(time_key)
+
+    def add_time(self, time_key: str):
+        if self.first_time is None or time_key < self.first_time:
+            self.first_time = time_key
+        if self.last_time is None or time_key > self.last_time:
+            self.last_time = time_key
+
+    def percentile(self, fraction: float) -> int:
+        """数据大小的近似分位数（字节）"""
+        count = self.decoded + self.failed
+        if not count:
+            return 0
+        target = fraction * count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.histogram):
+            seen += bucket_count
+            if seen >= target:
+                return min((1 << bucket) - 1, self.size_max) if bucket else 0
+        return self.size_max
+
+    def failure_rate(self) -> float:
+        count = self.decoded + self.failed
+        return self.failed / count if count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'messages': self.messages,
+            'decoded': self.decoded,
+            'failed': self.failed,
+            'empty': self.empty,
+            'failure_rate': round(self.failure_rate(), 6),
+            'size_bytes': {
+                'min': self.size_min or 0,
+                'mean': round(self.size_total / (self.decoded + self.failed), 1) if self.decoded + self.failed else 0,
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                'max': self.size_max,
+                'total': self.size_total,
+                # 键为桶的上界（字节），只列出非空的桶
+                'histogram': {str((1 << bucket) - 1): count for bucket, count in enumerate(self.histogram) if count},
+            },
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TopicStats":
+        stats = cls()
+        stats.messages = data['messages']
+        stats.decoded = data['decoded']
+        stats.failed = data['failed']
+        stats.empty = data['empty']
+        size = data['size_bytes']
+        stats.size_total = size['total']
+        stats.size_min = size['min'] if stats.decoded + stats.failed else None
+        stats.size_max = size['max']
+        for upper, count in size['histogram'].items():
+            stats.histogram[min((int(upper) + 1).bit_length() - 1, cls.BUCKETS - 1)] += count
+        stats.first_time = data['first_time']
+        stats.last_time = data['last_time']
+        return stats
+
+
+class TopicReport:
+    """
+    按 Topic 与通讯类型汇总的统计，在解码的同一遍中逐批累计，
+    内存只与 Topic 数量有关；可保存到增量处理记录中继续累计
+    """
+
+    HEADER = ["Topic", "通讯类型", "消息数", "解码成功", "解码失败", "空数据", "失败率",
+              "最小字节", "平均字节", "P50字节", "P90字节", "P99字节", "最大字节", "首条时间", "末条时间"]
+
+    def __init__(self):
+        self.stats: Dict[Tuple[str, str], TopicStats] = {}
+
+    @staticmethod
+    def payload_size(value: str) -> int:
+        """Base64 数据解码后的字节数（按长度计算，不解码）"""
+        value = value.strip()
+        return len(value) * 3 // 4 - (len(value) - len(value.rstrip('=')))
+
+    def add_batch(self, batch: RowBatch, results: List[Optional[Tuple[bool, str]]]):
+        """累计一批（至少 4 列）及其解码结果"""
+        columns = batch.columns
+        for time_value, msg_type, topic, value, result in zip(columns[0], columns[1], columns[2],
+                                                              batch.data_values(), results):
+            key = ("" if topic is None else str(topic).strip(), "" if msg_type is None else str(msg_type).strip())
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = TopicStats()
+            size = self.payload_size(value) if value else None
+            stats.add(MessageIndex.time_key(time_value), size, result is not None and not result[0])
+
+    def total(self) -> TopicStats:
+        total = TopicStats()
+        for stats in self.stats.values():
+            total.merge(stats)
+        return total
+
+    def rows(self) -> List[List]:
+        """汇总表：表头、每个 Topic + 通讯类型一行（按 Topic 排序），最后为合计"""
+        def row(topic: str, msg_type: str, stats: TopicStats) -> List:
+            data = stats.to_dict()
+            size = data['size_bytes']
+            return [topic, msg_type, stats.messages, stats.decoded, stats.failed, stats.empty,
+                    f"{stats.failure_rate() * 100:.2f}%", size['min'], size['mean'], size['p50'], size['p90'],
+                    size['p99'], size['max'], stats.first_time or "", stats.last_time or ""]
+        
+        rows = [list(self.HEADER)]
+        for (topic, msg_type) in sorted(self.stats):
+            rows.append(row(topic, msg_type, self.stats[(topic, msg_type)]))
+        rows.append(row("（合计）", "", self.total()))
+        return rows
+
+    def to_dict(self) -> Dict:
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'total': self.total().to_dict(),
+            'topics': [
+                dict(topic=topic, type=msg_type, **self.stats[(topic, msg_type)].to_dict())
+                for topic, msg_type in sorted(self.stats)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TopicReport":
+        report = cls()
+        for item in data.get('topics', []):
+            report.stats[(item['topic'], item['type'])] = TopicStats.from_dict(item)
+        return report
+
+    def save_json(self, path: str):
+        temp_path = path + ".part"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+
+def report_path_for(output_path: str) -> str:
+    """JSON 汇总报告与输出文件放在一起：'输出文件名_汇总.json'"""
+    return os.path.splitext(output_path)[0] + "_汇总.json"
+
+
+class DecodeConverter:
+    """
+    Excel 转码流程（与界面无关，图形界面和命令行共用）
+    
+    解码失败、提示信息和进度通过回调上报（未设置回调时保留前几条失败信息）；
+    cancel_event 被设置后在下一次进度检查时停止，返回"已取消处理"。
+    workers 大于 1 时多进程解码；output_format 为 OUTPUT_FORMATS 中的输出格式，
+    xlsx 输出超过行数上限时按 xlsx_split 拆分为多个工作表（'sheet'）或多个文件（'file'）。
+    
+    incremental 为 True 时在输入文件旁保存处理记录（已处理行数、这些行的内容哈希、
+    输出文件）；再次处理同一文件时，如果只是在末尾新增了行，则只解码新增的行并
+    追加到上次的输出。只支持单工作表的文件。
+    
+    build_index 为 True 时在解码的同一遍中为解码的行建立 MessageIndex（message_index），
+    供界面按 Topic、通讯类型和时间浏览；增量处理时只包含本次新增的行。
+    索引保存每行的原始数据，内存随行数增长，默认不建立（命令行、批量与监视模式都不建立）。
+    build_report 为 True 时同时按 Topic 与通讯类型汇总（report）：xlsx 输出写入
+    'Topic汇总' 工作表，其他格式另存为 '输出文件名_汇总.json'；增量处理时接着上次的汇总累计。
+    """
+
+    # 未设置失败回调时保留的失败信息条数
+    MAX_KEPT_WARNINGS = 20
+
+    def __init__(self, workers: int = 1, cancel_event: Optional[threading.Event] = None,
+                 on_warning: Optional[Callable[[str], None]] = None,
+                 on_info: Optional[Callable[[str], None]] = None,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 output_format: str = 'xlsx', xlsx_split: str = 'sheet', incremental: bool = False,
+                 build_index: bool = False, build_report: bool = False):
+        self.workers = max(1, workers)
+        self.build_index = build_index
+        self.build_report = build_report
+        self.output_format = output_format
+        self.xlsx_split = xlsx_split
+        self.incremental = incremental
+        self.cancel_event = cancel_event or threading.Event()
+        self.on_warning = on_warning
+        self.on_info = on_info
+        self.on_progress = on_progress
+        # 最近一次转换的解码失败行数与保留的失败信息
+        self.error_count = 0
+        self.warnings: List[str] = []
+        # 已上报过失败信息的最大行号；CSV 改为逐行重读时，不超过 quiet_through 的行不再重复上报
+        self.warned_through = 0
+        self.quiet_through = 0
+        # 最近一次转换实际写出的文件（增量处理时为上次的输出）
+        self.output_paths: List[str] = []
+        self.message_index: Optional[MessageIndex] = None
+        self.report: Optional[TopicReport] = None
+        # 汇总所在的文件（xlsx 为包含汇总工作表的输出文件）
+        self.report_path: Optional[str] = None
+
+    def report_warning(self, message: str):
+        if self.on_warning is not None:
+            self.on_warning(message)
+        elif len(self.warnings) < self.MAX_KEPT_WARNINGS:
+            self.warnings.append(message)
+
+    def report_info(self, message: str):
+        if self.on_info is not None:
+            self.on_info(message)
+
+    def report_progress(self, done: int, total: int):
+        if self.on_progress is not None:
+            self.on_progress(done, total)
+
+    def process_file(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """
+        按扩展名转换一个文件
+        
+        Returns:
+            (success, message, processed_count): 成功标志、消息、处理的行数
+        """
+        self.error_count = 0
+        self.warnings = []
+        self.warned_through = 0
+        self.quiet_through = 0
+        self.output_paths = [output_path]
+        self._reset_accumulators()
+        self.report_path = None
+        file_ext = os.path.splitext(input_path)[1].lower()
+        if file_ext == '.xlsx':
+            return self.process_xlsx(input_path, output_path)
+        if file_ext == '.xls':
+            return self.process_xls(input_path, output_path)
+        if file_ext in CSV_EXTENSIONS:
+            return self.process_csv(input_path, output_path)
+        return False, f"不支持的文件格式: {file_ext}", 0
+    
+    def process_xlsx(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """
+        处理 .xlsx 文件（流式读写）
+        
+        单工作表的文件直接解析工作表 XML（XlsxSheetReader），
+        其他情况以 openpyxl 只读模式逐行读取；输出由写入器逐行写出，
+        内存占用不随行数增长。
+        
+        Returns:
+            (success, message, processed_count): 成功标志、消息、处理的行数
+        """
+        if not OPENPYXL_AVAILABLE:
+            return False, "openpyxl 库未安装，无法处理 .xlsx 文件", 0
+        
+        try:
+            try:
+                return self._process_xlsx_fast(input_path, output_path)
+            except UnsupportedWorkbook as e:
+                self.report_info(f"ℹ️  {e}，改用 openpyxl 读取\n")
+            self._reset_accumulators()
+            # 快速路径可能读到中途才放弃（如共享公式）；它只处理单工作表的文件，
+            # 行号与 openpyxl 读取的当前工作表一致，已上报过的行不再重复上报
+            self.quiet_through = self.warned_through
+            if self.incremental:
+                self.report_info("ℹ️  增量处理只支持单工作表的文件，本次完整处理\n")
+                if os.path.exists(manifest_path(input_path)):
+                    os.remove(manifest_path(input_path))
+            return self._process_xlsx_openpyxl(input_path, output_path)
+        except Exception as e:
+            return False, f"处理 .xlsx 文件时出错: {str(e)}", 0
+    
+    def _reset_accumulators(self):
+        """重新开始建立索引与汇总（快速路径中途放弃时已累计的部分不完整）"""
+        self.message_index = MessageIndex() if self.build_index else None
+        self.report = TopicReport() if self.build_report else None
+    
+    def process_csv(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """
+        处理 .csv/.tsv 文件（与 Excel 相同：第四列解码写入第五列）
+        
+        文件以内存映射按字节区间切分，多个区间并行解析和解码；字段内含换行
+        （区间边界可能落在字段中间）或增量处理时改为逐行读取。
+        
+        Returns:
+            (success, message, processed_count): 成功标志、消息、处理的行数
+        """
+        try:
+            with CsvInputReader(input_path) as reader:
+                if not self.incremental:
+                    try:
+                        return self._process_csv_ranges(reader, output_path)
+                    except UnsupportedWorkbook as e:
+                        self.report_info(f"ℹ️  {e}，改为逐行读取\n")
+                        self._reset_accumulators()
+                        # 按区间读取时已上报的行号与逐行读取一致，这些行的失败信息不再重复上报
+                        self.quiet_through = self.warned_through
+                return self._process_sheet(input_path, output_path, reader)
+        except Exception as e:
+            return False, f"处理 CSV 文件时出错: {str(e)}", 0
+    
+    def _process_csv_ranges(self, reader: CsvInputReader, output_path: str) -> Tuple[bool, str, int]:
+        def write(writer: OutputWriter, decoder: ParallelDecoder):
+            writer.add_sheet(reader.title)
+            error = self._write_header(reader.header, writer, reader.row_count())
+            if error:
+                return error, 0, 0
+            return self._write_batches(reader.decode_batches(decoder), writer, reader.row_count())
+        
+        return self._write_output(output_path, write)
+    
+    def _write_output(self, output_path: str,
+                      write: Callable[[OutputWriter, ParallelDecoder], Tuple[Optional[str], int, int]],
+                      resume_from: Optional[List[str]] = None) -> Tuple[bool, str, int]:
+        """创建写入器与解码器并执行 write，完成时保存，失败、取消或异常时丢弃输出"""
+        writer = create_output_writer(self.output_format, output_path, self.xlsx_split, self.report_info,
+                                      resume_from)
+        decoder = ParallelDecoder(self.workers, style=writer.decode_style)
+        try:
+            error, processed_count, error_count = write(writer, decoder)
+            if error:
+                writer.discard()
+                return False, error, processed_count
+            if self.report is not None and writer.report_in_output:
+                writer.add_report(self.report.rows())
+            
+            # 保存文件
+            writer.save()
+        except BaseException:
+            writer.discard()
+            raise
+        self.output_paths = writer.output_paths()
+        if self.report is not None:
+            if writer.report_in_output:
+                self.report_path = self.output_paths[-1]
+            else:
+                self.report_path = report_path_for(output_path)
+                self.report.save_json(self.report_path)
+        return True, self._summary_message(processed_count, error_count, decoder), processed_count
+    
+    def _process_xlsx_fast(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """快速路径：直接解析工作表 XML，不支持的结构抛出 UnsupportedWorkbook"""
+        with XlsxSheetReader(input_path) as reader:
+            return self._process_sheet(input_path, output_path, reader)
+    
+    def _process_sheet(self, input_path: str, output_path: str, reader: SheetReader) -> Tuple[bool, str, int]:
+        """
+        解码单工作表的输入（reader.read() 每次调用都从表头开始重新读取）
+        
+        增量模式下先尝试接着上次的输出追加，不满足条件时完整处理并更新处理记录。
+        """
+        if self.incremental:
+            result = self._resume_sheet(input_path, output_path, reader)
+            if result is not None:
+                return result
+        
+        hasher = PrefixHasher()
+        header, batches = reader.read()
+        if self.incremental:
+            if header is not None:
+                hasher.update(header)
+            batches = hasher.wrap_batches(batches)
+        
+        def write(writer: OutputWriter, decoder: ParallelDecoder):
+            writer.add_sheet(reader.title)
+            return self._decode_sheet(header, batches, writer, reader.row_count(), decoder)
+        
+        result = self._write_output(output_path, write)
+        if self.incremental and result[0]:
+            self._save_manifest(input_path, hasher)
+        return result
+    
+    def _resume_sheet(self, input_path: str, output_path: str,
+                      reader: SheetReader) -> Optional[Tuple[bool, str, int]]:
+        """
+        增量处理：输入的前 N 行与上次处理记录一致时，只解码之后的行并追加到上次的输出
+        
+        output_path 与上次的输出不同时，上次的输出（及附件、汇总）转移到 output_path 后再追加。
+        
+        Returns:
+            处理结果；没有可用的处理记录或已处理的部分有变化时返回 None（需要完整处理）
+        """
+        manifest = load_manifest(input_path)
+        if manifest is None:
+            return None
+        outputs = [os.path.abspath(path) for path in manifest.get('outputs') or []]
+        output_path = os.path.abspath(output_path)
+        if (manifest.get('output_format') != self.output_format
+                or (self.output_format == 'xlsx' and manifest.get('xlsx_split') != self.xlsx_split)
+                or not outputs or not all(os.path.exists(path) for path in outputs)):
+            self.report_info("ℹ️  上次的输出文件不存在或输出设置不同，本次完整处理\n")
+            return None
+        
+        # 逐行比对上次处理过的部分（表头 + 已处理的数据行），新增的行从所在批的中间开始
+        previous_rows = int(manifest.get('rows', 0))
+        hasher = PrefixHasher()
+        header, batches = reader.read()
+        rest: List[RowBatch] = []
+        if header is not None:
+            hasher.update(header)
+            for batch in batches:
+                needed = previous_rows + 1 - hasher.rows
+                if needed >= len(batch):
+                    hasher.update_batch(batch)
+                    continue
+                hasher.update_batch(batch.slice(0, needed))
+                rest.append(batch.slice(needed))
+                break
+        if hasher.rows <= previous_rows or hasher.hexdigest() != manifest.get('sha256'):
+            self.report_info(f"ℹ️  输入文件中上次处理过的 {previous_rows} 行有变化，本次完整处理\n")
+            return None
+        
+        if self.report is not None:
+            if not isinstance(manifest.get('report'), dict):
+                self.report_info("ℹ️  上次处理时没有生成 Topic 汇总，本次完整处理\n")
+                return None
+            self.report = TopicReport.from_dict(manifest['report'])
+        
+        new_batches = itertools.chain(rest, batches)
+        first_new = next(new_batches, None)
+        if first_new is None and output_path == outputs[0]:
+            self.output_paths = outputs
+            self.report_progress(0, 0)
+            return True, f"没有新增的行（上次已处理 {previous_rows} 行），输出文件未变化", 0
+        
+        if output_path != outputs[0]:
+            self.report_info(f"ℹ️  增量处理：上次的输出 {outputs[0]} 转移到 {output_path}\n")
+        self.report_info(f"ℹ️  增量处理：跳过上次已处理的 {previous_rows} 行，新增的行追加到 {output_path}\n")
+        if first_new is not None:
+            new_batches = itertools.chain([first_new], new_batches)
+        new_batches = hasher.wrap_batches(new_batches)
+        
+        def write(writer: OutputWriter, decoder: ParallelDecoder):
+            writer.add_sheet(reader.title)
+            return self._decode_sheet(header, new_batches, writer, max(0, reader.row_count() - previous_rows),
+                                      decoder)
+        
+        result = self._write_output(output_path, write, resume_from=outputs)
+        if result[0]:
+            self._remove_previous_outputs(outputs)
+            self._save_manifest(input_path, hasher)
+        return result
+    
+    def _remove_previous_outputs(self, outputs: List[str]):
+        """输出换了位置时，删除已转移到新输出中的上次输出与汇总"""
+        current = {os.path.abspath(path) for path in self.output_paths}
+        stale = [path for path in outputs if path not in current]
+        if self.report_path is not None:
+            previous_report = report_path_for(outputs[0])
+            if os.path.abspath(self.report_path) != previous_report:
+                stale.append(previous_report)
+        for path in stale:
+            if os.path.exists(path):
+                os.remove(path)
+    
+    def _save_manifest(self, input_path: str, hasher: PrefixHasher):
+        save_manifest(input_path, {
+            'version': 1,
+            'output_format': self.output_format,
+            'xlsx_split': self.xlsx_split,
+            # 绝对路径：从其他工作目录再次处理时也能找到上次的输出
+            'outputs': [os.path.abspath(path) for path in self.output_paths],
+            # 已处理的数据行数（不含表头）与表头加这些行的内容哈希
+            'rows': max(0, hasher.rows - 1),
+            'sha256': hasher.hexdigest(),
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+            # Topic 汇总的累计状态，增量处理时接着累计
+            'report': self.report.to_dict() if self.report is not None else None,
+        })
+    
+    def _process_xlsx_openpyxl(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """
+        openpyxl 只读模式：当前工作表解码，其他工作表原样复制单元格的值
+        （只写模式不保留单元格样式；单工作表的输出格式只输出当前工作表）
+        """
+        # 只读模式：按需解析工作表 XML，不在内存中保留单元格对象
+        workbook = openpyxl.load_workbook(input_path, read_only=True)
+        
+        def write(writer: OutputWriter, decoder: ParallelDecoder):
+            result = None, 0, 0
+            active_title = workbook.active.title
+            for sheet in workbook.worksheets:
+                if sheet.title != active_title and not writer.multi_sheet:
+                    continue
+                reader = OpenpyxlSheetReader(sheet)
+                writer.add_sheet(reader.title)
+                header, batches = reader.read()
+                
+                if sheet.title != active_title:
+                    if header is not None:
+                        writer.append(header)
+                    for batch in batches:
+                        writer.append_batch(batch)
+                    continue
+                
+                result = self._decode_sheet(header, batches, writer, reader.row_count(), decoder)
+                if result[0]:
+                    break
+            return result
+        
+        try:
+            return self._write_output(output_path, write)
+        finally:
+            # 只读模式会一直占用文件句柄，需要显式关闭
+            workbook.close()
+    
+    def _decode_sheet(self, header: Optional[List], batches: Iterator[RowBatch], writer: OutputWriter,
+                      total_rows: int, decoder: ParallelDecoder) -> Tuple[Optional[str], int, int]:
+        """
+        检查表头，逐批解码第四列写入第五列，结果交给写入器
+        
+        Returns:
+            (error, processed_count, error_count): error 为 None 表示完成，否则为失败或取消的原因
+        """
+        error = self._write_header(header, writer, total_rows)
+        if error:
+            return error, 0, 0
+        
+        # 按原始顺序取回每批的解码结果
+        return self._write_batches(decoder.decode_batches(batches), writer, total_rows)
+    
+    def _write_header(self, header: Optional[List], writer: OutputWriter, total_rows: int) -> Optional[str]:
+        """检查表头并写出（只有 4 列时添加第五列表头），返回错误原因或 None"""
+        # 检查是否有表头
+        if header is None:
+            return "Excel 文件为空"
+        
+        # 检查列数
+        header = list(header)
+        if len(header) < 4:
+            return "Excel 文件列数不足，至少需要4列（时间、通讯类型、Topic、数据）"
+        
+        # 如果只有4列，添加第五列表头
+        if len(header) == 4:
+            header.append("解码数据")
+        writer.append(header)
+        
+        # 写入前按预计行数检查输出格式的限制
+        writer.expect_rows(total_rows)
+        return None
+    
+    def _write_batches(self, decoded: Iterator[Tuple[RowBatch, List[Optional[Tuple[bool, str]]]]],
+                       writer: OutputWriter, total_rows: int) -> Tuple[Optional[str], int, int]:
+        """把按顺序解码的 (批, 结果) 写入第五列并交给写入器，每批上报进度并检查取消"""
+        processed_count = 0
+        error_count = 0
+        done = 0
+        index = self.message_index
+        report = self.report
+        for batch, results in decoded:
+            if index is not None:
+                index.add_batch(batch, results)
+            if report is not None:
+                report.add_batch(batch, results)
+            
+            # 写入第五列（索引为4，即E列）
+            batch.ensure_width(5)
+            decoded_column = batch.columns[4]
+            for position, result in enumerate(results):
+                if result is None:
+                    continue
+                success, decoded_str = result
+                if success:
+                    decoded_column[position] = decoded_str
+                    processed_count += 1
+                else:
+                    error_count += 1
+                    if batch.first_row + position > self.quiet_through:
+                        self.report_warning(f"⚠️  第 {batch.first_row + position} 行解码失败: {decoded_str}\n")
+            self.warned_through = max(self.warned_through, batch.first_row + len(batch) - 1)
+            
+            writer.append_batch(batch)
+            done += len(batch)
+            self.report_progress(done, total_rows)
+            if self.cancel_event.is_set():
+                # 输出尚未保存，由调用方丢弃，不会留下不完整的输出文件
+                return "已取消处理", processed_count, error_count
+        
+        # 实际行数以读取结果为准
+        self.report_progress(done, done)
+        if index is not None:
+            index.finish()
+        self.error_count = error_count
+        return None, processed_count, error_count
+    
+    @staticmethod
+    def _summary_message(processed_count: int, error_count: int, decoder: ParallelDecoder) -> str:
+        return (f"处理完成！成功: {processed_count} 行，失败: {error_count} 行\n"
+                f"{decoder.cache.summary()}")
+    
+    def process_xls(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
+        """
+        处理 .xls 文件（xlrd 读取第一个工作表，结果交给写入器；
+        未安装 openpyxl 时 xlsx 输出由 xlwt 写出）
+        
+        Returns:
+            (success, message, processed_count): 成功标志、消息、处理的行数
+        """
+        if not XLRD_AVAILABLE:
+            return False, "xlrd/xlwt 库未安装，无法处理 .xls 文件", 0
+        
+        try:
+            # 读取工作簿
+            workbook = xlrd.open_workbook(input_path)
+            reader = XlrdSheetReader(workbook.sheet_by_index(0), workbook.datemode)
+            return self._process_sheet(input_path, output_path, reader)
+        except Exception as e:
+            return False, f"处理 .xls 文件时出错: {str(e)}", 0
+
+
+def generate_output_filename(input_path: str, output_dir: Optional[str] = None,
+                             output_format: str = 'xlsx') -> str:
+    """生成输出文件名：'原文件名_转码_时间戳.xlsx'（扩展名随输出格式），默认与输入文件在同一目录"""
+    # 获取文件目录和文件名（不含扩展名）
+    file_dir = output_dir or os.path.dirname(input_path)
+    file_name = os.path.splitext(os.path.basename(input_path))[0]
+    
+    # 生成时间戳
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    
+    # 生成输出文件名
+    output_filename = f"{file_name}_转码_{timestamp}{OUTPUT_FORMATS[output_format]}"
+    return os.path.join(file_dir, output_filename)
+
+
+class MessageBrowser:
+    """
+    解码结果浏览面板：按 Topic、通讯类型和时间范围筛选，
+    列表只创建可见的行（虚拟滚动），百万行也能流畅浏览；
+    选中一行时在下方显示格式化后的解码内容。
+    """
+    
+    VISIBLE_ROWS = 15
+    PREVIEW_CHARS = 120
+    ALL = "全部"
+    EMPTY_HINT = "勾选 '建立消息浏览索引' 后转码，完成后可在此浏览解码结果"
+    
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent, padding="5")
+        self.index: Optional[MessageIndex] = None
+        self.rows: Sequence[int] = []
+        self.offset = 0
+        # 可见行的预览与选中行的详情按需解码，结果缓存
+        self.preview_cache = DecodeCache(5000)
+        
+        # 筛选条件
+        filter_frame = ttk.Frame(self.frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(filter_frame, text="Topic:").pack(side=tk.LEFT)
+        self.topic_var = tk.StringVar(value=self.ALL)
+        self.topic_box = ttk.Combobox(filter_frame, textvariable=self.topic_var, width=24)
+        self.topic_box.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="通讯类型:").pack(side=tk.LEFT)
+        self.type_var = tk.StringVar(value=self.ALL)
+        self.type_box = ttk.Combobox(filter_frame, textvariable=self.type_var, width=8, state='readonly')
+        self.type_box.pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Label(filter_frame, text="时间从:").pack(side=tk.LEFT)
+        self.start_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.start_var, width=17).pack(side=tk.LEFT, padx=(2, 2))
+        ttk.Label(filter_frame, text="到:").pack(side=tk.LEFT)
+        self.end_var = tk.StringVar()
+        ttk.Entry(filter_frame, textvariable=self.end_var, width=17).pack(side=tk.LEFT, padx=(2, 8))
+        ttk.Button(filter_frame, text="查询", command=self.apply_filter).pack(side=tk.LEFT)
+        ttk.Button(filter_frame, text="重置", command=self.reset_filter).pack(side=tk.LEFT, padx=(5, 0))
+        self.topic_box.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+        self.topic_box.bind("<Return>", lambda event: self.apply_filter())
+        self.type_box.bind("<<ComboboxSelected>>", lambda event: self.apply_filter())
+        
+        # 列表：固定行数的 Treeview，滚动时只替换可见行的内容
+        columns = ("row", "time", "type", "topic", "preview")
+        self.tree = ttk.Treeview(self.frame, columns=columns, show='headings',
+                                 height=self.VISIBLE_ROWS, selectmode='browse')
+        for column, title, width, stretch in (("row", "行号", 60, False), ("time", "时间", 140, False),
+                                              ("type", "类型", 50, False), ("topic", "Topic", 160, False),
+                                              ("preview", "解码内容", 300, True)):
+            self.tree.heading(column, text=title)
+            self.tree.column(column, width=width, stretch=stretch)
+        self.tree.tag_configure('failed', foreground="red")
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_to(self.offset + 3))
+        self.tree.bind("<Up>", lambda event: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll_to(self.offset - self.VISIBLE_ROWS))
+        self.tree.bind("<Next>", lambda event: self.scroll_to(self.offset + self.VISIBLE_ROWS))
+        
+        self.count_label = ttk.Label(self.frame, text=self.EMPTY_HINT, foreground="gray")
+        self.count_label.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 5))
+        
+        # 选中行的完整解码内容
+        self.detail_text = scrolledtext.ScrolledText(self.frame, height=8, wrap=tk.WORD)
+        self.detail_text.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+        self.frame.rowconfigure(3, weight=1)
+    
+    def load(self, index: MessageIndex):
+        """显示新的解码结果"""
+        self.index = index
+        self.preview_cache = DecodeCache(5000)
+        self.topic_box.config(values=[self.ALL] + index.topics_by_count())
+        self.type_box.config(values=[self.ALL] + sorted(index.types))
+        self.reset_filter()
+    
+    def clear(self):
+        """清空显示并释放上一次的索引"""
+        self.index = None
+        self.rows = []
+        self.offset = 0
+        self.preview_cache = DecodeCache(5000)
+        self.tree.delete(*self.tree.get_children())
+        self.scrollbar.set(0, 1)
+        self.detail_text.delete(1.0, tk.END)
+        self.count_label.config(text=self.EMPTY_HINT)
+    
+    def reset_filter(self):
+        self.topic_var.set(self.ALL)
+        self.type_var.set(self.ALL)
+        self.start_var.set("")
+        self.end_var.set("")
+        self.apply_filter()
+    
+    def apply_filter(self):
+        if self.index is None:
+            return
+        topic = self.topic_var.get().strip()
+        msg_type = self.type_var.get()
+        started = time.perf_counter()
+        self.rows = self.index.query(
+            topic=None if topic in ("", self.ALL) else topic,
+            msg_type=None if msg_type in ("", self.ALL) else msg_type,
+            start=self.start_var.get().strip() or None,
+            end=self.end_var.get().strip() or None,
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.count_label.config(
+            text=f"共 {len(self.index)} 条消息，符合条件 {len(self.rows)} 条（查询 {elapsed_ms:.0f} 毫秒）"
+        )
+        self.detail_text.delete(1.0, tk.END)
+        self.offset = 0
+        self.render()
+    
+    def render(self):
+        """只为可见的行创建列表项"""
+        self.tree.delete(*self.tree.get_children())
+        index = self.index
+        end = min(len(self.rows), self.offset + self.VISIBLE_ROWS)
+        for item, position in enumerate(self.rows[self.offset:end]):
+            failed = index.failed[position]
+            self.tree.insert("", tk.END, iid=str(item), tags=('failed',) if failed else (), values=(
+                index.row_numbers[position], index.times[position], index.types[index.type_codes[position]],
+                index.topics[index.topic_codes[position]], self.preview(index.values[position]),
+            ))
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+    
+    def preview(self, value: str) -> str:
+        if not value:
+            return ""
+        result = self.preview_cache.get(value)
+        if result is None:
+            result = decode_base64_value(value, 'compact')
+            self.preview_cache.put(value, result)
+        text = result[1] if result[0] else f"⚠️ {result[1]}"
+        return text[:self.PREVIEW_CHARS].replace("\n", " ")
+    
+    def scroll_to(self, offset: int):
+        offset = max(0, min(offset, len(self.rows) - self.VISIBLE_ROWS))
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+        return "break"
+    
+    def on_scroll(self, action: str, amount: str, unit: Optional[str] = None):
+        """滚动条回调：拖动（moveto）或按行/按页滚动（scroll）"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        elif action == 'scroll':
+            step = self.VISIBLE_ROWS if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(amount) * step)
+    
+    def on_mousewheel(self, event):
+        # Windows 每格 120，macOS 为较小的增量
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll_to(self.offset - delta * 3)
+    
+    def move_selection(self, step: int):
+        """键盘上下移动选中行，到达可见区域边缘时滚动列表"""
+        selection = self.tree.selection()
+        item = int(selection[0]) + step if selection else 0
+        if item < 0 or item >= self.VISIBLE_ROWS:
+            before = self.offset
+            self.scroll_to(self.offset + step)
+            item = min(max(item, 0), self.VISIBLE_ROWS - 1) if self.offset != before else int(selection[0])
+        if self.tree.exists(str(item)):
+            self.tree.selection_set(str(item))
+        return "break"
+    
+    def on_select(self, event=None):
+        selection = self.tree.selection()
+        if not selection or self.index is None:
+            return
+        position = self.rows[self.offset + int(selection[0])]
+        value = self.index.values[position]
+        success, decoded_str = decode_base64_value(value) if value else (False, "（数据列为空）")
+        self.detail_text.delete(1.0, tk.END)
+        self.detail_text.insert(tk.END, decoded_str if success else f"⚠️ {decoded_str}\n\n原始数据:\n{value}")
 
 
 class TencentDecodeTool:
+    # 界面从队列取进度和日志的间隔（毫秒）
+    POLL_INTERVAL_MS = 100
+    # 日志区最多显示的解码失败条数，其余只计数
+    MAX_LOGGED_WARNINGS = 1000
+    
     def __init__(self, root):
         self.root = root
         self.root.title("腾讯云转码工具")
@@ -69,8 +2452,17 @@ class TencentDecodeTool:
         # 选中的文件路径
         self.selected_file_path = None
         
+        # 后台处理相关：工作线程通过队列把进度和日志交给界面线程
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="decode")
+        self.ui_queue: "queue.Queue" = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.running = False
+        self.started_at = 0.0
+        self.warning_count = 0
+        
         # 创建界面
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_widgets(self):
         """创建界面组件"""
@@ -86,8 +2478,9 @@ class TencentDecodeTool:
             "本工具用于处理腾讯云相关的 Excel 数据文件。\n"
             "功能：将 Excel 文件第四列（数据列）的 Base64 编码内容进行解码，"
             "并在第五列显示解码后的内容。\n"
-            "支持格式：.xlsx 和 .xls\n"
-            "输出文件：自动生成，格式为 '原文件名_转码_时间戳.xlsx'"
+            "支持格式：.xlsx、.xls，以及 .csv/.tsv 导出文件\n"
+            "输出文件：自动生成，格式为 '原文件名_转码_时间戳.xlsx'；\n"
+            "也可输出 CSV、JSONL（解码内容为 JSON 对象）或 Parquet，大文件比 xlsx 快得多"
         )
         info_label = ttk.Label(info_frame, text=info_text, justify=tk.LEFT, foreground="blue")
         info_label.grid(row=0, column=0, sticky=tk.W)
@@ -101,6 +2494,7 @@ class TencentDecodeTool:
             "2. 确认文件路径显示正确\n"
             "3. 点击 '开始转码' 按钮执行处理\n"
             "4. 处理完成后，查看处理结果和输出文件路径\n"
+            "5. 在 '消息浏览' 标签页按 Topic、通讯类型和时间筛选解码后的消息\n"
             "注意：Excel 文件应包含表头（时间、通讯类型、Topic、数据），"
             "数据从第二行开始\n"
             "💡 提示：可以点击下方 '查看示例文件' 按钮查看转换前后的示例"
@@ -133,6 +2527,62 @@ class TencentDecodeTool:
         )
         self.process_btn.grid(row=1, column=1, sticky=tk.W, padx=(10, 0))
         
+        # 取消按钮（处理过程中可用）
+        self.cancel_btn = ttk.Button(
+            file_frame,
+            text="取消",
+            command=self.cancel_processing,
+            state='disabled'
+        )
+        self.cancel_btn.grid(row=1, column=2, sticky=tk.W, padx=(10, 0))
+        
+        # 解码进程数（大文件时按 CPU 核数并行解码）
+        workers_frame = ttk.Frame(file_frame)
+        workers_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        ttk.Label(workers_frame, text="解码进程数:").pack(side=tk.LEFT)
+        self.workers_var = tk.IntVar(value=default_decode_workers())
+        ttk.Spinbox(
+            workers_frame, from_=1, to=max(64, default_decode_workers()),
+            textvariable=self.workers_var, width=5
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(
+            workers_frame, text=f"（本机 {default_decode_workers()} 核，1 表示不使用多进程）", foreground="gray"
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # 输出格式（xlsx 供人工查看，其余格式供脚本处理，写出速度快）
+        format_frame = ttk.Frame(file_frame)
+        format_frame.grid(row=3, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        ttk.Label(format_frame, text="输出格式:").pack(side=tk.LEFT)
+        self.format_var = tk.StringVar(value='xlsx')
+        ttk.Combobox(
+            format_frame, textvariable=self.format_var, values=list(OUTPUT_FORMATS),
+            state='readonly', width=8
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(
+            format_frame, text="（csv/jsonl/parquet 适合脚本处理，parquet 需要 pyarrow）", foreground="gray"
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # 增量处理：同一个不断追加的导出文件多次处理时，只解码新增的行
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            file_frame, text="增量处理（文件只在末尾新增了行时，只解码新增的行并追加到上次的输出）",
+            variable=self.incremental_var
+        ).grid(row=4, column=0, columnspan=3, sticky=tk.W, pady=(10, 0))
+        
+        # Topic 汇总：每个 Topic 与通讯类型的消息数、数据大小分布、失败率和首末时间
+        self.report_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            file_frame, text="生成 Topic 汇总（xlsx 输出为 'Topic汇总' 工作表，其他格式为 '_汇总.json'）",
+            variable=self.report_var
+        ).grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
+        # 消息浏览索引保存每行的原始数据，内存随行数增长，只在需要浏览时建立
+        self.index_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            file_frame, text="建立消息浏览索引（在 '消息浏览' 标签页筛选查看；保存每行原始数据，大文件占用较多内存）",
+            variable=self.index_var
+        ).grid(row=6, column=0, columnspan=3, sticky=tk.W, pady=(5, 0))
+        
         # 示例文件区域
         example_frame = ttk.LabelFrame(main_frame, text="示例文件", padding="10")
         example_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
@@ -160,14 +2610,32 @@ class TencentDecodeTool:
         )
         self.view_after_btn.grid(row=1, column=1, sticky=tk.W)
         
+        # 进度区域
+        progress_frame = ttk.LabelFrame(main_frame, text="处理进度", padding="10")
+        progress_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 15))
+        
+        self.progress_bar = ttk.Progressbar(progress_frame, mode='determinate', maximum=100)
+        self.progress_bar.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        self.progress_label = ttk.Label(progress_frame, text="", foreground="gray")
+        self.progress_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        progress_frame.columnconfigure(0, weight=1)
+        
+        # 处理结果与消息浏览分为两个标签页
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        
         # 结果显示区域
-        result_frame = ttk.LabelFrame(main_frame, text="处理结果", padding="10")
-        result_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
+        result_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(result_frame, text="处理结果")
         
         # 结果文本框（带滚动条）
         self.result_text = scrolledtext.ScrolledText(result_frame, height=15, width=80, wrap=tk.WORD)
         self.result_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        # 解码结果浏览区域
+        self.browser = MessageBrowser(self.notebook)
+        self.notebook.add(self.browser.frame, text="消息浏览")
+        
         # 配置权重
         result_frame.columnconfigure(0, weight=1)
         result_frame.rowconfigure(0, weight=1)
@@ -188,6 +2656,7 @@ class TencentDecodeTool:
                 ("Excel 文件", "*.xlsx *.xls"),
                 ("Excel 2007+", "*.xlsx"),
                 ("Excel 2003", "*.xls"),
+                ("CSV/TSV 文件", "*.csv *.tsv"),
                 ("所有文件", "*.*")
             ]
         )
@@ -221,6 +2690,18 @@ class TencentDecodeTool:
         """清空结果"""
         self.result_text.delete(1.0, tk.END)
     
+    def report_warning(self, message: str):
+        """工作线程：记录一条解码失败信息，由界面线程批量显示"""
+        self.ui_queue.put(('warning', message))
+    
+    def report_info(self, message: str):
+        """工作线程：输出一条提示信息（不计入失败行数）"""
+        self.ui_queue.put(('log', message))
+    
+    def report_progress(self, done: int, total: int):
+        """工作线程：上报已处理行数与总行数（总行数未知时为 0）"""
+        self.ui_queue.put(('progress', (done, total)))
+    
     def decode_base64(self, encoded_str: str) -> Tuple[bool, str]:
         """
         解码 Base64 字符串
@@ -228,170 +2709,11 @@ class TencentDecodeTool:
         Returns:
             (success, decoded_str): 成功标志和解码后的字符串
         """
-        try:
-            # 去除可能的空白字符
-            encoded_str = encoded_str.strip()
-            if not encoded_str:
-                return False, "空字符串"
-            
-            # Base64 解码
-            decoded_bytes = base64.b64decode(encoded_str)
-            decoded_str = decoded_bytes.decode('utf-8')
-            
-            # 尝试格式化为 JSON（如果是 JSON 格式）
-            try:
-                json_obj = json.loads(decoded_str)
-                decoded_str = json.dumps(json_obj, ensure_ascii=False, indent=2)
-            except (json.JSONDecodeError, ValueError):
-                # 不是 JSON 格式，直接返回原始字符串
-                pass
-            
-            return True, decoded_str
-        except Exception as e:
-            return False, f"解码失败: {str(e)}"
-    
-    def process_xlsx(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
-        """
-        处理 .xlsx 文件
-        
-        Returns:
-            (success, message, processed_count): 成功标志、消息、处理的行数
-        """
-        if not OPENPYXL_AVAILABLE:
-            return False, "openpyxl 库未安装，无法处理 .xlsx 文件", 0
-        
-        try:
-            # 读取工作簿
-            workbook = openpyxl.load_workbook(input_path)
-            sheet = workbook.active
-            
-            processed_count = 0
-            error_count = 0
-            
-            # 检查是否有表头
-            if sheet.max_row < 1:
-                return False, "Excel 文件为空", 0
-            
-            # 检查是否需要添加第五列表头
-            if sheet.max_column < 4:
-                return False, "Excel 文件列数不足，至少需要4列（时间、通讯类型、Topic、数据）", 0
-            
-            # 如果只有4列，添加第五列表头
-            if sheet.max_column == 4:
-                header_cell = sheet.cell(row=1, column=5)
-                header_cell.value = "解码数据"
-            
-            # 从第二行开始处理（第一行是表头）
-            for row_idx in range(2, sheet.max_row + 1):
-                # 获取第四列的数据（索引为4，即D列）
-                data_cell = sheet.cell(row=row_idx, column=4)
-                base64_str = str(data_cell.value) if data_cell.value else ""
-                
-                if not base64_str or base64_str.strip() == "":
-                    # 空数据，跳过
-                    continue
-                
-                # 解码 Base64
-                success, decoded_str = self.decode_base64(base64_str)
-                
-                if success:
-                    # 写入第五列（索引为5，即E列）
-                    decoded_cell = sheet.cell(row=row_idx, column=5)
-                    decoded_cell.value = decoded_str
-                    processed_count += 1
-                else:
-                    error_count += 1
-                    self.log_result(f"⚠️  第 {row_idx} 行解码失败: {decoded_str}\n")
-            
-            # 保存文件
-            workbook.save(output_path)
-            workbook.close()
-            
-            message = f"处理完成！成功: {processed_count} 行，失败: {error_count} 行"
-            return True, message, processed_count
-            
-        except Exception as e:
-            return False, f"处理 .xlsx 文件时出错: {str(e)}", 0
-    
-    def process_xls(self, input_path: str, output_path: str) -> Tuple[bool, str, int]:
-        """
-        处理 .xls 文件
-        
-        Returns:
-            (success, message, processed_count): 成功标志、消息、处理的行数
-        """
-        if not XLRD_AVAILABLE:
-            return False, "xlrd/xlwt 库未安装，无法处理 .xls 文件", 0
-        
-        try:
-            # 读取工作簿
-            workbook = xlrd.open_workbook(input_path)
-            sheet = workbook.sheet_by_index(0)
-            
-            # 创建新的工作簿用于写入
-            output_workbook = xlwt.Workbook()
-            output_sheet = output_workbook.add_sheet(sheet.name)
-            
-            processed_count = 0
-            error_count = 0
-            
-            # 检查是否有数据
-            if sheet.nrows < 1:
-                return False, "Excel 文件为空", 0
-            
-            # 检查列数
-            if sheet.ncols < 4:
-                return False, "Excel 文件列数不足，至少需要4列（时间、通讯类型、Topic、数据）", 0
-            
-            # 复制所有数据并添加第五列
-            for row_idx in range(sheet.nrows):
-                # 复制所有原有列
-                for col_idx in range(sheet.ncols):
-                    cell_value = sheet.cell_value(row_idx, col_idx)
-                    output_sheet.write(row_idx, col_idx, cell_value)
-                
-                # 如果是第一行（表头），添加第五列表头（如果还没有）
-                if row_idx == 0:
-                    if sheet.ncols == 4:
-                        output_sheet.write(row_idx, 4, "解码数据")
-                else:
-                    # 从第二行开始处理数据
-                    base64_str = str(sheet.cell_value(row_idx, 3)) if sheet.ncols > 3 else ""
-                    
-                    if base64_str and base64_str.strip() != "":
-                        # 解码 Base64
-                        success, decoded_str = self.decode_base64(base64_str)
-                        
-                        if success:
-                            output_sheet.write(row_idx, 4, decoded_str)
-                            processed_count += 1
-                        else:
-                            error_count += 1
-                            self.log_result(f"⚠️  第 {row_idx + 1} 行解码失败: {decoded_str}\n")
-            
-            # 保存文件
-            output_workbook.save(output_path)
-            
-            message = f"处理完成！成功: {processed_count} 行，失败: {error_count} 行"
-            return True, message, processed_count
-            
-        except Exception as e:
-            return False, f"处理 .xls 文件时出错: {str(e)}", 0
+        return decode_base64_value(encoded_str)
     
     def generate_output_filename(self, input_path: str) -> str:
-        """生成输出文件名"""
-        # 获取文件目录和文件名（不含扩展名）
-        file_dir = os.path.dirname(input_path)
-        file_name = os.path.splitext(os.path.basename(input_path))[0]
-        
-        # 生成时间戳
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # 生成输出文件名
-        output_filename = f"{file_name}_转码_{timestamp}.xlsx"
-        output_path = os.path.join(file_dir, output_filename)
-        
-        return output_path
+        """生成输出文件名（扩展名随选择的输出格式）"""
+        return generate_output_filename(input_path, output_format=self.format_var.get())
     
     def view_example_before(self):
         """查看转换前的示例文件"""
@@ -442,6 +2764,9 @@ class TencentDecodeTool:
     
     def process_file(self):
         """处理选中的文件"""
+        if self.running:
+            return
+        
         if not self.selected_file_path:
             messagebox.showwarning("警告", "请先选择要处理的 Excel 文件")
             return
@@ -452,8 +2777,8 @@ class TencentDecodeTool:
         
         # 检查文件扩展名
         file_ext = os.path.splitext(self.selected_file_path)[1].lower()
-        if file_ext not in ['.xlsx', '.xls']:
-            messagebox.showerror("错误", f"不支持的文件格式: {file_ext}\n请选择 .xlsx 或 .xls 文件")
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            messagebox.showerror("错误", f"不支持的文件格式: {file_ext}\n请选择 .xlsx、.xls、.csv 或 .tsv 文件")
             return
         
         # 检查必要的库
@@ -465,8 +2790,21 @@ class TencentDecodeTool:
             messagebox.showerror("错误", "无法处理 .xls 文件：xlrd/xlwt 库未安装\n请运行: pip install xlrd xlwt")
             return
         
-        # 清空之前的结果
+        output_format = self.format_var.get()
+        if output_format == 'parquet' and not PYARROW_AVAILABLE:
+            messagebox.showerror("错误", "无法输出 Parquet 文件：pyarrow 库未安装\n请运行: pip install pyarrow")
+            return
+        
+        # 读取解码进程数
+        try:
+            workers = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("警告", "解码进程数必须是数字")
+            return
+        
+        # 清空之前的结果（上一次的浏览索引不再保留）
         self.clear_result()
+        self.browser.clear()
         
         # 生成输出文件名
         output_path = self.generate_output_filename(self.selected_file_path)
@@ -474,43 +2812,742 @@ class TencentDecodeTool:
         # 禁用按钮
         self.select_file_btn.config(state='disabled')
         self.process_btn.config(state='disabled')
+        self.cancel_btn.config(state='normal')
         
         self.update_status("正在处理...")
         self.log_result(f"📂 输入文件: {self.selected_file_path}\n")
         self.log_result(f"📂 输出文件: {output_path}\n")
-        self.log_result(f"📋 开始处理...\n\n")
+        self.log_result(f"📋 开始处理（解码进程数: {workers}，输出格式: {output_format}）...\n\n")
+        
+        # 重置进度
+        self.progress_bar.config(value=0)
+        self.progress_label.config(text="")
+        self.warning_count = 0
+        self.started_at = time.monotonic()
         
+        self.running = True
+        self.cancel_event.clear()
+        self.executor.submit(self._process_worker, self.selected_file_path, output_path, workers, output_format,
+                             self.incremental_var.get(), self.report_var.get(), self.index_var.get())
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_queue)
+    
+    def _process_worker(self, input_path: str, output_path: str, workers: int, output_format: str = 'xlsx',
+                        incremental: bool = False, build_report: bool = False, build_index: bool = False):
+        """后台线程：执行转换，结束信息放入队列"""
         try:
-            # 根据文件类型选择处理方法
-            if file_ext == '.xlsx':
-                success, message, count = self.process_xlsx(self.selected_file_path, output_path)
-            else:  # .xls
-                success, message, count = self.process_xls(self.selected_file_path, output_path)
-            
-            if success:
-                self.log_result(f"✅ {message}\n\n")
-                self.log_result(f"📁 输出文件已保存到: {output_path}\n")
-                self.update_status(f"处理完成 - 成功处理 {count} 行")
-                messagebox.showinfo("处理完成", f"{message}\n\n输出文件:\n{output_path}")
+            converter = DecodeConverter(
+                workers, self.cancel_event,
+                on_warning=self.report_warning, on_info=self.report_info, on_progress=self.report_progress,
+                output_format=output_format, incremental=incremental, build_index=build_index,
+                build_report=build_report
+            )
+            success, message, count = converter.process_file(input_path, output_path)
+            if success and converter.report_path:
+                self.report_info(f"📊 Topic 汇总已保存到: {converter.report_path}\n")
+            # 增量处理时实际的输出为上次的输出文件
+            self.ui_queue.put(('done', (success, message, count, "\n".join(converter.output_paths),
+                                        converter.message_index)))
+        except Exception as e:
+            self.ui_queue.put(('exception', str(e)))
+    
+    def poll_queue(self):
+        """界面线程：按固定节奏批量取出日志与进度并刷新界面"""
+        warnings = []
+        progress = None
+        finished = None
+        while finished is None:
+            try:
+                kind, payload = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'warning':
+                self.warning_count += 1
+                if self.warning_count <= self.MAX_LOGGED_WARNINGS:
+                    warnings.append(payload)
+            elif kind == 'log':
+                warnings.append(payload)
+            elif kind == 'progress':
+                progress = payload
             else:
-                self.log_result(f"❌ {message}\n")
-                self.update_status("处理失败")
-                messagebox.showerror("处理失败", message)
+                finished = (kind, payload)
         
-        except Exception as e:
-            error_msg = f"处理过程中发生异常: {str(e)}"
+        # 一次插入本轮所有失败信息，避免逐行重绘
+        if warnings:
+            self.result_text.insert(tk.END, "".join(warnings))
+            self.result_text.see(tk.END)
+        if progress is not None:
+            self.update_progress(*progress)
+        
+        if finished is not None:
+            self.finish_processing(*finished)
+        else:
+            self.root.after(self.POLL_INTERVAL_MS, self.poll_queue)
+    
+    def update_progress(self, done: int, total: int):
+        """更新进度条、速度与预计剩余时间（总行数未知时只显示已处理行数）"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        rate = done / elapsed
+        text = f"已处理: {done} 行 | {rate:.0f} 行/秒"
+        if total > 0:
+            percent = min(100.0, done * 100.0 / total)
+            self.progress_bar.config(value=percent)
+            text = f"已处理: {done} / {total} 行（{percent:.0f}%） | {rate:.0f} 行/秒"
+            if rate > 0 and done < total:
+                remaining = int((total - done) / rate)
+                text += f" | 预计剩余 {remaining // 60:02d}:{remaining % 60:02d}"
+        self.progress_label.config(text=text)
+    
+    def finish_processing(self, kind: str, payload):
+        """界面线程：处理结束后的收尾与提示"""
+        self.running = False
+        self.select_file_btn.config(state='normal')
+        self.process_btn.config(state='normal')
+        self.cancel_btn.config(state='disabled')
+        
+        if self.warning_count > self.MAX_LOGGED_WARNINGS:
+            self.log_result(f"... 另有 {self.warning_count - self.MAX_LOGGED_WARNINGS} 行解码失败未显示\n")
+        
+        if kind == 'exception':
+            error_msg = f"处理过程中发生异常: {payload}"
             self.log_result(f"❌ {error_msg}\n")
             self.update_status("处理异常")
             messagebox.showerror("异常", error_msg)
+            return
         
+        success, message, count, output_path, message_index = payload
+        if success:
+            self.progress_bar.config(value=100)
+            if message_index is not None and len(message_index):
+                self.browser.load(message_index)
+                self.log_result(f"🔎 可在 '消息浏览' 标签页按 Topic、通讯类型和时间筛选 {len(message_index)} 条消息\n")
+            self.log_result(f"✅ {message}\n\n")
+            self.log_result(f"📁 输出文件已保存到: {output_path}\n")
+            self.update_status(f"处理完成 - 成功处理 {count} 行")
+            messagebox.showinfo("处理完成", f"{message}\n\n输出文件:\n{output_path}")
+        elif self.cancel_event.is_set():
+            self.log_result(f"⏹ {message}，未生成输出文件\n")
+            self.update_status("已取消")
+        else:
+            self.log_result(f"❌ {message}\n")
+            self.update_status("处理失败")
+            messagebox.showerror("处理失败", message)
+    
+    def cancel_processing(self):
+        """请求取消：工作线程在下一次检查时停止"""
+        if self.running:
+            self.cancel_event.set()
+            self.cancel_btn.config(state='disabled')
+            self.update_status("正在取消...")
+    
+    def on_close(self):
+        """关闭窗口：通知工作线程停止，不等待其结束"""
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
+
+
+# 命令行批量模式支持的输入格式
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls') + CSV_EXTENSIONS
+
+
+def is_input_file(path: str) -> bool:
+    """支持的输入文件：跳过本工具生成的 "_转码_" 文件和 Excel 的临时文件"""
+    name = os.path.basename(path)
+    return (os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS
+            and "_转码_" not in name and not name.startswith("~$"))
+
+
+def collect_input_files(patterns: List[str], recursive: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    展开命令行给出的文件、通配符和目录
+    
+    目录中只取 .xlsx/.xls/.csv/.tsv 文件，跳过本工具生成的 "_转码_" 文件和 Excel 的临时文件。
+    
+    Returns:
+        (files, unmatched): 去重后的文件列表、没有匹配到任何文件的参数
+    """
+    files: List[str] = []
+    unmatched: List[str] = []
+    
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            walker = os.walk(pattern) if recursive else [(pattern, [], os.listdir(pattern))]
+            matched = [os.path.join(root, name) for root, _, names in walker for name in sorted(names)]
+            matched = [path for path in matched if os.path.isfile(path) and is_input_file(path)]
+        elif glob.has_magic(pattern):
+            matched = [path for path in sorted(glob.glob(pattern, recursive=recursive))
+                       if os.path.isfile(path) and is_input_file(path)]
+        else:
+            # 明确指定的文件不做过滤，不支持的格式由转换时报错
+            matched = [pattern] if os.path.isfile(pattern) else []
+        if not matched:
+            unmatched.append(pattern)
+        files.extend(matched)
+    
+    # 去重并保持顺序
+    seen = set()
+    unique_files = []
+    for path in files:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique_files.append(path)
+    return unique_files, unmatched
+
+
+def convert_file(input_path: str, output_path: str, decode_workers: int = 1,
+                 output_format: str = 'xlsx', xlsx_split: str = 'sheet', incremental: bool = False,
+                 build_report: bool = False) -> Dict:
+    """转换一个文件并返回结果汇总（进程池任务，也可在当前进程直接调用）"""
+    started = time.monotonic()
+    infos: List[str] = []
+    converter = DecodeConverter(decode_workers, on_info=infos.append,
+                                output_format=output_format, xlsx_split=xlsx_split, incremental=incremental,
+                                build_report=build_report)
+    try:
+        success, message, count = converter.process_file(input_path, output_path)
+    except Exception as e:
+        success, message, count = False, f"处理过程中发生异常: {e}", 0
+    return {
+        'input': input_path,
+        'output': ", ".join(converter.output_paths),
+        'success': success,
+        'message': message,
+        'processed': count,
+        'errors': converter.error_count,
+        'warnings': converter.warnings,
+        'infos': infos,
+        'report': converter.report_path,
+        'seconds': time.monotonic() - started,
+    }
+
+
+def result_lines(result: Dict, show_warnings: int) -> List[str]:
+    """convert_file 结果的输出行：成功/失败一行，其后为提示、汇总文件和前几条解码失败"""
+    if result['success']:
+        lines = [f"✅ {result['input']} -> {result['output']}（成功 {result['processed']} 行，"
+                 f"失败 {result['errors']} 行，{result['seconds']:.1f} 秒）"]
+    else:
+        lines = [f"❌ {result['input']}: {result['message']}"]
+    lines.extend(f"    {info.rstrip()}" for info in result['infos'])
+    if result['report']:
+        lines.append(f"    📊 Topic 汇总: {result['report']}")
+    lines.extend(f"    {warning.rstrip()}" for warning in result['warnings'][:show_warnings])
+    return lines
+
+
+def plan_workers(file_count: int, jobs: Optional[int], decode_workers: Optional[int]) -> Tuple[int, int]:
+    """
+    分配进程：文件多时每个进程处理一个文件；文件少于 CPU 核数时
+    剩余的核用于单个文件内的分块解码
+    """
+    cpus = default_decode_workers()
+    jobs = max(1, min(jobs or cpus, file_count))
+    if decode_workers is None:
+        decode_workers = max(1, cpus // jobs)
+    return jobs, max(1, decode_workers)
+
+
+def run_cli(args) -> int:
+    """无界面批量模式：并行转换多个文件，输出汇总，有文件失败时返回非零"""
+    files, unmatched = collect_input_files(args.paths, args.recursive)
+    for pattern in unmatched:
+        print(f"⚠️  没有匹配的文件: {pattern}", file=sys.stderr)
+    if not files:
+        print("❌ 没有要处理的文件", file=sys.stderr)
+        return 2
+    if args.format == 'parquet' and not PYARROW_AVAILABLE:
+        print("❌ pyarrow 库未安装，无法输出 Parquet 文件（pip install pyarrow）", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    
+    # 输出文件名沿用图形界面的命名规则；输出到同一目录时避免同名文件互相覆盖
+    outputs = {}
+    used = set()
+    for path in files:
+        output_path = generate_output_filename(path, args.output_dir, args.format)
+        base, ext = os.path.splitext(output_path)
+        suffix = 1
+        while output_path in used:
+            suffix += 1
+            output_path = f"{base}_{suffix}{ext}"
+        used.add(output_path)
+        outputs[path] = output_path
+    
+    jobs, decode_workers = plan_workers(len(files), args.jobs, args.decode_workers)
+    print(f"📋 共 {len(files)} 个文件，并行文件数: {jobs}，每个文件解码进程数: {decode_workers}，"
+          f"输出格式: {args.format}", file=sys.stderr)
+    
+    # 大文件先处理，减少最后只剩一个大文件在跑的情况
+    files.sort(key=lambda path: os.path.getsize(path), reverse=True)
+    
+    results: List[Dict] = []
+    started = time.monotonic()
+    
+    def report(result: Dict):
+        results.append(result)
+        for line in result_lines(result, args.show_warnings):
+            print(line, file=sys.stderr)
+    
+    try:
+        if jobs == 1:
+            for path in files:
+                report(convert_file(path, outputs[path], decode_workers, args.format, args.split,
+                                    args.incremental, args.report))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = [pool.submit(convert_file, path, outputs[path], decode_workers, args.format, args.split,
+                                       args.incremental, args.report)
+                           for path in files]
+                for future in as_completed(futures):
+                    report(future.result())
+    except KeyboardInterrupt:
+        print("\n已中断", file=sys.stderr)
+        return 130
+    
+    elapsed = max(time.monotonic() - started, 1e-6)
+    failed = [result for result in results if not result['success']]
+    rows = sum(result['processed'] for result in results)
+    row_errors = sum(result['errors'] for result in results)
+    print(
+        f"\n汇总: {len(results)} 个文件，成功 {len(results) - len(failed)}，失败 {len(failed)} | "
+        f"解码成功 {rows} 行，解码失败 {row_errors} 行 | 耗时 {elapsed:.1f} 秒（{rows / elapsed:.0f} 行/秒）",
+        file=sys.stderr
+    )
+    for result in failed:
+        print(f"  ❌ {result['input']}: {result['message']}", file=sys.stderr)
+    return 1 if failed or unmatched else 0
+
+
+class PollingWaiter:
+    """按固定间隔轮询（非 Linux 或 inotify 不可用时；网络共享目录上 inotify 收不到其他机器的写入）"""
+    
+    name = "轮询"
+    
+    def __init__(self):
+        self.woken = threading.Event()
+    
+    def add(self, directory: str):
+        pass
+    
+    def wait(self, timeout: float) -> bool:
+        woken = self.woken.wait(timeout)
+        self.woken.clear()
+        return woken
+    
+    def wake(self):
+        """从其他线程提前结束等待"""
+        self.woken.set()
+    
+    def close(self):
+        pass
+
+
+class InotifyWaiter:
+    """
+    Linux inotify（通过 ctypes 调用 libc，不需要额外的库）
+    
+    目录中有文件新建、写完关闭或移入时提前结束等待；事件只用于唤醒，
+    文件是否写完仍以大小和修改时间不再变化为准。
+    """
+    
+    name = "inotify"
+    # IN_CREATE | IN_CLOSE_WRITE | IN_MOVED_TO
+    MASK = 0x100 | 0x08 | 0x80
+    # IN_NONBLOCK | IN_CLOEXEC
+    INIT_FLAGS = 0o4000 | 0o2000000
+    
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(self.INIT_FLAGS)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify 初始化失败")
+        self.watched = set()
+        # 其他线程写入该管道以提前结束等待
+        self.wake_read, self.wake_write = os.pipe()
+        os.set_blocking(self.wake_read, False)
+    
+    def add(self, directory: str):
+        if directory in self.watched:
+            return
+        if self._add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"无法监听目录 {directory}: {os.strerror(errno)}")
+        self.watched.add(directory)
+    
+    def wait(self, timeout: float) -> bool:
+        readable, _, _ = select.select([self.fd, self.wake_read], [], [], timeout)
+        for fd in readable:
+            try:
+                while os.read(fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(readable)
+    
+    def wake(self):
+        os.write(self.wake_write, b"\0")
+    
+    def close(self):
+        for fd in (self.fd, self.wake_read, self.wake_write):
+            os.close(fd)
+
+
+def create_waiter(polling: bool = False):
+    """Linux 上优先用 inotify，不可用时退回轮询"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWaiter()
+        except (OSError, AttributeError):
+            pass
+    return PollingWaiter()
+
+
+class WatchState:
+    """
+    监听模式的处理记录：按输入文件路径保存处理时的大小和修改时间
+    
+    重启后大小和修改时间都没有变化的文件不再处理；文件被替换或追加了内容时重新处理
+    （配合 --incremental 只解码新增的行）。
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        # 记录损坏时不能当作空记录，否则会把已处理的文件全部重新处理一遍
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            raise ValueError(f"无法识别的处理记录文件: {path}")
+        self.files = data.get('files', {})
+    
+    def handled(self, path: str, signature: Tuple[int, int]) -> bool:
+        entry = self.files.get(path)
+        return entry is not None and (entry['size'], entry['mtime_ns']) == tuple(signature)
+    
+    def record(self, path: str, signature: Tuple[int, int], result: Dict):
+        self.files[path] = {
+            'size': signature[0],
+            'mtime_ns': signature[1],
+            'success': result['success'],
+            'output': result['output'] if result['success'] else None,
+            'message': result['message'],
+            'finished': datetime.now().isoformat(timespec='seconds'),
+        }
+        self.save()
+    
+    def save(self):
+        """先写临时文件再改名，中途退出不会留下损坏的记录"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.files}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def ignore_interrupt():
+    """转换进程忽略 Ctrl+C：由主进程等正在转换的文件完成后退出"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class FolderWatcher:
+    """
+    监听目录，自动转换新到达的文件
+    
+    文件的大小和修改时间在 settle_seconds 内都没有变化才视为写完，排队交给最多
+    jobs 个进程转换；输出写入 output_dir，失败的输入文件连同错误说明移到 failed_dir
+    （递归监听时两者都保留相对子目录），每个处理完的文件都记入 state。
+    """
+    
+    # 使用 inotify 且没有待确认的文件时，每隔这么久仍完整扫描一次（补上漏掉的事件）
+    IDLE_RESCAN_SECONDS = 60
+    
+    def __init__(self, watch_dir: str, output_dir: str, failed_dir: str, state: WatchState,
+                 jobs: int, decode_workers: int, convert_options: Dict, recursive: bool = False,
+                 settle_seconds: float = 5.0, poll_interval: float = 2.0, show_warnings: int = 3,
+                 waiter=None, log: Optional[Callable[[str], None]] = None):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.failed_dir = os.path.abspath(failed_dir)
+        self.state = state
+        self.jobs = jobs
+        self.decode_workers = decode_workers
+        self.convert_options = convert_options
+        self.recursive = recursive
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.show_warnings = show_warnings
+        self.waiter = waiter or PollingWaiter()
+        self.log = log or (lambda message: None)
+        # 路径 -> (大小与修改时间, 首次看到该状态的时刻)
+        self.pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self.ready: deque = deque()
+        self.running: Dict = {}
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.stop_event = threading.Event()
+    
+    @staticmethod
+    def signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+    
+    def _directories(self) -> Iterator[Tuple[str, List[str]]]:
+        """要扫描的目录及其中的文件名（递归时跳过输出和失败目录）"""
+        if not self.recursive:
+            yield self.watch_dir, os.listdir(self.watch_dir)
+            return
+        skipped = {self.output_dir, self.failed_dir}
+        for root, dirs, names in os.walk(self.watch_dir):
+            dirs[:] = sorted(name for name in dirs if os.path.join(root, name) not in skipped)
+            yield root, names
+    
+    def _watch(self, directory: str):
+        try:
+            self.waiter.add(directory)
+        except OSError as e:
+            self.log(f"⚠️  {e}，改为轮询")
+            waiter, self.waiter = self.waiter, PollingWaiter()
+            waiter.close()
+    
+    def scan(self):
+        """扫描目录：新文件开始计时，大小和修改时间保持不变满 settle_seconds 的文件排队"""
+        now = time.monotonic()
+        queued = set(self.ready) | {path for path, _ in self.running.values()}
+        seen = set()
+        for directory, names in self._directories():
+            self._watch(directory)
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                if path in queued or not is_input_file(path) or not os.path.isfile(path):
+                    continue
+                signature = self.signature(path)
+                if signature is None or self.state.handled(path, signature):
+                    continue
+                seen.add(path)
+                previous = self.pending.get(path)
+                if previous is None or previous[0] != signature:
+                    self.pending[path] = (signature, now)
+                    # 重启前已经写完的文件不必再等
+                    if time.time() - signature[1] / 1e9 < self.settle_seconds:
+                        continue
+                elif now - previous[1] < self.settle_seconds:
+                    continue
+                del self.pending[path]
+                self.ready.append(path)
+        # 等待期间被删除或移走的文件
+        for path in set(self.pending) - seen:
+            del self.pending[path]
+    
+    def _target_path(self, base_dir: str, path: str) -> str:
+        """输出/失败目录中对应的目录（递归监听时保留相对子目录）"""
+        relative = os.path.relpath(os.path.dirname(path), self.watch_dir)
+        directory = os.path.normpath(os.path.join(base_dir, relative))
+        os.makedirs(directory, exist_ok=True)
+        return directory
+    
+    def submit(self):
+        """把排队的文件交给转换进程，同时转换的文件不超过 jobs 个"""
+        while self.ready and len(self.running) < self.jobs:
+            path = self.ready.popleft()
+            signature = self.signature(path)
+            if signature is None:
+                continue
+            output_path = generate_output_filename(path, self._target_path(self.output_dir, path),
+                                                   self.convert_options['output_format'])
+            base, ext = os.path.splitext(output_path)
+            suffix = 1
+            while os.path.exists(output_path):
+                suffix += 1
+                output_path = f"{base}_{suffix}{ext}"
+            self.log(f"⏳ 开始处理: {path}")
+            future = self.pool.submit(convert_file, path, output_path, self.decode_workers, **self.convert_options)
+            self.running[future] = (path, signature)
+    
+    def collect(self):
+        """处理已完成的转换：失败的文件移到失败目录，结果记入处理记录"""
+        for future in [future for future in self.running if future.done()]:
+            path, signature = self.running.pop(future)
+            if future.cancelled():
+                # 退出时还没开始转换，留到下次启动
+                continue
+            try:
+                result = future.result()
+            except Exception as e:
+                # 转换进程异常退出等 convert_file 本身没能返回的情况
+                result = {'input': path, 'output': "", 'success': False, 'message': f"转换进程出错: {e}",
+                          'processed': 0, 'errors': 0, 'warnings': [], 'infos': [], 'report': None, 'seconds': 0.0}
+                if isinstance(e, BrokenProcessPool):
+                    self._restart_pool()
+            for line in result_lines(result, self.show_warnings):
+                self.log(line)
+            if not result['success']:
+                self._move_failed(path, result)
+            self.state.record(path, signature, result)
+    
+    def _move_failed(self, path: str, result: Dict):
+        """失败的输入文件移到失败目录，旁边写一份错误说明"""
+        try:
+            target = os.path.join(self._target_path(self.failed_dir, path), os.path.basename(path))
+            base, ext = os.path.splitext(target)
+            suffix = 1
+            while os.path.exists(target):
+                suffix += 1
+                target = f"{base}_{suffix}{ext}"
+            shutil.move(path, target)
+            with open(target + ".错误.txt", 'w', encoding='utf-8') as f:
+                f.write(f"{result['message']}\n")
+                for warning in result['warnings']:
+                    f.write(warning.rstrip() + "\n")
+            self.log(f"    已移到: {target}")
+        except OSError as e:
+            self.log(f"⚠️  无法移动失败的文件 {path}: {e}")
+    
+    def _restart_pool(self):
+        self.pool.shutdown(wait=False)
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=ignore_interrupt)
+    
+    def next_timeout(self) -> float:
+        """有待确认、排队或正在转换的文件时按轮询间隔检查，否则 inotify 可以等得更久"""
+        if self.pending or self.ready or self.running or isinstance(self.waiter, PollingWaiter):
+            return self.poll_interval
+        return self.IDLE_RESCAN_SECONDS
+    
+    def stop(self):
+        """从其他线程停止监听"""
+        self.stop_event.set()
+        self.waiter.wake()
+    
+    def run(self):
+        """
+        持续监听直到调用 stop() 或收到 Ctrl+C（SIGTERM 同样处理）；
+        退出前等待正在转换的文件完成，排队中的文件留到下次启动
+        """
+        self.pool = ProcessPoolExecutor(max_workers=self.jobs, initializer=ignore_interrupt)
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.scan()
+                except OSError as e:
+                    # 网络共享目录暂时不可用等情况，下次再扫描
+                    self.log(f"⚠️  扫描目录失败: {e}")
+                self.submit()
+                self.collect()
+                self.waiter.wait(self.next_timeout())
+        except KeyboardInterrupt:
+            pass
         finally:
-            # 重新启用按钮
-            self.select_file_btn.config(state='normal')
-            self.process_btn.config(state='normal')
+            if self.running:
+                self.log(f"⏹  正在等待 {len(self.running)} 个转换完成后退出（再按 Ctrl+C 强制退出）")
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.collect()
+            self.waiter.close()
+
+
+def run_watch(args) -> int:
+    """监听模式：持续转换到达监听目录的文件，直到 Ctrl+C 或 SIGTERM"""
+    watch_dir = os.path.abspath(args.watch)
+    if not os.path.isdir(watch_dir):
+        print(f"❌ 监听目录不存在: {watch_dir}", file=sys.stderr)
+        return 2
+    if args.format == 'parquet' and not PYARROW_AVAILABLE:
+        print("❌ pyarrow 库未安装，无法输出 Parquet 文件（pip install pyarrow）", file=sys.stderr)
+        return 2
+    output_dir = os.path.abspath(args.output_dir or os.path.join(watch_dir, "转码输出"))
+    failed_dir = os.path.abspath(args.failed_dir or os.path.join(watch_dir, "转码失败"))
+    state_path = args.state_file or os.path.join(output_dir, ".转码监听记录.json")
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(failed_dir, exist_ok=True)
+    try:
+        state = WatchState(state_path)
+    except ValueError as e:
+        print(f"❌ {e}（确认无误后可删除该文件重新开始）", file=sys.stderr)
+        return 2
+    
+    def log(message: str):
+        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", file=sys.stderr, flush=True)
+    
+    jobs, decode_workers = plan_workers(args.jobs or default_decode_workers(), args.jobs, args.decode_workers)
+    watcher = FolderWatcher(
+        watch_dir, output_dir, failed_dir, state, jobs, decode_workers,
+        {'output_format': args.format, 'xlsx_split': args.split,
+         'incremental': args.incremental, 'build_report': args.report},
+        recursive=args.recursive, settle_seconds=args.settle_seconds, poll_interval=args.poll_interval,
+        show_warnings=args.show_warnings, waiter=create_waiter(args.poll), log=log
+    )
+    log(f"👀 监听 {watch_dir}（{watcher.waiter.name}，文件 {args.settle_seconds:g} 秒内不再变化后处理）")
+    log(f"   输出目录: {output_dir} | 失败目录: {failed_dir} | 处理记录: {state_path}")
+    log(f"   并行文件数: {jobs}，每个文件解码进程数: {decode_workers}，输出格式: {args.format}；按 Ctrl+C 停止")
+    
+    # SIGTERM（如 systemd 停止服务）与 Ctrl+C 一样等正在转换的文件完成后退出
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    watcher.run()
+    log("已停止监听")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="腾讯云转码工具（不带参数时启动图形界面）")
+    parser.add_argument("--cli", action="store_true", help="无界面批量模式（给出文件参数时自动启用）")
+    parser.add_argument("paths", nargs="*", help="要处理的文件、通配符（如 'exports/*.xlsx'）或目录")
+    parser.add_argument("-r", "--recursive", action="store_true", help="递归处理子目录（通配符支持 **）")
+    parser.add_argument("-o", "--output-dir", help="输出目录，默认与输入文件相同")
+    parser.add_argument("-j", "--jobs", type=int, help="同时处理的文件数，默认为 CPU 核数")
+    parser.add_argument("--decode-workers", type=int,
+                        help="每个文件的解码进程数，默认把剩余的 CPU 核分给各文件")
+    parser.add_argument("-f", "--format", choices=list(OUTPUT_FORMATS), default='xlsx',
+                        help="输出格式：xlsx（默认）、csv、jsonl（解码内容为 JSON 对象）、parquet（需要 pyarrow）")
+    parser.add_argument("--split", choices=["sheet", "file"], default="sheet",
+                        help="xlsx 输出超过 1048576 行时拆分为多个工作表（默认）或多个文件")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量处理：文件只在末尾新增了行时，只解码新增的行并追加到上次的输出"
+                             "（处理记录保存在 '输入文件名.转码记录.json'）")
+    parser.add_argument("--report", action="store_true",
+                        help="按 Topic 与通讯类型汇总（xlsx 输出为 'Topic汇总' 工作表，其他格式为 '输出文件名_汇总.json'）")
+    parser.add_argument("--show-warnings", type=int, default=3, help="每个文件显示的解码失败行数")
+    watch = parser.add_argument_group("监听模式")
+    watch.add_argument("--watch", metavar="DIR",
+                       help="持续监听该目录，自动转换写入完成的文件（默认输出到 'DIR/转码输出'）")
+    watch.add_argument("--failed-dir", help="转换失败的输入文件移到该目录，默认 'DIR/转码失败'")
+    watch.add_argument("--state-file", help="处理记录文件，默认为输出目录下的 '.转码监听记录.json'")
+    watch.add_argument("--settle-seconds", type=float, default=5.0,
+                       help="文件大小和修改时间保持不变多少秒后视为写入完成（默认 5）")
+    watch.add_argument("--poll-interval", type=float, default=2.0, help="检查文件变化的间隔秒数（默认 2）")
+    watch.add_argument("--poll", action="store_true",
+                       help="不用 inotify，始终轮询（监听网络共享目录时需要）")
+    # 允许选项与路径交替出现
+    args = parser.parse_intermixed_args(argv)
+    if args.watch and args.paths:
+        parser.error("--watch 模式不接受其他文件或目录参数")
+    if args.cli and not args.paths and not args.watch:
+        parser.error("--cli 模式需要至少一个文件、通配符或目录")
+    # 给出了文件参数就按批量模式处理，不忽略参数去启动图形界面
+    if args.paths:
+        args.cli = True
+    return args
 
 
 def main():
     """主函数"""
+    # 打包后的程序启动解码子进程时需要
+    multiprocessing.freeze_support()
+    
+    args = parse_args()
+    if args.watch:
+        sys.exit(run_watch(args))
+    if args.cli:
+        sys.exit(run_cli(args))
+    
     # 检查必要的库
     missing_libs = []
     if not OPENPYXL_AVAILABLE:
@@ -0,0 +1,41 @@
+import os
+import sys
+
+# 工具都是仓库根目录下的单文件脚本，测试直接按模块导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 以下为多个测试文件共用的输入数据工具（测试文件按 `from conftest import ...` 导入）
+import base64
+import csv
+import json
+
+HEADER = ["时间", "通讯类型", "Topic", "数据"]
+
+
+def encode(data) -> str:
+    """数据转为 JSON 后 Base64 编码（第四列的内容）"""
+    return base64.b64encode(json.dumps(data, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def sample_rows(count, bad=(), start=0):
+    """
+    序号 start 起的 count 行日志：上行/下行交替，3 个 Topic 轮换，第四列为 Base64；
+    bad 中的序号写入无法解码的数据
+    """
+    return [[f"2025-12-12 10:{i // 60 % 60:02d}:{i % 60:02d}", "上行" if i % 2 else "下行", f"topic/{i % 3}",
+             "abc" if i in bad else encode({'i': i})]
+            for i in range(start, start + count)]
+
+
+def write_csv(path, rows, encoding='utf-8', delimiter=',', mode='w'):
+    """写出带表头的 CSV；mode 为 'a' 时只追加数据行"""
+    with open(path, mode, newline='', encoding=encoding) as f:
+        writer = csv.writer(f, delimiter=delimiter)
+        if mode == 'w':
+            writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
@@ -0,0 +1,92 @@
+"""命令行批量模式：参数解析、输入文件展开与退出码"""
+import os
+
+import pytest
+
+from conftest import sample_rows, write_csv
+from tencent_decode_tool import collect_input_files, parse_args, run_cli
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8'):
+        pass
+    return path
+
+
+def test_positional_paths_imply_cli():
+    assert parse_args(["a.csv"]).cli
+    assert parse_args(["--cli", "a.csv"]).cli
+    assert not parse_args([]).cli
+
+
+def test_cli_without_paths_is_an_error():
+    with pytest.raises(SystemExit) as exc:
+        parse_args(["--cli"])
+    assert exc.value.code == 2
+
+
+def test_collect_input_files_from_directories_and_globs(tmp_path):
+    base = str(tmp_path)
+    keep = [touch(os.path.join(base, name)) for name in ("b.xlsx", "a.csv", "c.TSV", "d.xls")]
+    for name in ("notes.txt", "a_转码_20251212.xlsx", "~$b.xlsx"):
+        touch(os.path.join(base, name))
+    nested = touch(os.path.join(base, "sub", "e.csv"))
+
+    files, unmatched = collect_input_files([base])
+    assert files == sorted(keep)
+    assert unmatched == []
+
+    files, _ = collect_input_files([base], recursive=True)
+    assert set(files) == set(keep) | {nested}
+
+    files, _ = collect_input_files([os.path.join(base, "**", "*.csv")], recursive=True)
+    assert set(files) == {os.path.join(base, "a.csv"), nested}
+
+
+def test_collect_input_files_deduplicates_and_reports_unmatched(tmp_path):
+    base = str(tmp_path)
+    path = touch(os.path.join(base, "a.csv"))
+    # 明确指定的文件不按扩展名过滤
+    other = touch(os.path.join(base, "notes.txt"))
+    missing = os.path.join(base, "missing.csv")
+    pattern = os.path.join(base, "*.xlsx")
+    files, unmatched = collect_input_files([path, os.path.join(base, "*.csv"), other, missing, pattern])
+    assert files == [path, other]
+    assert unmatched == [missing, pattern]
+
+
+def cli_args(tmp_path, *paths):
+    return parse_args(["-f", "jsonl", "-j", "1", "--decode-workers", "1", "-o", str(tmp_path / "out"), *paths])
+
+
+def test_run_cli_success_returns_zero(tmp_path, capsys):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, sample_rows(10))
+    assert run_cli(cli_args(tmp_path, source)) == 0
+    outputs = os.listdir(tmp_path / "out")
+    assert len(outputs) == 1 and outputs[0].endswith(".jsonl")
+    assert "成功 1，失败 0" in capsys.readouterr().err
+
+
+def test_run_cli_failed_file_returns_one(tmp_path, capsys):
+    good, bad = str(tmp_path / "good.csv"), str(tmp_path / "bad.csv")
+    write_csv(good, sample_rows(10))
+    with open(bad, 'w', encoding='utf-8') as f:
+        f.write("只有一列\n1\n")
+    assert run_cli(cli_args(tmp_path, good, bad)) == 1
+    err = capsys.readouterr().err
+    assert "成功 1，失败 1" in err
+    assert bad in err
+
+
+def test_run_cli_unmatched_pattern_returns_one(tmp_path, capsys):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, sample_rows(3))
+    assert run_cli(cli_args(tmp_path, source, str(tmp_path / "missing.csv"))) == 1
+    assert "没有匹配的文件" in capsys.readouterr().err
+
+
+def test_run_cli_without_files_returns_two(tmp_path, capsys):
+    assert run_cli(cli_args(tmp_path, str(tmp_path / "*.csv"))) == 2
+    assert "没有要处理的文件" in capsys.readouterr().err
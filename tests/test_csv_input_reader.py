@@ -0,0 +1,101 @@
+"""CSV/TSV 输入的字节区间切分、编码与逐行读取回退测试"""
+import pytest
+
+from conftest import HEADER, encode, read_jsonl, sample_rows, write_csv
+from tencent_decode_tool import CsvInputReader, DecodeConverter, UnsupportedWorkbook, parse_csv_range
+
+
+def test_byte_ranges_cover_body_at_line_starts(tmp_path):
+    path = str(tmp_path / "in.csv")
+    write_csv(path, sample_rows(300))
+    with CsvInputReader(path, chunk_bytes=1000) as reader:
+        ranges = list(reader.byte_ranges())
+        with open(path, 'rb') as f:
+            data = f.read()
+        assert ranges[0][0] == reader.body_start
+        assert ranges[-1][1] == len(data)
+        assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+        assert all(data[end - 1:end] == b"\n" for _, end in ranges)
+        rows = [row for start, end in ranges
+                for row in parse_csv_range(path, start, end, reader.delimiter, reader.encoding)]
+    assert rows == sample_rows(300)
+
+
+def test_header_delimiter_and_bom(tmp_path):
+    path = str(tmp_path / "in.tsv")
+    write_csv(path, sample_rows(3), encoding='utf-8-sig', delimiter='\t')
+    with CsvInputReader(path) as reader:
+        assert reader.delimiter == '\t'
+        assert reader.header == HEADER
+        assert reader.encoding == 'utf-8'
+        assert list(reader.iter_rows())[1:] == sample_rows(3)
+
+
+def test_gb18030_detected_from_sample(tmp_path):
+    path = str(tmp_path / "in.csv")
+    write_csv(path, sample_rows(10), encoding='gb18030')
+    with CsvInputReader(path) as reader:
+        assert reader.encoding == 'gb18030'
+        assert reader.header == HEADER
+
+
+def test_odd_quotes_in_range_are_rejected(tmp_path):
+    path = str(tmp_path / "in.csv")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('a,b\n1,"x\n')
+    with pytest.raises(UnsupportedWorkbook):
+        parse_csv_range(path, 4, 11, ',', 'utf-8')
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_bytes_after_sample_in_other_encoding_do_not_fail(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(CsvInputReader, 'SAMPLE_BYTES', 512)
+    monkeypatch.setattr(CsvInputReader, 'CHUNK_BYTES', 1024)
+    path = str(tmp_path / "in.csv")
+    rows = sample_rows(100)
+    write_csv(path, rows)
+    # 采样之后出现一行 GB18030 编码的 Topic
+    with open(path, 'ab') as f:
+        f.write("2025-12-12 11:00:00,上行,主题GB,".encode('gb18030') + encode({'i': 100}).encode('ascii') + b"\r\n")
+    output = str(tmp_path / "out.jsonl")
+    converter = DecodeConverter(workers, output_format='jsonl')
+    success, message, count = converter.process_file(path, output)
+    assert success, message
+    assert count == 101
+    records = read_jsonl(output)
+    assert records[-1][HEADER[3]] == encode({'i': 100})
+    assert "�" in records[-1][HEADER[2]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fallback_does_not_repeat_warnings(tmp_path, monkeypatch, workers):
+    monkeypatch.setattr(CsvInputReader, 'CHUNK_BYTES', 1024)
+    path = str(tmp_path / "in.csv")
+    rows = sample_rows(200, bad={3, 150})
+    # 靠后的一行字段内含多个换行、跨越区间边界：前面的区间已经按区间读取并上报过失败
+    rows[180][1] = "上\n" * 600
+    write_csv(path, rows)
+    warnings = []
+    infos = []
+    converter = DecodeConverter(workers, output_format='jsonl', on_warning=warnings.append, on_info=infos.append)
+    success, message, count = converter.process_file(path, str(tmp_path / "out.jsonl"))
+    assert success, message
+    assert any("逐行读取" in info for info in infos)
+    assert converter.error_count == 2
+    assert count == 198
+    assert [warning.split(" 行")[0] for warning in warnings] == ["⚠️  第 5", "⚠️  第 152"]
+    records = read_jsonl(str(tmp_path / "out.jsonl"))
+    assert len(records) == 200
+    assert records[180][HEADER[1]] == "上\n" * 600
+
+
+def test_fallback_keeps_single_copy_of_kept_warnings(tmp_path, monkeypatch):
+    monkeypatch.setattr(CsvInputReader, 'CHUNK_BYTES', 1024)
+    path = str(tmp_path / "in.csv")
+    rows = sample_rows(200, bad={3})
+    rows[180][1] = "上\n" * 600
+    write_csv(path, rows)
+    converter = DecodeConverter(1, output_format='jsonl')
+    success, message, _ = converter.process_file(path, str(tmp_path / "out.jsonl"))
+    assert success, message
+    assert len(converter.warnings) == 1
@@ -0,0 +1,25 @@
+"""转码流程测试：CSV 输入与消息索引"""
+from conftest import sample_rows, write_csv
+from tencent_decode_tool import DecodeConverter
+
+
+def test_index_not_built_by_default(tmp_path):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, sample_rows(50))
+    converter = DecodeConverter(1, output_format='jsonl')
+    success, message, count = converter.process_file(source, str(tmp_path / "out.jsonl"))
+    assert success, message
+    assert count == 50
+    assert converter.message_index is None
+
+
+def test_index_built_when_requested(tmp_path):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, sample_rows(50))
+    converter = DecodeConverter(1, output_format='jsonl', build_index=True)
+    success, message, _ = converter.process_file(source, str(tmp_path / "out.jsonl"))
+    assert success, message
+    index = converter.message_index
+    assert len(index) == 50
+    assert len(index.query(topic="topic/1")) == 17
+    assert len(index.query(topic="topic/1", msg_type="上行")) == 9
@@ -0,0 +1,205 @@
+"""增量处理：处理记录、前缀哈希与追加输出测试"""
+import json
+import os
+
+import pytest
+
+from conftest import encode, sample_rows, write_csv
+from tencent_decode_tool import (
+    DecodeConverter, PrefixHasher, RowBatch, load_manifest, manifest_path, save_manifest,
+)
+
+
+def make_rows(start, end):
+    return sample_rows(end - start, start=start)
+
+
+def convert(source, output, **options):
+    converter = DecodeConverter(1, output_format=options.pop('output_format', 'jsonl'), **options)
+    result = converter.process_file(source, output)
+    assert result[0], result[1]
+    return converter, result
+
+
+def read_output(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_prefix_hasher_ignores_trailing_empty_cells():
+    first, second = PrefixHasher(), PrefixHasher()
+    first.update(["a", 1, None, None])
+    second.update_batch(RowBatch([["a"], [1]], 2))
+    assert first.hexdigest() == second.hexdigest()
+    assert first.rows == second.rows == 1
+
+
+def test_manifest_round_trip_and_corruption(tmp_path):
+    source = str(tmp_path / "in.csv")
+    save_manifest(source, {'version': 1, 'rows': 3})
+    assert load_manifest(source) == {'version': 1, 'rows': 3}
+    assert not os.path.exists(manifest_path(source) + ".tmp")
+    with open(manifest_path(source), 'w', encoding='utf-8') as f:
+        f.write("{")
+    assert load_manifest(source) is None
+    save_manifest(source, {'version': 2})
+    assert load_manifest(source) is None
+
+
+@pytest.mark.parametrize("output_format", ['jsonl', 'csv'])
+def test_appended_rows_match_full_run(tmp_path, output_format):
+    source = str(tmp_path / "in.csv")
+    output = str(tmp_path / f"out.{output_format}")
+    write_csv(source, make_rows(0, 30))
+    convert(source, output, output_format=output_format, incremental=True, build_report=True)
+    assert load_manifest(source)['rows'] == 30
+    
+    write_csv(source, make_rows(30, 45), mode='a')
+    converter, (_, message, count) = convert(source, output, output_format=output_format,
+                                             incremental=True, build_report=True)
+    assert count == 15
+    assert load_manifest(source)['rows'] == 45
+    
+    full_output = str(tmp_path / f"full.{output_format}")
+    full, _ = convert(source, full_output, output_format=output_format, build_report=True)
+    assert read_output(output) == read_output(full_output)
+    # 汇总接着上次累计，与完整处理一致
+    assert converter.report.to_dict() == full.report.to_dict()
+
+
+def test_no_new_rows_leaves_output_untouched(tmp_path):
+    source = str(tmp_path / "in.csv")
+    output = str(tmp_path / "out.jsonl")
+    write_csv(source, make_rows(0, 10))
+    convert(source, output, incremental=True)
+    before = os.stat(output).st_mtime_ns
+    _, (_, message, count) = convert(source, output, incremental=True)
+    assert count == 0 and "没有新增的行" in message
+    assert os.stat(output).st_mtime_ns == before
+
+
+def test_changed_prefix_triggers_full_run(tmp_path):
+    source = str(tmp_path / "in.csv")
+    output = str(tmp_path / "out.jsonl")
+    write_csv(source, make_rows(0, 10))
+    convert(source, output, incremental=True)
+    rows = make_rows(0, 12)
+    rows[3][2] = "topic/changed"
+    write_csv(source, rows)
+    infos = []
+    _, (_, _, count) = convert(source, output, incremental=True, on_info=infos.append)
+    assert count == 12
+    assert any("有变化" in info for info in infos)
+    assert load_manifest(source)['rows'] == 12
+
+
+def test_changed_output_format_triggers_full_run(tmp_path):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, make_rows(0, 10))
+    convert(source, str(tmp_path / "out.jsonl"), incremental=True)
+    write_csv(source, make_rows(10, 12), mode='a')
+    _, (_, _, count) = convert(source, str(tmp_path / "out.csv"), output_format='csv', incremental=True)
+    assert count == 12
+    assert load_manifest(source)['output_format'] == 'csv'
+
+
+@pytest.mark.parametrize("output_format", ['jsonl', 'csv', 'xlsx'])
+def test_appending_to_a_new_output_path_moves_previous_output(tmp_path, output_format):
+    source = str(tmp_path / "in.csv")
+    first = str(tmp_path / f"out.{output_format}")
+    second_dir = tmp_path / "later"
+    second_dir.mkdir()
+    second = str(second_dir / f"other.{output_format}")
+    write_csv(source, make_rows(0, 30))
+    convert(source, first, output_format=output_format, incremental=True, build_report=True)
+    write_csv(source, make_rows(30, 45), mode='a')
+    
+    converter, (_, _, count) = convert(source, second, output_format=output_format,
+                                       incremental=True, build_report=True)
+    assert count == 15
+    assert converter.output_paths == [second]
+    assert not os.path.exists(first)
+    assert not os.path.exists(str(tmp_path / "out_汇总.json"))
+    assert load_manifest(source)['outputs'] == [second]
+    
+    full_output = str(tmp_path / f"full.{output_format}")
+    full, _ = convert(source, full_output, output_format=output_format, build_report=True)
+    assert converter.report.to_dict() == full.report.to_dict()
+    if output_format != 'xlsx':
+        assert read_output(second) == read_output(full_output)
+        assert os.path.exists(str(second_dir / "other_汇总.json"))
+    else:
+        openpyxl = pytest.importorskip("openpyxl")
+        values = [list(openpyxl.load_workbook(path, read_only=True).active.values)
+                  for path in (second, full_output)]
+        assert values[0] == values[1]
+
+
+def test_new_output_path_without_new_rows_still_moves(tmp_path):
+    source = str(tmp_path / "in.csv")
+    write_csv(source, make_rows(0, 10))
+    convert(source, str(tmp_path / "a.jsonl"), incremental=True)
+    converter, (_, _, count) = convert(source, str(tmp_path / "b.jsonl"), incremental=True)
+    assert count == 0
+    assert not os.path.exists(str(tmp_path / "a.jsonl"))
+    assert len(read_output(str(tmp_path / "b.jsonl")).splitlines()) == 10
+
+
+def test_failed_append_to_new_path_restores_previous_output(tmp_path, monkeypatch):
+    source = str(tmp_path / "in.csv")
+    first = str(tmp_path / "out.jsonl")
+    write_csv(source, make_rows(0, 10))
+    convert(source, first, incremental=True)
+    before = read_output(first)
+    write_csv(source, make_rows(10, 12), mode='a')
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError("写入失败")
+    
+    monkeypatch.setattr(DecodeConverter, '_write_batches', fail)
+    converter = DecodeConverter(1, output_format='jsonl', incremental=True)
+    success, _, _ = converter.process_file(source, str(tmp_path / "other.jsonl"))
+    assert not success
+    assert read_output(first) == before
+    assert not os.path.exists(str(tmp_path / "other.jsonl"))
+
+
+def test_manifest_paths_are_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv("in.csv", make_rows(0, 10))
+    convert("in.csv", "out.jsonl", incremental=True)
+    assert load_manifest("in.csv")['outputs'] == [str(tmp_path / "out.jsonl")]
+    
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+    source = str(tmp_path / "in.csv")
+    write_csv(source, make_rows(10, 12), mode='a')
+    _, (_, _, count) = convert(source, str(tmp_path / "out.jsonl"), incremental=True)
+    assert count == 2
+    assert len(read_output(str(tmp_path / "out.jsonl")).splitlines()) == 12
+
+
+def test_xlsx_spill_attachments_follow_moved_output(tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    from tencent_decode_tool import XlsxOutputWriter
+    monkeypatch.setattr(XlsxOutputWriter, 'MAX_CELL_CHARS', 40)
+    source = str(tmp_path / "in.csv")
+    rows = [[time, msg_type, topic, encode({'i': i, 'text': "x" * 60})]
+            for i, (time, msg_type, topic, _) in enumerate(make_rows(0, 5))]
+    write_csv(source, rows[:3])
+    convert(source, str(tmp_path / "a.xlsx"), output_format='xlsx', incremental=True)
+    assert len(os.listdir(str(tmp_path / "a_附件"))) == 6
+    write_csv(source, rows[3:], mode='a')
+    convert(source, str(tmp_path / "b.xlsx"), output_format='xlsx', incremental=True)
+    
+    assert not os.path.exists(str(tmp_path / "a_附件"))
+    workbook = openpyxl.load_workbook(str(tmp_path / "b.xlsx"), read_only=True)
+    cells = [row[4] for row in list(workbook.active.values)[1:]]
+    workbook.close()
+    assert len(cells) == 5
+    for i, cell in enumerate(cells):
+        relative = cell.split("完整内容见: ")[1].rstrip("]")
+        assert relative.startswith("b_附件/")
+        with open(os.path.join(str(tmp_path), relative), encoding='utf-8') as f:
+            assert json.loads(f.read())['i'] == i
@@ -0,0 +1,198 @@
+"""CSV、JSONL、Parquet 输出写入器与解码结果形式测试"""
+import csv
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from conftest import encode, read_jsonl, sample_rows, write_csv
+from tencent_decode_tool import (
+    CsvOutputWriter, DecodeConverter, JsonlOutputWriter, RowBatch, column_names, create_output_writer,
+    decode_base64_value,
+)
+
+NESTED = {'user': {'id': 7, 'tags': ["甲", "乙"]}, 'ok': True}
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_decode_styles():
+    value = encode(NESTED)
+    assert decode_base64_value(value, 'object') == (True, NESTED)
+    assert decode_base64_value(value, 'compact') == (True, json.dumps(NESTED, ensure_ascii=False,
+                                                                      separators=(',', ':')))
+    assert decode_base64_value(value, 'pretty')[1].startswith("{\n  ")
+    # 非 JSON 内容在每种形式下都是原始字符串
+    for style in ('object', 'compact', 'pretty'):
+        assert decode_base64_value("5paH5a2X", style) == (True, "文字")
+    assert decode_base64_value("   ", 'object') == (False, "空字符串")
+
+
+@pytest.mark.parametrize("output_format, writer_class, style", [
+    ('csv', CsvOutputWriter, 'compact'), ('jsonl', JsonlOutputWriter, 'object'),
+])
+def test_text_writers_use_expected_decode_style(tmp_path, output_format, writer_class, style):
+    writer = create_output_writer(output_format, str(tmp_path / f"out.{output_format}"))
+    try:
+        assert isinstance(writer, writer_class)
+        assert writer.decode_style == style
+        assert not writer.report_in_output
+    finally:
+        writer.discard()
+
+
+def test_column_names_replace_blank_and_duplicate_headers():
+    assert column_names(["时间", "", None, "时间", " Topic "]) == ["时间", "列2", "列3", "列4", "Topic"]
+
+
+def test_csv_writer_rows_and_batches(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = CsvOutputWriter(path)
+    writer.append(["时间", "数据"])
+    writer.append([datetime(2025, 12, 12, 10, 0, 1), "a,b"])
+    writer.append_batch(RowBatch([["x", "y"], ['{"k":"多\\n行"}', None]], 3))
+    assert not os.path.exists(path)
+    writer.save()
+    assert not os.path.exists(path + ".part")
+    assert read_csv(path) == [["时间", "数据"], ["2025-12-12 10:00:01", "a,b"], ["x", '{"k":"多\\n行"}'], ["y", ""]]
+
+
+def test_jsonl_writer_nested_objects_extra_columns_and_empty_cells(tmp_path):
+    path = str(tmp_path / "out.jsonl")
+    writer = JsonlOutputWriter(path)
+    writer.append(["时间", "", "数据"])
+    writer.append([datetime(2025, 12, 12, 10, 0, 1), "值", NESTED, "多出的列"])
+    writer.append_batch(RowBatch([["t"], [""], [None]], 3))
+    writer.save()
+    assert read_jsonl(path) == [
+        {'时间': "2025-12-12 10:00:01", '列2': "值", '数据': NESTED, '列4': "多出的列"},
+        {'时间': "t"},
+    ]
+
+
+def test_text_writer_discard_removes_part_file(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = CsvOutputWriter(path)
+    writer.append(["a"])
+    writer.append(["1"])
+    writer.discard()
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".part")
+
+
+@pytest.mark.parametrize("same_path", [True, False])
+def test_text_writer_resume_appends_and_discard_truncates(tmp_path, same_path):
+    previous = str(tmp_path / "old.jsonl")
+    writer = JsonlOutputWriter(previous)
+    writer.append(["数据"])
+    writer.append(["1"])
+    writer.save()
+    with open(previous, 'rb') as f:
+        original = f.read()
+
+    path = previous if same_path else str(tmp_path / "new.jsonl")
+    writer = JsonlOutputWriter(path, resume_from=[previous])
+    # 表头已在上次的输出中：不写出，但仍用作键
+    writer.append(["数据"])
+    writer.append(["2"])
+    writer.discard()
+    with open(previous, 'rb') as f:
+        assert f.read() == original
+    assert same_path or not os.path.exists(path)
+
+    writer = JsonlOutputWriter(path, resume_from=[previous])
+    writer.append(["数据"])
+    writer.append(["2"])
+    writer.save()
+    assert read_jsonl(path) == [{'数据': "1"}, {'数据': "2"}]
+
+
+def test_csv_resume_skips_header(tmp_path):
+    path = str(tmp_path / "out.csv")
+    writer = CsvOutputWriter(path)
+    writer.append(["a"])
+    writer.append(["1"])
+    writer.save()
+    writer = CsvOutputWriter(path, resume_from=[path])
+    writer.append(["a"])
+    writer.append_batch(RowBatch([["2", "3"]], 3))
+    writer.save()
+    assert read_csv(path) == [["a"], ["1"], ["2"], ["3"]]
+
+
+def test_conversion_to_csv_writes_compact_json(tmp_path):
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.csv")
+    write_csv(source, sample_rows(5, bad={2}) + [["2025-12-12 11:00:00", "上行", "t", encode(NESTED)]])
+    converter = DecodeConverter(1, output_format='csv')
+    success, message, count = converter.process_file(source, output)
+    assert success, message
+    rows = read_csv(output)
+    assert rows[0] == ["时间", "通讯类型", "Topic", "数据", "解码数据"]
+    assert rows[1][4] == '{"i":0}'
+    # 解码失败的行第五列留空
+    assert rows[3][4] == ""
+    assert json.loads(rows[-1][4]) == NESTED
+    assert "\n" not in rows[-1][4]
+
+
+def test_conversion_to_jsonl_writes_objects(tmp_path):
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.jsonl")
+    write_csv(source, [["2025-12-12 11:00:00", "上行", "t", encode(NESTED)], ["2025-12-12 11:00:01", "", "t", ""]])
+    converter = DecodeConverter(1, output_format='jsonl')
+    success, message, _ = converter.process_file(source, output)
+    assert success, message
+    records = read_jsonl(output)
+    assert records[0]["解码数据"] == NESTED
+    assert "通讯类型" not in records[1]
+    assert "数据" not in records[1]
+
+
+def test_parquet_writer_and_resume(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from tencent_decode_tool import ParquetOutputWriter
+
+    path = str(tmp_path / "out.parquet")
+    writer = ParquetOutputWriter(path)
+    assert writer.decode_style == 'compact'
+    writer.append(["时间", "", "数据"])
+    writer.append([datetime(2025, 12, 12, 10, 0, 1), "", 5, "表头之外"])
+    writer.append_batch(RowBatch([["t1", "t2"], ["x", None]], 3))
+    writer.save()
+    table = pq.read_table(path)
+    assert table.column_names == ["时间", "列2", "数据"]
+    assert table.to_pylist() == [
+        {'时间': "2025-12-12 10:00:01", '列2': None, '数据': "5"},
+        {'时间': "t1", '列2': "x", '数据': None},
+        {'时间': "t2", '列2': None, '数据': None},
+    ]
+
+    resumed = str(tmp_path / "resumed.parquet")
+    writer = ParquetOutputWriter(resumed, resume_from=[path])
+    writer.append(["时间", "", "数据"])
+    writer.append(["t3", "y", "z"])
+    writer.save()
+    assert [row['时间'] for row in pq.read_table(resumed).to_pylist()] == ["2025-12-12 10:00:01", "t1", "t2", "t3"]
+
+    writer = ParquetOutputWriter(str(tmp_path / "cancelled.parquet"))
+    writer.append(["a"])
+    writer.discard()
+    assert not any(name.startswith("cancelled") for name in os.listdir(tmp_path))
+
+
+def test_parquet_conversion(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.parquet")
+    write_csv(source, sample_rows(30))
+    converter = DecodeConverter(1, output_format='parquet')
+    success, message, count = converter.process_file(source, output)
+    assert success, message
+    records = pq.read_table(output).to_pylist()
+    assert len(records) == count == 30
+    assert records[4]["解码数据"] == '{"i":4}'
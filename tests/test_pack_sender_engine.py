@@ -0,0 +1,154 @@
+"""发放引擎的限流、熔断与自适应并发测试"""
+import threading
+import time
+
+import pytest
+import requests
+
+from user_pack_sender import (
+    AIMDController, CircuitBreaker, PackSenderEngine, SendCancelled, TokenBucket,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """按顺序返回预设结果的会话：元素为状态码或要抛出的异常"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+
+    def post(self, url, timeout=None, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def make_engine(outcomes, **kwargs):
+    engine = PackSenderEngine("http://api1", "http://api2", **kwargs)
+    engine.session = FakeSession(outcomes)
+    return engine
+
+
+def test_token_bucket_unlimited_never_blocks():
+    bucket = TokenBucket(0)
+    start = time.monotonic()
+    for _ in range(1000):
+        bucket.acquire()
+    assert time.monotonic() - start < 0.5
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    # 突发 2 个，其余 2 个按每秒 20 个补充
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_cancelled_while_waiting():
+    bucket = TokenBucket(rate=0.1, capacity=1)
+    bucket.acquire()
+    stop_event = threading.Event()
+    stop_event.set()
+    with pytest.raises(SendCancelled):
+        bucket.acquire(stop_event)
+
+
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_breaker_half_open_allows_single_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.acquire()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.probe_in_flight
+    # 探测未结束时其他请求继续等待
+    stop_event = threading.Event()
+    threading.Timer(0.2, stop_event.set).start()
+    with pytest.raises(SendCancelled):
+        breaker.acquire(stop_event)
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.probe_in_flight
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.05)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.probe_in_flight
+
+
+def test_post_records_5xx_as_failure():
+    engine = make_engine([500, 500], breaker_threshold=2)
+    engine._post('api1', "http://api1")
+    assert engine.breakers['api1'].state == CircuitBreaker.CLOSED
+    engine._post('api1', "http://api1")
+    assert engine.breakers['api1'].state == CircuitBreaker.OPEN
+
+
+def test_post_releases_probe_on_unexpected_error():
+    engine = make_engine([ValueError("bad payload"), 200], breaker_threshold=1, breaker_reset=0.05)
+    breaker = engine.breakers['api1']
+    breaker.record_failure()
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        engine._post('api1', "http://api1")
+    # 意外异常同样计为探测失败，标记被释放，熔断重新打开
+    assert not breaker.probe_in_flight
+    assert breaker.state == CircuitBreaker.OPEN
+    assert engine.metrics['api1'].snapshot()['in_flight'] == 0
+    time.sleep(0.06)
+    assert engine._post('api1', "http://api1").status_code == 200
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_post_request_exception_releases_controller():
+    engine = make_engine([requests.exceptions.ConnectionError("refused")])
+    engine.set_adaptive(True, 8)
+    with pytest.raises(requests.exceptions.RequestException):
+        engine._post('api1', "http://api1")
+    assert engine.controllers['api1'].in_flight == 0
+    assert engine.breakers['api1'].failures == 1
+
+
+def test_aimd_increases_on_healthy_window():
+    controller = AIMDController(initial=2, window=4)
+    for _ in range(4):
+        controller.acquire()
+        controller.release(0.01)
+    assert controller.limit == 3
+
+
+def test_aimd_decreases_on_timeout():
+    controller = AIMDController(initial=8, window=4)
+    for _ in range(8):
+        controller.acquire()
+        controller.release(None, error=True, timeout=True)
+    assert controller.limit == 4
+
+
+def test_aimd_decreases_on_error_rate():
+    controller = AIMDController(initial=4, window=4, max_error_rate=0.1)
+    for index in range(4):
+        controller.acquire()
+        controller.release(0.01, error=index == 0)
+    assert controller.limit == 2
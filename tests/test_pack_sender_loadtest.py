@@ -0,0 +1,45 @@
+"""压测用模拟后端：按礼包与用户记录发放状态"""
+import json
+import urllib.request
+
+from pack_sender_loadtest import API1_PATH, API2_PATH, MockBackend, MockBackendConfig, start_mock_server
+
+
+def quiet_backend():
+    return MockBackend(MockBackendConfig(latency_ms=0, jitter_ms=0, already_rate=0))
+
+
+def test_api1_grants_are_per_pack():
+    backend = quiet_backend()
+    assert backend.handle(API1_PATH, "10", 1)[1]['success']
+    # 同一用户领取另一个活动的礼包不算重复
+    assert backend.handle(API1_PATH, "10", 2)[1]['success']
+    assert backend.handle(API1_PATH, "10", 1)[1]['code'] == 1001
+    assert backend.handle(API1_PATH, "11", 1)[1]['success']
+
+
+def test_api2_grants_are_per_user():
+    backend = quiet_backend()
+    assert backend.handle(API2_PATH, "10")[1]['data'] == "发放成功"
+    assert backend.handle(API2_PATH, "10")[1]['data'] == "已购买: 1"
+    backend.reset()
+    assert backend.handle(API2_PATH, "10")[1]['data'] == "发放成功"
+
+
+def test_server_reads_pack_id_from_request():
+    server, backend = start_mock_server(MockBackendConfig(latency_ms=0, jitter_ms=0, already_rate=0))
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}{API1_PATH}"
+
+        def send(pack_id):
+            data = json.dumps({'packId': pack_id, 'userIds': [10]}).encode('utf-8')
+            request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.loads(response.read())
+
+        assert send(1)['success'] and send(2)['success']
+        assert send(1)['code'] == 1001
+        assert backend.granted[API1_PATH] == {(1, "10"), (2, "10")}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,125 @@
+"""Topic 汇总：分桶分位数、报告的保存与恢复、xlsx 汇总工作表与 JSON 报告"""
+import json
+import os
+
+import pytest
+
+from conftest import encode, read_jsonl, sample_rows, write_csv
+from tencent_decode_tool import DecodeConverter, RowBatch, TopicReport, TopicStats, report_path_for
+
+
+@pytest.mark.parametrize("value, size", [
+    ("", 0), ("YQ==", 1), ("YWI=", 2), ("YWJj", 3), ("  YWJjZA==\n", 4), (encode({'i': 1}), 8),
+])
+def test_payload_size_accounts_for_padding(value, size):
+    assert TopicReport.payload_size(value) == size
+
+
+def test_percentiles_use_power_of_two_bucket_upper_bounds():
+    stats = TopicStats()
+    for size in (1, 3, 7, 100, 1000):
+        stats.add("2025-12-12 10:00:00", size, failed=False)
+    # 各桶上界为 2^k - 1，分位数取目标所在桶的上界，不超过最大值
+    assert stats.percentile(0.5) == 7
+    assert stats.percentile(0.7) == 127
+    assert stats.percentile(0.9) == 1000
+    assert TopicStats().percentile(0.5) == 0
+
+
+def test_zero_sized_and_empty_values():
+    stats = TopicStats()
+    stats.add("", 0, failed=True)
+    stats.add("", None, failed=False)
+    assert (stats.messages, stats.failed, stats.empty, stats.decoded) == (2, 1, 1, 0)
+    assert stats.percentile(0.99) == 0
+    assert stats.failure_rate() == 1.0
+    assert stats.first_time is None
+
+
+def test_stats_round_trip_and_merge():
+    first, second = TopicStats(), TopicStats()
+    for i, size in enumerate((5, 40, 300, 4096)):
+        first.add(f"2025-12-12 10:00:0{i}", size, failed=i == 2)
+    second.add("2025-12-11 09:00:00", 2, failed=False)
+    second.add("2025-12-13 09:00:00", None, failed=False)
+
+    restored = TopicStats.from_dict(json.loads(json.dumps(first.to_dict())))
+    assert restored.to_dict() == first.to_dict()
+    assert restored.histogram == first.histogram
+
+    restored.merge(second)
+    first.merge(second)
+    assert restored.to_dict() == first.to_dict()
+    assert (first.messages, first.failed, first.empty, first.size_min) == (6, 1, 1, 2)
+    assert (first.first_time, first.last_time) == ("2025-12-11 09:00:00", "2025-12-13 09:00:00")
+
+
+def test_report_round_trip_and_rows():
+    report = TopicReport()
+    rows = sample_rows(30, bad={4})
+    batch = RowBatch([list(column) for column in zip(*rows)], 2)
+    results = [(i != 4, "") for i in range(30)]
+    report.add_batch(batch, results)
+
+    data = json.loads(json.dumps(report.to_dict()))
+    restored = TopicReport.from_dict(data)
+    assert {key: stats.to_dict() for key, stats in restored.stats.items()} == \
+        {key: stats.to_dict() for key, stats in report.stats.items()}
+
+    table = report.rows()
+    assert table[0] == TopicReport.HEADER
+    assert [row[:2] for row in table[1:-1]] == [
+        ["topic/0", "上行"], ["topic/0", "下行"], ["topic/1", "上行"], ["topic/1", "下行"],
+        ["topic/2", "上行"], ["topic/2", "下行"],
+    ]
+    total = table[-1]
+    assert total[:6] == ["（合计）", "", 30, 29, 1, 0]
+    assert total[6] == f"{1 / 30 * 100:.2f}%"
+    assert data['total']['messages'] == 30
+
+
+def test_xlsx_output_gets_summary_sheet(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.xlsx")
+    write_csv(source, sample_rows(60, bad={7, 8}))
+    converter = DecodeConverter(1, build_report=True)
+    success, message, _ = converter.process_file(source, output)
+    assert success, message
+    assert not os.path.exists(report_path_for(output))
+    workbook = openpyxl.load_workbook(output, read_only=True)
+    try:
+        assert "Topic汇总" in workbook.sheetnames
+        rows = [list(row) for row in workbook["Topic汇总"].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+    # openpyxl 把空字符串单元格读回为 None
+    assert rows == [[None if value == "" else value for value in row] for row in converter.report.rows()]
+    assert rows[-1][:5] == ["（合计）", None, 60, 58, 2]
+
+
+@pytest.mark.parametrize("output_format", ['jsonl', 'csv'])
+def test_other_formats_write_json_report(tmp_path, output_format):
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / f"out.{output_format}")
+    write_csv(source, sample_rows(20))
+    converter = DecodeConverter(1, output_format=output_format, build_report=True)
+    success, message, _ = converter.process_file(source, output)
+    assert success, message
+    report_path = str(tmp_path / "out_汇总.json")
+    assert converter.report_path == report_path
+    assert not os.path.exists(report_path + ".part")
+    with open(report_path, encoding='utf-8') as f:
+        data = json.load(f)
+    assert data['total']['messages'] == 20
+    assert {(item['topic'], item['type']) for item in data['topics']} == \
+        {(f"topic/{i % 3}", "上行" if i % 2 else "下行") for i in range(20)}
+    if output_format == 'jsonl':
+        assert len(read_jsonl(output)) == 20
+
+
+def test_no_report_unless_requested(tmp_path):
+    source, output = str(tmp_path / "in.csv"), str(tmp_path / "out.jsonl")
+    write_csv(source, sample_rows(5))
+    converter = DecodeConverter(1, output_format='jsonl')
+    assert converter.process_file(source, output)[0]
+    assert converter.report is None
+    assert not os.path.exists(report_path_for(output))
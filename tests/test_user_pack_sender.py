@@ -0,0 +1,213 @@
+"""活动配置、进度记录、台账与多活动发放测试"""
+import json
+import threading
+
+import pytest
+
+from user_pack_sender import (
+    Campaign, GrantLedger, PackSenderEngine, ProgressJournal, load_campaign_config, parse_args, run_cli,
+)
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body):
+        self.body = body
+
+    def json(self):
+        return self.body
+
+
+class RecordingSession:
+    """两个接口都返回成功，并记录每次调用；api2_fail 中的用户接口2返回业务失败"""
+
+    def __init__(self, api2_fail=()):
+        self.calls = []
+        self.api2_fail = set(api2_fail)
+        self.lock = threading.Lock()
+
+    def post(self, url, timeout=None, json=None, data=None, **kwargs):
+        with self.lock:
+            if json is not None:
+                self.calls.append(('api1', str(json['userIds'][0]), json['packId']))
+                return FakeResponse({'success': True, 'code': 0})
+            self.calls.append(('api2', data['userId'], None))
+            if data['userId'] in self.api2_fail:
+                return FakeResponse({'code': 1, 'message': "系统繁忙"})
+            return FakeResponse({'code': 0})
+
+    def count(self, endpoint):
+        return sum(1 for call in self.calls if call[0] == endpoint)
+
+
+def write_config(tmp_path, data):
+    path = tmp_path / "campaigns.json"
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def make_campaigns(count):
+    return [Campaign(f"活动{i}", 100 + i, f"礼包{i}", "补发") for i in range(count)]
+
+
+def run_engine(user_ids, campaigns, session, **kwargs):
+    engine = PackSenderEngine("http://api1", "http://api2")
+    engine.session = session
+    results = []
+    summary = engine.run(user_ids, results.append, threading.Event(), campaigns, **kwargs)
+    return summary, results
+
+
+def test_config_loads_campaigns(tmp_path):
+    path = write_config(tmp_path, {'api1_url': "http://a", 'campaigns': [
+        {'name': "春节", 'pack_id': 1, 'pack_name': "礼包A"},
+        {'pack_id': "2", 'pack_name': "礼包B", 'api2_url': "http://b"},
+    ]})
+    config = load_campaign_config(path)
+    assert config['api1_url'] == "http://a"
+    assert [c.name for c in config['campaigns']] == ["春节", "礼包B"]
+    assert config['campaigns'][1].pack_id == 2
+    assert config['campaigns'][1].api2_url == "http://b"
+
+
+@pytest.mark.parametrize("data", [
+    [{'pack_id': 1, 'pack_name': "A"}],
+    "campaigns",
+    {'campaigns': {'pack_id': 1, 'pack_name': "A"}},
+    {'campaigns': ["A"]},
+    {'campaigns': [{'pack_id': 1}]},
+    {'campaigns': [{'pack_id': "x", 'pack_name': "A"}]},
+    {'campaigns': [{'pack_id': 1, 'pack_name': "A", 'use_flag': "是"}]},
+    {'campaigns': [{'pack_id': 1, 'pack_name': "A", 'api1_url': 5}]},
+    {'api2_url': ["http://b"], 'campaigns': [{'pack_id': 1, 'pack_name': "A"}]},
+    {'campaigns': []},
+    {'campaigns': [{'pack_id': 1, 'pack_name': "A"}, {'pack_id': 1, 'pack_name': "B"}]},
+])
+def test_config_rejects_bad_shape_with_value_error(tmp_path, data):
+    with pytest.raises(ValueError):
+        load_campaign_config(write_config(tmp_path, data))
+
+
+def test_config_unreadable_file_is_value_error(tmp_path):
+    with pytest.raises(ValueError):
+        load_campaign_config(str(tmp_path / "missing.json"))
+    bad = tmp_path / "bad.json"
+    bad.write_text("{", encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_campaign_config(str(bad))
+
+
+def test_journal_resume_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ProgressJournal(path)
+    journal.record({'user_id': "1", 'api1_ok': True, 'api2_ok': True, 'ok': True})
+    journal.record({'user_id': "2", 'api1_ok': True, 'api2_ok': False, 'ok': False})
+    journal.record({'user_id': "3", 'api1_ok': False, 'api2_ok': None, 'ok': False})
+    journal.close()
+    
+    journal = ProgressJournal(path)
+    assert journal.is_done("1") and journal.api2_done("1")
+    assert not journal.is_done("2") and journal.api1_done("2") and not journal.api2_done("2")
+    assert not journal.api1_done("3")
+    # 同一用户以最后一条记录为准
+    journal.record({'user_id': "2", 'api1_ok': True, 'api2_ok': True, 'ok': True})
+    journal.close()
+    assert ProgressJournal(path).is_done("2")
+
+
+def test_journal_append_after_torn_last_line(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = ProgressJournal(path)
+    journal.record({'user_id': "1", 'api1_ok': True, 'api2_ok': True, 'ok': True})
+    journal.close()
+    # 模拟崩溃时写了一半的最后一行
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"user_id": "2", "ok": tr')
+    
+    journal = ProgressJournal(path)
+    assert journal.is_done("1") and not journal.is_done("2")
+    journal.record({'user_id': "2", 'api1_ok': True, 'api2_ok': True, 'ok': True})
+    journal.close()
+    assert ProgressJournal(path).is_done("2")
+
+
+def test_ledger_persists_per_pack(tmp_path):
+    path = str(tmp_path / "ledger.db")
+    ledger = GrantLedger(path, commit_every=2)
+    ledger.mark(1, "10")
+    ledger.mark(1, "10")
+    ledger.mark(2, "11")
+    ledger.mark(1, "not-a-number")
+    assert ledger.is_granted(1, "10")
+    assert not ledger.is_granted(2, "10")
+    assert not ledger.is_granted(1, "not-a-number")
+    ledger.close()
+    
+    ledger = GrantLedger(path)
+    assert ledger.is_granted(1, "10") and ledger.is_granted(2, "11")
+    assert not ledger.is_granted(1, "11")
+    ledger.close()
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_api2_called_once_per_user_across_campaigns(workers):
+    session = RecordingSession()
+    users = [str(i) for i in range(1, 21)]
+    summary, results = run_engine(users, make_campaigns(3), session, workers=workers)
+    assert session.count('api1') == 60
+    assert session.count('api2') == 20
+    assert len(results) == 60 and all(result['ok'] for result in results)
+    assert summary['failed'] == 0
+    assert all(counts['ok'] == 20 for counts in summary['campaigns'].values())
+
+
+def test_api2_failure_is_retried_not_shared_forever():
+    session = RecordingSession(api2_fail={"2"})
+    summary, results = run_engine(["1", "2"], make_campaigns(2), session, continue_on_error=True)
+    # 用户2的接口2失败不缓存：第一轮每个活动各调用一次，重试轮再各调用一次
+    assert [call[1] for call in session.calls if call[0] == 'api2'].count("1") == 1
+    assert [call[1] for call in session.calls if call[0] == 'api2'].count("2") == 4
+    assert summary['failed'] == 2
+
+
+def test_api2_skipped_on_resume_when_another_campaign_finished_it(tmp_path):
+    campaigns = make_campaigns(2)
+    journals = {c.pack_id: ProgressJournal(str(tmp_path / f"{c.pack_id}.jsonl")) for c in campaigns}
+    journals[100].record({'user_id': "1", 'api1_ok': True, 'api2_ok': True, 'ok': True})
+    session = RecordingSession()
+    summary, results = run_engine(["1"], campaigns, session, journals=journals)
+    for journal in journals.values():
+        journal.close()
+    assert session.calls == [('api1', "1", 101)]
+    assert summary['skipped'] == 1
+    assert results[0]['ok'] and results[0]['api2_msg'] == "已完成(断点)"
+
+
+def test_ledger_skips_before_any_request(tmp_path):
+    ledger = GrantLedger(str(tmp_path / "ledger.db"))
+    ledger.mark(100, "1")
+    session = RecordingSession()
+    summary, _ = run_engine(["1", "2"], make_campaigns(1), session, ledger=ledger)
+    ledger.close()
+    assert summary['already_granted'] == 1
+    assert [call[1] for call in session.calls] == ["2", "2"]
+
+
+def test_adaptive_ceiling_clamped_to_max_workers():
+    engine = PackSenderEngine("http://api1", "http://api2")
+    engine.set_adaptive(True, 500)
+    assert {controller.max_limit for controller in engine.controllers.values()} == {PackSenderEngine.MAX_WORKERS}
+    engine.set_adaptive(True, 0)
+    assert {controller.max_limit for controller in engine.controllers.values()} == {1}
+
+
+def test_cli_missing_input_file_is_config_error(tmp_path, capsys):
+    config = write_config(tmp_path, {'api1_url': "http://api1", 'api2_url': "http://api2",
+                                     'campaigns': [{'name': "活动", 'pack_id': 1, 'pack_name': "礼包",
+                                                    'reason': "补发"}]})
+    args = parse_args(["--cli", "--config", config, "--input", str(tmp_path / "missing.txt"),
+                       "--output", str(tmp_path / "out.jsonl"), "--no-journal", "--no-ledger"])
+    assert run_cli(args) == 2
+    assert "无法读取用户ID文件" in capsys.readouterr().err
+    assert not (tmp_path / "out.jsonl").exists()
@@ -0,0 +1,102 @@
+"""监听模式的处理记录与目录扫描测试"""
+import os
+import time
+
+import pytest
+
+from tencent_decode_tool import FolderWatcher, PollingWaiter, WatchState
+
+
+def make_file(path, content="a,b,c,d\n", age=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    if age is not None:
+        stamp = time.time() - age
+        os.utime(path, (stamp, stamp))
+    return str(path)
+
+
+def make_watcher(tmp_path, state=None, settle_seconds=5.0, recursive=False):
+    watch_dir = tmp_path / "watch"
+    watch_dir.mkdir(exist_ok=True)
+    state = state or WatchState(str(tmp_path / "state.json"))
+    return FolderWatcher(str(watch_dir), str(watch_dir / "out"), str(watch_dir / "failed"), state,
+                         jobs=1, decode_workers=1, convert_options={'output_format': 'jsonl'},
+                         recursive=recursive, settle_seconds=settle_seconds, waiter=PollingWaiter())
+
+
+def test_state_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "state.json")
+    state = WatchState(path)
+    state.record("/in/a.csv", (10, 123), {'success': True, 'output': "/out/a.jsonl", 'message': "ok"})
+    state.record("/in/b.csv", (5, 7), {'success': False, 'output': "/out/b.jsonl", 'message': "坏文件"})
+    
+    state = WatchState(path)
+    assert state.handled("/in/a.csv", (10, 123))
+    assert not state.handled("/in/a.csv", (11, 123))
+    assert not state.handled("/in/a.csv", (10, 124))
+    assert state.handled("/in/b.csv", (5, 7))
+    assert state.files["/in/b.csv"]['output'] is None
+    assert not os.path.exists(path + ".tmp")
+
+
+@pytest.mark.parametrize("content", ["[]", '{"version": 99, "files": {}}', "{"])
+def test_state_refuses_unknown_file(tmp_path, content):
+    path = tmp_path / "state.json"
+    path.write_text(content, encoding='utf-8')
+    with pytest.raises(ValueError):
+        WatchState(str(path))
+
+
+def test_scan_waits_for_new_files_to_settle(tmp_path):
+    watcher = make_watcher(tmp_path, settle_seconds=0.2)
+    path = make_file(tmp_path / "watch" / "new.csv")
+    watcher.scan()
+    assert list(watcher.ready) == [] and path in watcher.pending
+    time.sleep(0.25)
+    watcher.scan()
+    assert list(watcher.ready) == [path] and not watcher.pending
+
+
+def test_scan_restarts_timer_when_file_changes(tmp_path):
+    watcher = make_watcher(tmp_path, settle_seconds=0.2)
+    path = make_file(tmp_path / "watch" / "growing.csv")
+    watcher.scan()
+    time.sleep(0.25)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("1,2,3,4\n")
+    watcher.scan()
+    assert list(watcher.ready) == []
+    time.sleep(0.25)
+    watcher.scan()
+    assert list(watcher.ready) == [path]
+
+
+def test_scan_skips_handled_and_non_input_files(tmp_path):
+    state = WatchState(str(tmp_path / "state.json"))
+    watch_dir = tmp_path / "watch"
+    watch_dir.mkdir()
+    done = make_file(watch_dir / "done.csv", age=60)
+    state.record(done, FolderWatcher.signature(done), {'success': True, 'output': "x", 'message': "ok"})
+    make_file(watch_dir / "done_转码_20250101.csv", age=60)
+    make_file(watch_dir / "~$lock.xlsx", age=60)
+    make_file(watch_dir / "notes.txt", age=60)
+    old = make_file(watch_dir / "old.csv", age=60)
+    watcher = make_watcher(tmp_path, state=state)
+    watcher.scan()
+    # 重启前已经写完的文件不必再等
+    assert list(watcher.ready) == [old]
+    watcher.scan()
+    assert list(watcher.ready) == [old]
+
+
+def test_recursive_scan_skips_output_and_failed_dirs(tmp_path):
+    watcher = make_watcher(tmp_path, recursive=True)
+    watch_dir = tmp_path / "watch"
+    for name in ("sub", "out", "failed"):
+        (watch_dir / name).mkdir()
+    inner = make_file(watch_dir / "sub" / "a.csv", age=60)
+    make_file(watch_dir / "out" / "b.csv", age=60)
+    make_file(watch_dir / "failed" / "c.csv", age=60)
+    watcher.scan()
+    assert list(watcher.ready) == [inner]
@@ -0,0 +1,62 @@
+"""xlrd 读取 .xls 输入：日期单元格按工作簿的日期基准转为 datetime"""
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+xlwt = pytest.importorskip("xlwt")
+xlrd = pytest.importorskip("xlrd")
+
+from tencent_decode_tool import DecodeConverter, XlrdSheetReader
+
+
+def write_xls(path, times, date1904=False):
+    workbook = xlwt.Workbook()
+    workbook.dates_1904 = date1904
+    sheet = workbook.add_sheet("日志")
+    date_style = xlwt.easyxf(num_format_str='yyyy-mm-dd hh:mm:ss')
+    for col, name in enumerate(["时间", "通讯类型", "Topic", "数据"]):
+        sheet.write(0, col, name)
+    for row, value in enumerate(times, start=1):
+        sheet.write(row, 0, value, date_style)
+        sheet.write(row, 1, "上行")
+        sheet.write(row, 2, f"topic/{row % 2}")
+        sheet.write(row, 3, base64.b64encode(json.dumps({'row': row}).encode('utf-8')).decode('ascii'))
+        sheet.write(row, 4, 1.5)
+    workbook.save(str(path))
+
+
+TIMES = [datetime(2025, 12, 12, 10, 0, 5), datetime(2025, 12, 12, 11, 30), datetime(2025, 12, 13, 0, 0, 1)]
+
+
+@pytest.mark.parametrize("date1904", [False, True])
+def test_reader_converts_date_cells(tmp_path, date1904):
+    path = tmp_path / "in.xls"
+    write_xls(path, TIMES, date1904)
+    workbook = xlrd.open_workbook(str(path))
+    assert workbook.datemode == int(date1904)
+    reader = XlrdSheetReader(workbook.sheet_by_index(0), workbook.datemode)
+    header, batches = reader.read()
+    assert header == ["时间", "通讯类型", "Topic", "数据", ""]
+    columns = next(batches).columns
+    assert columns[0] == TIMES
+    # 非日期格式的数字保持原值
+    assert columns[4] == [1.5] * 3
+    rows = list(reader.iter_rows())
+    assert [row[0] for row in rows[1:]] == TIMES
+
+
+def test_xls_round_trip_keeps_times(tmp_path):
+    source = tmp_path / "in.xls"
+    write_xls(source, TIMES)
+    output = tmp_path / "out.jsonl"
+    converter = DecodeConverter(1, output_format='jsonl', build_index=True)
+    success, message, count = converter.process_file(str(source), str(output))
+    assert success, message
+    assert count == 3
+    with open(output, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert [record["时间"] for record in records] == [str(value) for value in TIMES]
+    index = converter.message_index
+    assert list(index.query(start="2025-12-12 11", end="2025-12-12")) == [1]
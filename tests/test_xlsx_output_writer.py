@@ -0,0 +1,93 @@
+"""xlsx 输出的行数拆分与超长单元格附件测试"""
+import gc
+import os
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from tencent_decode_tool import XlsxOutputWriter
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    # 每个工作表 3 行（含表头），单元格最多 5 个字符
+    monkeypatch.setattr(XlsxOutputWriter, 'MAX_ROWS', 3)
+    monkeypatch.setattr(XlsxOutputWriter, 'MAX_CELL_CHARS', 5)
+
+
+def write_rows(path, split, rows):
+    writer = XlsxOutputWriter(path, split=split)
+    writer.add_sheet("数据")
+    writer.append(["id", "内容"])
+    for row in rows:
+        writer.append(row)
+    writer.save()
+    return writer
+
+
+def read_sheets(path):
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)]
+                for sheet in workbook.worksheets}
+    finally:
+        workbook.close()
+
+
+def spilled_text(path, cell):
+    """按单元格中的附件路径读出完整内容"""
+    relative = cell.split("完整内容见: ")[1].rstrip("]")
+    with open(os.path.join(os.path.dirname(path), relative), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_split_sheet_repeats_header(tmp_path, small_limits):
+    path = str(tmp_path / "out.xlsx")
+    write_rows(path, 'sheet', [[i, "x"] for i in range(5)])
+    sheets = read_sheets(path)
+    assert list(sheets) == ["数据", "数据_2", "数据_3"]
+    assert all(rows[0] == ["id", "内容"] for rows in sheets.values())
+    assert [row[0] for rows in sheets.values() for row in rows[1:]] == list(range(5))
+
+
+def test_split_file_writes_numbered_files(tmp_path, small_limits):
+    path = str(tmp_path / "out.xlsx")
+    writer = write_rows(path, 'file', [[i, "x"] for i in range(5)])
+    assert [os.path.basename(p) for p in writer.output_paths()] == ["out.xlsx", "out_2.xlsx", "out_3.xlsx"]
+    ids = []
+    for part in writer.output_paths():
+        rows = read_sheets(part)["数据"]
+        assert rows[0] == ["id", "内容"]
+        ids.extend(row[0] for row in rows[1:])
+    assert ids == list(range(5))
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
+
+
+@pytest.mark.parametrize("split", ['sheet', 'file'])
+def test_spilled_cells_are_unique_across_parts(tmp_path, small_limits, split):
+    path = str(tmp_path / "out.xlsx")
+    values = [f"内容很长的第{i}行" for i in range(5)]
+    writer = write_rows(path, split, [[i, value] for i, value in enumerate(values)])
+    assert len(set(writer.spilled_files)) == 5
+    cells = []
+    for part in writer.output_paths():
+        for rows in read_sheets(part).values():
+            cells.extend(row[1] for row in rows[1:])
+    # 每个单元格都能按附件路径取回自己的完整内容，后面的部分不覆盖前面的附件
+    assert [spilled_text(path, cell) for cell in cells] == values
+
+
+# 丢弃时未保存的只写工作表由垃圾回收关闭，openpyxl 会打印一条无害的提示
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnraisableExceptionWarning")
+def test_discard_removes_parts_and_spills(tmp_path, small_limits):
+    path = str(tmp_path / "out.xlsx")
+    writer = XlsxOutputWriter(path, split='file')
+    writer.add_sheet("数据")
+    writer.append(["id", "内容"])
+    for i in range(4):
+        writer.append([i, "超过五个字符"])
+    writer.discard()
+    assert os.listdir(tmp_path) == []
+    del writer
+    gc.collect()
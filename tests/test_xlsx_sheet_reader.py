@@ -0,0 +1,244 @@
+"""直接解析工作表 XML 的 .xlsx 快速读取器测试：取值与 openpyxl 只读模式一致，不支持的结构抛出异常"""
+import zipfile
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+# 测试用的最小样式表没有默认样式，openpyxl 会提示改用自带的默认样式
+pytestmark = pytest.mark.filterwarnings("ignore:Workbook contains no default style")
+
+from conftest import encode
+from tencent_decode_tool import DecodeConverter, UnsupportedWorkbook, XlsxSheetReader
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PKG_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+DOC_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+STYLES = f"""<styleSheet xmlns="{MAIN_NS}">
+<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>
+<cellXfs count="5">
+<xf numFmtId="0"/><xf numFmtId="14"/><xf numFmtId="164"/><xf numFmtId="46"/><xf numFmtId="2"/>
+</cellXfs></styleSheet>"""
+
+
+def build_xlsx(path, rows_xml, shared_strings=(), sheets=1, date1904=False, styles=True, dimension=None):
+    """按给定的 sheetData 内容生成最小的 .xlsx（sheets 为工作表个数，内容相同）"""
+    sheet_entries = "".join(f'<sheet name="表{i + 1}" sheetId="{i + 1}" r:id="rId{i + 1}"/>'
+                            for i in range(sheets))
+    workbook_pr = '<workbookPr date1904="1"/>' if date1904 else ""
+    workbook = (f'<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">{workbook_pr}'
+                f'<sheets>{sheet_entries}</sheets></workbook>')
+    rels = [f'<Relationship Id="rId{i + 1}" Type="{DOC_REL}/worksheet" Target="worksheets/sheet{i + 1}.xml"/>'
+            for i in range(sheets)]
+    rels.append(f'<Relationship Id="rIdS" Type="{DOC_REL}/sharedStrings" Target="sharedStrings.xml"/>')
+    if styles:
+        rels.append(f'<Relationship Id="rIdT" Type="{DOC_REL}/styles" Target="styles.xml"/>')
+    dimension_xml = f'<dimension ref="{dimension}"/>' if dimension else ""
+    sheet = f'<worksheet xmlns="{MAIN_NS}">{dimension_xml}<sheetData>{rows_xml}</sheetData></worksheet>'
+    strings = "".join(item if item.startswith("<si>") else f"<si><t>{item}</t></si>" for item in shared_strings)
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr("[Content_Types].xml", """<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>""")
+        archive.writestr("_rels/.rels", f'<Relationships xmlns="{PKG_REL_NS}"><Relationship Id="rId1" '
+                                        f'Type="{DOC_REL}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        archive.writestr("xl/workbook.xml", workbook)
+        archive.writestr("xl/_rels/workbook.xml.rels", f'<Relationships xmlns="{PKG_REL_NS}">{"".join(rels)}</Relationships>')
+        for i in range(sheets):
+            archive.writestr(f"xl/worksheets/sheet{i + 1}.xml", sheet)
+        archive.writestr("xl/sharedStrings.xml", f'<sst xmlns="{MAIN_NS}">{strings}</sst>')
+        if styles:
+            archive.writestr("xl/styles.xml", STYLES)
+    return str(path)
+
+
+def replace_part(path, name, content):
+    """重写 .xlsx 中的某个部件"""
+    with zipfile.ZipFile(path) as archive:
+        parts = {part: archive.read(part) for part in archive.namelist()}
+    parts[name] = content.encode('utf-8')
+    with zipfile.ZipFile(path, 'w') as archive:
+        for part, data in parts.items():
+            archive.writestr(part, data)
+
+
+def trimmed(rows):
+    """去掉行末的空单元格（openpyxl 按最大列数补齐，快速读取器不补）"""
+    result = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] is None:
+            row.pop()
+        result.append(row)
+    return result
+
+
+def assert_same_as_openpyxl(path):
+    with XlsxSheetReader(path) as reader:
+        fast = trimmed(reader.iter_rows())
+    workbook = openpyxl.load_workbook(path, read_only=True)
+    try:
+        expected = trimmed(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+    assert fast == expected
+    return fast
+
+
+def test_shared_and_rich_text_strings(tmp_path):
+    path = build_xlsx(tmp_path / "s.xlsx", '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c>'
+                      '<c r="C1" t="s"><v>2</v></c></row>',
+                      shared_strings=["时间", "<si><r><t>富</t></r><r><t>文本</t></r></si>",
+                                      '<si><t>带注音</t><rPh sb="0" eb="1"><t>ちゅう</t></rPh></si>'])
+    assert assert_same_as_openpyxl(path) == [["时间", "富文本", "带注音"]]
+
+
+def test_inline_strings_skip_phonetic_runs(tmp_path):
+    path = build_xlsx(tmp_path / "i.xlsx", '<row r="1"><c r="A1" t="inlineStr"><is><t>行内</t></is></c>'
+                      '<c r="B1" t="inlineStr"><is><r><t>多</t></r><r><t>段</t></r>'
+                      '<rPh sb="0" eb="1"><t>ふりがな</t></rPh></is></c></row>')
+    assert assert_same_as_openpyxl(path) == [["行内", "多段"]]
+
+
+def test_numbers_booleans_errors_and_formulas(tmp_path):
+    path = build_xlsx(tmp_path / "n.xlsx",
+                      '<row r="1"><c r="A1"><v>42</v></c><c r="B1"><v>3.5</v></c><c r="C1"><v>1E-3</v></c>'
+                      '<c r="D1" s="4"><v>2.25</v></c><c r="E1" t="b"><v>1</v></c><c r="F1" t="b"><v>0</v></c>'
+                      '<c r="G1" t="e"><v>#DIV/0!</v></c><c r="H1"><f>A1+1</f><v>43</v></c>'
+                      '<c r="I1" t="str"><f>"a"&amp;"b"</f><v>ab</v></c><c r="J1" t="str"><v>文本结果</v></c></row>')
+    assert assert_same_as_openpyxl(path) == [[42, 3.5, 0.001, 2.25, True, False, "#DIV/0!", "=A1+1",
+                                              '="a"&"b"', "文本结果"]]
+
+
+@pytest.mark.parametrize("date1904", [False, True])
+def test_date_styles_and_epochs(tmp_path, date1904):
+    path = build_xlsx(tmp_path / "d.xlsx",
+                      '<row r="1"><c r="A1" s="1"><v>45658</v></c><c r="B1" s="2"><v>45658.5</v></c>'
+                      '<c r="C1" s="3"><v>1.25</v></c><c r="D1" t="d"><v>2025-01-02T03:04:05</v></c>'
+                      '<c r="E1" s="1"><v>-5</v></c></row>',
+                      date1904=date1904)
+    rows = assert_same_as_openpyxl(path)
+    expected_year = 2029 if date1904 else 2025
+    assert rows[0][0].year == expected_year
+
+
+def test_sparse_cells_and_skipped_rows(tmp_path):
+    path = build_xlsx(tmp_path / "p.xlsx",
+                      '<row r="1"><c r="A1"><v>1</v></c><c r="D1"><v>4</v></c></row>'
+                      '<row r="4"><c r="B4"><v>2</v></c></row>'
+                      '<row><c><v>5</v></c><c><v>6</v></c></row>'
+                      '<row r="7"><c r="C7"/><c r="AA7"><v>27</v></c></row>')
+    rows = assert_same_as_openpyxl(path)
+    assert rows[1] == rows[2] == []
+    assert rows[3] == [None, 2]
+    assert rows[4] == [5, 6]
+    assert len(rows[6]) == 27
+
+
+def test_max_column_drops_extra_cells(tmp_path):
+    path = build_xlsx(tmp_path / "m.xlsx", '<row r="1"><c r="A1"><v>1</v></c><c r="F1"><v>6</v></c></row>')
+    with XlsxSheetReader(path, max_column=4) as reader:
+        assert list(reader.iter_rows()) == [[1]]
+
+
+def test_dimension_gives_row_count(tmp_path):
+    path = build_xlsx(tmp_path / "r.xlsx", '<row r="1"><c r="A1"><v>1</v></c></row>', dimension="A1:E120")
+    with XlsxSheetReader(path) as reader:
+        assert reader.row_count() == 119
+
+
+def test_parses_across_read_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(XlsxSheetReader, 'READ_BLOCK_SIZE', 64)
+    rows_xml = "".join(f'<row r="{i}"><c r="A{i}" t="inlineStr"><is><t>第{i}行的内容</t></is></c>'
+                       f'<c r="B{i}"><v>{i}</v></c></row>' for i in range(1, 201))
+    rows = assert_same_as_openpyxl(build_xlsx(tmp_path / "b.xlsx", rows_xml))
+    assert rows[-1] == ["第200行的内容", 200]
+
+
+# 每一种不支持的结构都要抛出 UnsupportedWorkbook（调用方改用 openpyxl）
+
+def test_not_a_zip_is_unsupported(tmp_path):
+    path = tmp_path / "fake.xlsx"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(UnsupportedWorkbook):
+        XlsxSheetReader(str(path))
+
+
+def test_multiple_sheets_are_unsupported(tmp_path):
+    path = build_xlsx(tmp_path / "multi.xlsx", '<row r="1"><c r="A1"><v>1</v></c></row>', sheets=2)
+    with pytest.raises(UnsupportedWorkbook):
+        XlsxSheetReader(path)
+
+
+def test_missing_workbook_part_is_unsupported(tmp_path):
+    path = tmp_path / "broken.xlsx"
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr("xl/workbook.xml", f'<workbook xmlns="{MAIN_NS}"><sheets/></workbook>')
+    with pytest.raises(UnsupportedWorkbook):
+        XlsxSheetReader(str(path))
+
+
+def test_malformed_workbook_xml_is_unsupported(tmp_path):
+    path = build_xlsx(tmp_path / "bad.xlsx", "")
+    replace_part(path, "xl/_rels/workbook.xml.rels", "<Relationships")
+    with pytest.raises(UnsupportedWorkbook):
+        XlsxSheetReader(path)
+
+
+def test_missing_sheet_relationship_is_unsupported(tmp_path):
+    path = build_xlsx(tmp_path / "norel.xlsx", "")
+    replace_part(path, "xl/_rels/workbook.xml.rels", f'<Relationships xmlns="{PKG_REL_NS}"></Relationships>')
+    with pytest.raises(UnsupportedWorkbook):
+        XlsxSheetReader(path)
+
+
+@pytest.mark.parametrize("formula_type", ["shared", "array"])
+def test_shared_and_array_formulas_are_unsupported(tmp_path, formula_type):
+    path = build_xlsx(tmp_path / "f.xlsx", '<row r="1"><c r="A1"><v>1</v></c></row>'
+                      f'<row r="2"><c r="A2"><f t="{formula_type}" ref="A2" si="0">A1</f><v>1</v></c></row>')
+    with XlsxSheetReader(path) as reader:
+        rows = reader.iter_rows()
+        with pytest.raises(UnsupportedWorkbook):
+            list(rows)
+
+
+def build_fallback_sheet(path):
+    """3000 行的单工作表：3 行数据无法解码，F2999 是共享公式（快速路径读到末尾才放弃）"""
+    cells = []
+    for i in range(2, 3001):
+        data = "abc" if i in (10, 1500, 2990) else encode({'i': i})
+        extra = '<c r="F{0}"><f t="shared" ref="F{0}" si="0">A1</f><v>1</v></c>'.format(i) if i == 2999 else ""
+        cells.append(f'<row r="{i}"><c r="A{i}"><v>{i}</v></c><c r="B{i}" t="inlineStr"><is><t>上行</t></is></c>'
+                     f'<c r="C{i}" t="inlineStr"><is><t>topic</t></is></c>'
+                     f'<c r="D{i}" t="inlineStr"><is><t>{data}</t></is></c>{extra}</row>')
+    header = ('<row r="1">' + "".join(f'<c r="{col}1" t="inlineStr"><is><t>{name}</t></is></c>'
+                                      for col, name in zip("ABCD", ["时间", "通讯类型", "Topic", "数据"])) + '</row>')
+    return build_xlsx(path, header + "".join(cells))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_fallback_after_partial_fast_read_reports_warnings_once(tmp_path, workers):
+    path = build_fallback_sheet(tmp_path / "in.xlsx")
+    warnings, infos = [], []
+    converter = DecodeConverter(workers, output_format='jsonl', on_warning=warnings.append, on_info=infos.append)
+    success, message, count = converter.process_file(path, str(tmp_path / "out.jsonl"))
+    assert success, message
+    assert any("openpyxl" in info for info in infos)
+    assert converter.error_count == 3
+    assert [warning.split(" 行")[0] for warning in warnings] == ["⚠️  第 10", "⚠️  第 1500", "⚠️  第 2990"]
+
+
+def test_fallback_keeps_collected_warnings_unique(tmp_path):
+    path = build_fallback_sheet(tmp_path / "in.xlsx")
+    converter = DecodeConverter(1, output_format='jsonl')
+    success, message, count = converter.process_file(path, str(tmp_path / "out.jsonl"))
+    assert success, message
+    assert len(converter.warnings) == 3
+    assert len(set(converter.warnings)) == 3
@@ -1,31 +1,1314 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
+import argparse
+import csv
+import json
+import os
+import queue
+import random
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
 import requests
-from typing import List, Tuple
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+
+# 接口配置（配置文件中未指定时使用）
+API1_URL = "http://10.102.32.14/pack/sendSingle"
+API2_URL = "http://10.102.40.32/service/content/ledu/right/giveByKefu"
+
+# 默认礼包（配置文件不存在时使用）
+PACK_ID = 4129
+PACK_NAME = "乐读补偿礼包_含非洲鼓-不包含乐读_魂守"
+PACK_DESC = "客服已沟通补发"
+USE_FLAG = 0
+
+# 活动配置文件名（位于本地数据目录）
+CONFIG_FILENAME = "campaigns.json"
+
+# 默认并发数与各接口限流（次/秒）
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_LIMIT = 20
+
+
+def get_data_dir() -> str:
+    """获取本地数据目录（进度记录等），不存在时自动创建"""
+    data_dir = os.path.join(os.path.expanduser("~"), ".user_pack_sender")
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+class Campaign:
+    """一次补偿活动：接口1发放的礼包参数，可单独指定接口地址"""
+
+    def __init__(self, name: str, pack_id: int, pack_name: str, desc: str, use_flag: int = 0,
+                 api1_url: Optional[str] = None, api2_url: Optional[str] = None):
+        self.name = name
+        self.pack_id = pack_id
+        self.pack_name = pack_name
+        self.desc = desc
+        self.use_flag = use_flag
+        self.api1_url = api1_url
+        self.api2_url = api2_url
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Campaign":
+        """从配置项创建，缺少必填字段或类型不对时抛出 ValueError"""
+        if not isinstance(data, dict):
+            raise ValueError(f"活动配置项必须是 JSON 对象: {data!r}")
+        try:
+            pack_id = int(data['pack_id'])
+            pack_name = str(data['pack_name'])
+        except KeyError as e:
+            raise ValueError(f"活动配置缺少字段: {e.args[0]}")
+        except (TypeError, ValueError):
+            raise ValueError(f"活动配置的 pack_id 必须是整数: {data.get('pack_id')}")
+        try:
+            use_flag = int(data.get('use_flag', 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"活动配置的 use_flag 必须是整数: {data.get('use_flag')}")
+        for key in ('api1_url', 'api2_url'):
+            if data.get(key) is not None and not isinstance(data[key], str):
+                raise ValueError(f"活动配置的 {key} 必须是字符串: {data[key]!r}")
+        return cls(
+            name=str(data.get('name') or pack_name),
+            pack_id=pack_id,
+            pack_name=pack_name,
+            desc=str(data.get('desc', PACK_DESC)),
+            use_flag=use_flag,
+            api1_url=data.get('api1_url'),
+            api2_url=data.get('api2_url'),
+        )
+
+    def to_dict(self) -> Dict:
+        data = {'name': self.name, 'pack_id': self.pack_id, 'pack_name': self.pack_name,
+                'desc': self.desc, 'use_flag': self.use_flag}
+        if self.api1_url:
+            data['api1_url'] = self.api1_url
+        if self.api2_url:
+            data['api2_url'] = self.api2_url
+        return data
+
+
+def default_campaign() -> Campaign:
+    """内置的默认礼包活动"""
+    return Campaign(PACK_NAME, PACK_ID, PACK_NAME, PACK_DESC, USE_FLAG)
+
+
+def load_campaign_config(path: Optional[str] = None) -> Dict:
+    """
+    读取活动配置文件（JSON）
+    
+    格式: {"api1_url": ..., "api2_url": ..., "campaigns": [{"name", "pack_id", "pack_name",
+    "desc", "use_flag"}, ...]}。未指定路径时使用数据目录下的 campaigns.json，
+    文件不存在则按默认礼包生成一份，方便直接修改。
+    
+    Returns:
+        配置字典：api1_url、api2_url、campaigns（Campaign 列表）
+    
+    Raises:
+        ValueError: 文件无法读写、不是合法 JSON 或内容结构不对
+    """
+    if path is None:
+        try:
+            path = os.path.join(get_data_dir(), CONFIG_FILENAME)
+            if not os.path.exists(path):
+                template = {'api1_url': API1_URL, 'api2_url': API2_URL,
+                            'campaigns': [default_campaign().to_dict()]}
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(template, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            raise ValueError(f"无法创建活动配置文件: {path or CONFIG_FILENAME}\n{e}")
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError as e:
+        raise ValueError(f"无法读取活动配置文件: {path}\n{e}")
+    except ValueError as e:
+        raise ValueError(f"活动配置文件格式错误: {path}\n{e}")
+    
+    if not isinstance(data, dict):
+        raise ValueError(f"活动配置文件的顶层必须是 JSON 对象: {path}")
+    items = data.get('campaigns', [])
+    if not isinstance(items, list):
+        raise ValueError(f"活动配置文件中的 campaigns 必须是列表: {path}")
+    for key in ('api1_url', 'api2_url'):
+        if not isinstance(data.get(key, ""), str):
+            raise ValueError(f"活动配置文件中的 {key} 必须是字符串: {path}")
+    
+    campaigns = [Campaign.from_dict(item) for item in items]
+    if not campaigns:
+        raise ValueError(f"活动配置文件中没有活动: {path}")
+    names = [campaign.name for campaign in campaigns]
+    if len(set(names)) != len(names):
+        raise ValueError("活动名称不能重复")
+    # 进度记录和台账都按礼包ID区分，同一礼包不能配置成两个活动
+    pack_ids = [campaign.pack_id for campaign in campaigns]
+    if len(set(pack_ids)) != len(pack_ids):
+        raise ValueError("活动的 pack_id 不能重复")
+    return {
+        'path': path,
+        'api1_url': data.get('api1_url', API1_URL),
+        'api2_url': data.get('api2_url', API2_URL),
+        'campaigns': campaigns,
+    }
+
+
+class ProgressJournal:
+    """
+    发放进度记录（JSONL，每个用户一行，追加写入）
+    
+    每条记录包含用户ID、接口1/接口2结果和整体状态。为避免每条都落盘，
+    按条数或时间批量 fsync；重新运行时读取记录，跳过已完成的用户。
+    """
+
+    def __init__(self, path: str, fsync_every: int = 50, fsync_interval: float = 1.0):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        # user_id -> 最后一条记录
+        self.entries: Dict[str, Dict] = {}
+        self._load()
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self.file.tell() > 0 and not self._ends_with_newline():
+            # 上次崩溃留下不完整的最后一行，先换行，避免新记录接在后面一起作废
+            self.file.write("\n")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    @classmethod
+    def for_pack(cls, pack_id: int) -> "ProgressJournal":
+        """按礼包ID打开对应的进度记录"""
+        return cls(os.path.join(get_data_dir(), f"journal_{pack_id}.jsonl"))
+
+    def _load(self):
+        """读取已有记录；进程崩溃时最后一行可能不完整，直接忽略"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    continue
+                self.entries[str(entry.get('user_id'))] = entry
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_done(self, user_id: str) -> bool:
+        """该用户是否已完整发放（两个接口都成功）"""
+        entry = self.entries.get(user_id)
+        return bool(entry and entry.get('ok'))
+
+    def api1_done(self, user_id: str) -> bool:
+        """该用户的接口1是否已成功（上次失败在接口2时，重试可跳过接口1）"""
+        entry = self.entries.get(user_id)
+        return bool(entry and entry.get('api1_ok'))
+
+    def api2_done(self, user_id: str) -> bool:
+        """该用户的接口2是否已成功（接口2只按用户发放，其他活动可直接复用）"""
+        entry = self.entries.get(user_id)
+        return bool(entry and entry.get('api2_ok'))
+
+    def record(self, result: Dict):
+        """追加一条用户处理结果"""
+        entry = dict(result)
+        entry['ts'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.entries[str(result['user_id'])] = entry
+            self.file.write(line)
+            self.pending += 1
+            now = time.monotonic()
+            if self.pending >= self.fsync_every or now - self.last_sync >= self.fsync_interval:
+                self._sync(now)
+
+    def _sync(self, now: float):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = now
+
+    def clear(self):
+        """清空进度记录（下次从头发放）"""
+        with self.lock:
+            self.file.close()
+            self.entries.clear()
+            self.file = open(self.path, 'w', encoding='utf-8')
+            self.pending = 0
+
+    def close(self):
+        """落盘并关闭文件"""
+        with self.lock:
+            if not self.file.closed:
+                self._sync(time.monotonic())
+                self.file.close()
+
+
+class GrantLedger:
+    """
+    已发放用户台账（SQLite，按 (pack_id, user_id) 记录）
+    
+    跨批次、跨工单持久保存；每个礼包的已发放用户在首次查询时整体载入内存集合，
+    之后的判断不访问数据库。新增记录批量写入，close 时提交剩余部分。
+    """
+
+    def __init__(self, path: str, commit_every: int = 200):
+        self.path = path
+        self.commit_every = commit_every
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS grants ("
+            "pack_id INTEGER NOT NULL, user_id INTEGER NOT NULL, granted_at TEXT NOT NULL, "
+            "PRIMARY KEY (pack_id, user_id))"
+        )
+        self.conn.commit()
+        # pack_id -> 已发放用户ID集合
+        self.cache: Dict[int, set] = {}
+        self.pending: List[Tuple[int, int, str]] = []
+
+    @classmethod
+    def open_default(cls) -> "GrantLedger":
+        return cls(os.path.join(get_data_dir(), "grant_ledger.db"))
+
+    def _granted(self, pack_id: int) -> set:
+        granted = self.cache.get(pack_id)
+        if granted is None:
+            rows = self.conn.execute("SELECT user_id FROM grants WHERE pack_id = ?", (pack_id,))
+            granted = {user_id for (user_id,) in rows}
+            self.cache[pack_id] = granted
+        return granted
+
+    def is_granted(self, pack_id: int, user_id: str) -> bool:
+        try:
+            key = int(user_id)
+        except ValueError:
+            return False
+        with self.lock:
+            return key in self._granted(pack_id)
+
+    def mark(self, pack_id: int, user_id: str):
+        """记录已发放（成功或接口返回已领取）"""
+        try:
+            key = int(user_id)
+        except ValueError:
+            return
+        with self.lock:
+            granted = self._granted(pack_id)
+            if key in granted:
+                return
+            granted.add(key)
+            self.pending.append((pack_id, key, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            if len(self.pending) >= self.commit_every:
+                self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self.conn.executemany("INSERT OR IGNORE INTO grants VALUES (?, ?, ?)", self.pending)
+            self.conn.commit()
+            self.pending = []
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.conn.close()
+
+
+def write_run_summary(summary: Dict, path: str):
+    """把一次发放的汇总（含各接口指标）写成 JSON 文件"""
+    data = {key: value for key, value in summary.items() if key != 'failed_result'}
+    data['finished_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+class ResultWriter:
+    """把用户处理结果流式写入 JSONL 或 CSV 文件"""
+
+    CSV_FIELDS = ['user_id', 'campaign', 'pack_id', 'ok', 'api1_ok', 'api1_msg', 'api2_ok', 'api2_msg', 'category']
+
+    def __init__(self, stream: IO[str], fmt: str = "jsonl"):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv_writer = None
+        if fmt == "csv":
+            self.csv_writer = csv.DictWriter(stream, fieldnames=self.CSV_FIELDS, extrasaction='ignore')
+            self.csv_writer.writeheader()
+
+    @classmethod
+    def open(cls, path: str, fmt: Optional[str] = None) -> "ResultWriter":
+        """打开结果文件；未指定格式时按扩展名判断（.csv 为 CSV，其余为 JSONL）"""
+        if fmt is None:
+            fmt = "csv" if path.lower().endswith(".csv") else "jsonl"
+        return cls(open(path, 'w', encoding='utf-8', newline=''), fmt)
+
+    def write(self, result: Dict):
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(result)
+        else:
+            self.stream.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.stream.flush()
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+
+class ResultStore:
+    """
+    紧凑的结果存储：每个用户一行元组，常见消息字符串驻留复用
+    
+    另外按筛选条件维护行号列表，筛选视图取任意区间都是 O(区间长度)。
+    """
+
+    FILTER_ALL = "all"
+    FILTER_FAILED = "failed"
+    FILTER_CLAIMED = "claimed"
+
+    # 行元组各字段的位置
+    USER_ID, API1_OK, API1_MSG, API2_OK, API2_MSG, OK, CATEGORY, CAMPAIGN = range(8)
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.rows: List[Tuple] = []
+        self.indexes: Dict[str, List[int]] = {self.FILTER_FAILED: [], self.FILTER_CLAIMED: []}
+
+    def add(self, result: Dict):
+        row = (
+            result['user_id'],
+            result['api1_ok'], sys.intern(result['api1_msg']),
+            result['api2_ok'], sys.intern(result['api2_msg']),
+            result['ok'], result.get('category'),
+            sys.intern(result.get('campaign', "")),
+        )
+        index = len(self.rows)
+        self.rows.append(row)
+        if not row[self.OK]:
+            self.indexes[self.FILTER_FAILED].append(index)
+        if "已领取" in (row[self.API1_MSG], row[self.API2_MSG]):
+            self.indexes[self.FILTER_CLAIMED].append(index)
+
+    def count(self, filter_name: str = FILTER_ALL) -> int:
+        if filter_name == self.FILTER_ALL:
+            return len(self.rows)
+        return len(self.indexes[filter_name])
+
+    def get(self, filter_name: str, start: int, end: int) -> List[Tuple]:
+        """取筛选视图中 [start, end) 区间的行"""
+        if filter_name == self.FILTER_ALL:
+            return self.rows[start:end]
+        return [self.rows[index] for index in self.indexes[filter_name][start:end]]
+
+
+# 接口调用失败类型
+ERROR_TIMEOUT = "timeout"
+ERROR_CONNECTION = "connection"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_HTTP_4XX = "http_4xx"
+ERROR_HTTP_5XX = "http_5xx"
+ERROR_BUSINESS = "business"
+ERROR_OTHER = "other"
+
+ERROR_CATEGORY_NAMES = {
+    ERROR_TIMEOUT: "超时",
+    ERROR_CONNECTION: "连接失败",
+    ERROR_RATE_LIMITED: "被限流(429)",
+    ERROR_HTTP_4XX: "HTTP 4xx",
+    ERROR_HTTP_5XX: "HTTP 5xx",
+    ERROR_BUSINESS: "业务失败",
+    ERROR_OTHER: "其他异常",
+}
+
+
+def classify_http_status(status_code: int) -> str:
+    """按 HTTP 状态码判断失败类型"""
+    if status_code == 429:
+        return ERROR_RATE_LIMITED
+    if status_code >= 500:
+        return ERROR_HTTP_5XX
+    return ERROR_HTTP_4XX
+
+
+class RetryPolicy:
+    """
+    重试策略：指数退避 + 全抖动
+    
+    只重试临时性错误（超时、连接失败、429、HTTP 5xx）；
+    HTTP 4xx 与业务失败重试也不会成功，直接返回。
+    """
+
+    RETRYABLE = {ERROR_TIMEOUT, ERROR_CONNECTION, ERROR_RATE_LIMITED, ERROR_HTTP_5XX}
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, category: str, attempt: int) -> bool:
+        """attempt 为已经失败的次数（从 1 开始）"""
+        return category in self.RETRYABLE and attempt <= self.max_retries
+
+    def delay(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待时间"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class EndpointMetrics:
+    """
+    单个接口的调用指标：延迟直方图、吞吐、在途数与失败类型计数
+    
+    延迟按对数分桶（相邻桶边界相差 10%），内存占用固定，与请求数无关。
+    """
+
+    BUCKET_MIN = 0.0005
+    BUCKET_GROWTH = 1.1
+    BUCKET_COUNT = 140
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.buckets = [0] * (self.BUCKET_COUNT + 1)
+            self.count = 0
+            self.max_latency = 0.0
+            self.in_flight = 0
+            self.results = 0
+            self.errors: Dict[str, int] = {}
+            self.started = time.monotonic()
+
+    def _bucket_index(self, latency: float) -> int:
+        index = 0
+        bound = self.BUCKET_MIN
+        while latency > bound and index < self.BUCKET_COUNT:
+            bound *= self.BUCKET_GROWTH
+            index += 1
+        return index
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, latency: float):
+        index = self._bucket_index(latency)
+        with self.lock:
+            self.in_flight -= 1
+            self.buckets[index] += 1
+            self.count += 1
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_result(self, category: Optional[str]):
+        """记录一次接口调用结果，category 为失败类型（成功时为 None）"""
+        with self.lock:
+            self.results += 1
+            if category is not None:
+                self.errors[category] = self.errors.get(category, 0) + 1
+
+    def _percentile(self, fraction: float) -> float:
+        if not self.count:
+            return 0.0
+        target = self.count * fraction
+        cumulative = 0
+        for index, bucket in enumerate(self.buckets):
+            cumulative += bucket
+            if cumulative >= target:
+                # 取桶上界，不超过实际最大值
+                return min(self.BUCKET_MIN * (self.BUCKET_GROWTH ** index), self.max_latency)
+        return self.max_latency
+
+    def snapshot(self) -> Dict:
+        """当前指标（延迟单位为毫秒）"""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            return {
+                'requests': self.count,
+                'requests_per_sec': round(self.count / elapsed, 2),
+                'in_flight': self.in_flight,
+                'p50_ms': round(self._percentile(0.50) * 1000, 1),
+                'p90_ms': round(self._percentile(0.90) * 1000, 1),
+                'p99_ms': round(self._percentile(0.99) * 1000, 1),
+                'max_ms': round(self.max_latency * 1000, 1),
+                'calls': self.results,
+                'errors': dict(self.errors),
+            }
+
+
+class SendCancelled(Exception):
+    """等待限流或熔断恢复期间收到停止请求"""
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+    
+    rate 为每秒补充的令牌数（<= 0 表示不限流），capacity 为允许的突发请求数。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None):
+        """取一个令牌，没有令牌时阻塞等待"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            if stop_event is None:
+                time.sleep(wait_time)
+            elif stop_event.wait(wait_time):
+                raise SendCancelled()
+
+
+class CircuitBreaker:
+    """
+    熔断器
+    
+    连续失败（请求异常或 HTTP 5xx）达到阈值后打开，期间暂停对该接口的请求；
+    经过 reset_timeout 秒后进入半开状态，只放行一个探测请求：
+    探测成功则恢复，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None):
+        """熔断打开时阻塞等待，直到允许发送请求"""
+        while True:
+            with self.lock:
+                if self.state == self.CLOSED:
+                    return
+                now = time.monotonic()
+                if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+                    self.state = self.HALF_OPEN
+                if self.state == self.HALF_OPEN and not self.probe_in_flight:
+                    self.probe_in_flight = True
+                    return
+                if self.state == self.OPEN:
+                    wait_time = min(0.5, self.reset_timeout - (now - self.opened_at))
+                else:
+                    wait_time = 0.1
+            if stop_event is None:
+                time.sleep(wait_time)
+            elif stop_event.wait(wait_time):
+                raise SendCancelled()
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class AIMDController:
+    """
+    自适应并发控制（AIMD：加性增、乘性减）
+    
+    限制单个接口的在途请求数。超时或连接失败时上限立即乘以 decrease；
+    每完成 window 次请求检查一次：错误率（HTTP 5xx 等）超过 max_error_rate，
+    或 p95 延迟超过基线的 latency_tolerance 倍（且至少高出 latency_slack 秒）时
+    上限乘以 decrease，否则加 increase。两次下调之间至少间隔当前上限个请求，
+    避免按旧上限发出的请求重复触发下调。
+    """
+
+    def __init__(self, initial: int = 2, min_limit: int = 1, max_limit: int = 32,
+                 increase: int = 1, decrease: float = 0.5, window: int = 20,
+                 latency_tolerance: float = 1.5, latency_slack: float = 0.02,
+                 max_error_rate: float = 0.1):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.increase = increase
+        self.decrease = decrease
+        self.window = window
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.max_error_rate = max_error_rate
+        self.in_flight = 0
+        self.samples: List[float] = []
+        self.window_errors = 0
+        self.since_decrease = 0
+        self.baseline_p95: Optional[float] = None
+        self.last_p95: Optional[float] = None
+        self.cond = threading.Condition()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None):
+        """占用一个在途名额，达到上限时阻塞等待"""
+        with self.cond:
+            while self.in_flight >= self.limit:
+                self.cond.wait(0.1)
+                if stop_event is not None and stop_event.is_set():
+                    raise SendCancelled()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float], error: bool = False, timeout: bool = False):
+        """
+        释放名额并记录结果
+        
+        Args:
+            latency: 请求耗时（秒），请求未发出时为 None
+            error: 是否为请求异常或 HTTP 5xx
+            timeout: 是否为超时或连接失败（立即下调上限）
+        """
+        with self.cond:
+            self.in_flight -= 1
+            if latency is not None or error:
+                self.since_decrease += 1
+                if timeout:
+                    self._decrease()
+                else:
+                    if error:
+                        self.window_errors += 1
+                    else:
+                        self.samples.append(latency)
+                    if len(self.samples) + self.window_errors >= self.window:
+                        self._adjust()
+            self.cond.notify_all()
+
+    def _adjust(self):
+        samples = sorted(self.samples)
+        error_rate = self.window_errors / (len(samples) + self.window_errors)
+        self.samples = []
+        self.window_errors = 0
+        if error_rate > self.max_error_rate or not samples:
+            self._decrease()
+            return
+        
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        self.last_p95 = p95
+        if self.baseline_p95 is None or p95 < self.baseline_p95:
+            self.baseline_p95 = p95
+        if (p95 > self.baseline_p95 * self.latency_tolerance
+                and p95 - self.baseline_p95 > self.latency_slack):
+            self._decrease()
+        else:
+            self.limit = min(self.max_limit, self.limit + self.increase)
+            # 基线缓慢上浮，避免偶然的低延迟窗口长期压低上限
+            self.baseline_p95 *= 1.02
+
+    def _decrease(self):
+        if self.since_decrease < self.limit:
+            return
+        self.limit = max(self.min_limit, int(self.limit * self.decrease))
+        self.since_decrease = 0
+        # 降低上限后重新采样，旧窗口的延迟已不代表当前负载
+        self.samples = []
+        self.window_errors = 0
+
+
+class SharedCall:
+    """同一用户在多个活动之间共享的一次接口调用结果"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Tuple[bool, str, Optional[str]]] = None
+
+
+class PackSenderEngine:
+    """礼包发放引擎（不依赖界面，可在后台线程中运行）"""
+
+    # 接口显示名称
+    ENDPOINT_NAMES = {'api1': "接口1", 'api2': "接口2"}
+    # 连接池大小（不小于最大并发数）
+    MAX_WORKERS = 32
+    # 最多保留多少个用户的接口2成功结果（同一用户的各活动任务是连续提交的，很快就会用完）
+    API2_CACHE_SIZE = 10000
+
+    def __init__(self, api1_url: str, api2_url: str, timeout: float = 30,
+                 rate_limits: Optional[Dict[str, float]] = None,
+                 breaker_threshold: int = 5, breaker_reset: float = 10.0):
+        self.api1_url = api1_url
+        self.api2_url = api2_url
+        self.timeout = timeout
+        
+        # 复用连接，多个工作线程共享
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=self.MAX_WORKERS)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # 每个接口独立的限流器与熔断器
+        rate_limits = rate_limits or {}
+        self.limiters = {name: TokenBucket(rate_limits.get(name, 0)) for name in self.ENDPOINT_NAMES}
+        self.breakers = {
+            name: CircuitBreaker(breaker_threshold, breaker_reset) for name in self.ENDPOINT_NAMES
+        }
+        self.retry_policy = RetryPolicy()
+        # 每个接口的调用指标
+        self.metrics = {name: EndpointMetrics() for name in self.ENDPOINT_NAMES}
+        # 自适应并发控制器，固定并发模式下为空
+        self.controllers: Dict[str, AIMDController] = {}
+        self.stop_event: Optional[threading.Event] = None
+        # (接口2地址, 用户ID) -> 本次运行中该用户的接口2调用
+        self.api2_calls: "OrderedDict[Tuple[str, str], SharedCall]" = OrderedDict()
+        self.api2_lock = threading.Lock()
+
+    def set_rate_limits(self, rate_limits: Dict[str, float]):
+        """更新各接口的限流速率（次/秒，<= 0 表示不限流）"""
+        for name, rate in rate_limits.items():
+            self.limiters[name] = TokenBucket(rate)
+
+    def set_adaptive(self, enabled: bool, max_limit: int = MAX_WORKERS):
+        """开启/关闭自适应并发；开启时每个接口的在途上限从 2 开始自动调整，不超过 MAX_WORKERS"""
+        if enabled:
+            max_limit = max(1, min(max_limit, self.MAX_WORKERS))
+            self.controllers = {
+                name: AIMDController(max_limit=max_limit) for name in self.ENDPOINT_NAMES
+            }
+        else:
+            self.controllers = {}
+
+    def concurrency_status(self) -> str:
+        """自适应模式下各接口当前的并发上限，固定并发时返回空字符串"""
+        return " / ".join(
+            f"{self.ENDPOINT_NAMES[name]}并发上限: {controller.limit}"
+            for name, controller in self.controllers.items()
+        )
+
+    def metrics_summary(self) -> Dict:
+        """各接口指标汇总（可直接序列化为 JSON）"""
+        urls = {'api1': self.api1_url, 'api2': self.api2_url}
+        return {
+            name: dict(metrics.snapshot(), url=urls[name])
+            for name, metrics in self.metrics.items()
+        }
+
+    def metrics_status(self) -> List[str]:
+        """各接口指标的单行文字说明，用于界面与命令行进度显示"""
+        lines = []
+        for name, metrics in self.metrics.items():
+            snap = metrics.snapshot()
+            line = (
+                f"{self.ENDPOINT_NAMES[name]}: {snap['requests_per_sec']:.1f} 次/秒 | "
+                f"在途 {snap['in_flight']} | p50 {snap['p50_ms']:.0f}ms p90 {snap['p90_ms']:.0f}ms "
+                f"p99 {snap['p99_ms']:.0f}ms max {snap['max_ms']:.0f}ms"
+            )
+            if snap['errors']:
+                line += " | 失败: " + ", ".join(
+                    f"{ERROR_CATEGORY_NAMES.get(category, category)} {count}"
+                    for category, count in snap['errors'].items()
+                )
+            lines.append(line)
+        return lines
+
+    def endpoint_status(self) -> str:
+        """处于熔断状态的接口说明，全部正常时返回空字符串"""
+        parts = []
+        for name, breaker in self.breakers.items():
+            if breaker.state == CircuitBreaker.OPEN:
+                parts.append(f"{self.ENDPOINT_NAMES[name]}熔断中")
+            elif breaker.state == CircuitBreaker.HALF_OPEN:
+                parts.append(f"{self.ENDPOINT_NAMES[name]}探测中")
+        return " | ".join(parts)
+
+    def _post(self, endpoint: str, url: str, **kwargs) -> requests.Response:
+        """
+        经过自适应并发、限流与熔断发送 POST 请求；
+        请求异常和 HTTP 5xx 计入熔断失败，并触发并发上限下调
+        """
+        controller = self.controllers.get(endpoint)
+        if controller is not None:
+            controller.acquire(self.stop_event)
+        latency = None
+        error = False
+        timeout = False
+        try:
+            self.limiters[endpoint].acquire(self.stop_event)
+            breaker = self.breakers[endpoint]
+            breaker.acquire(self.stop_event)
+            metrics = self.metrics[endpoint]
+            metrics.request_started()
+            start = time.monotonic()
+            recorded = False
+            try:
+                response = self.session.post(url, timeout=self.timeout, **kwargs)
+                latency = time.monotonic() - start
+                if response.status_code >= 500:
+                    error = True
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                recorded = True
+                return response
+            except requests.exceptions.RequestException:
+                timeout = True
+                raise
+            finally:
+                if not recorded:
+                    # 请求异常和其他意外异常都计入熔断失败，保证半开探测标记一定被释放
+                    error = True
+                    breaker.record_failure()
+                metrics.request_finished(latency if latency is not None else time.monotonic() - start)
+        finally:
+            if controller is not None:
+                controller.release(latency, error, timeout)
+
+    def is_already_received(self, message: str, data: str = "") -> bool:
+        """判断是否为已领取状态（不算错误）"""
+        if not message and not data:
+            return False
+        
+        message_str = str(message).lower() if message else ""
+        data_str = str(data).lower() if data else ""
+        combined = message_str + " " + data_str
+        
+        # 检查是否包含已领取相关的关键词
+        received_keywords = ["已领取", "已购买", "already received", "already purchased"]
+        return any(keyword in combined for keyword in received_keywords)
+    
+    def call_api1(self, user_id: str, campaign: Campaign) -> Tuple[bool, str, Optional[str]]:
+        """
+        调用接口1：发送礼包
+        
+        Returns:
+            (success, message, category): 成功标志、消息、失败类型（成功时为 None）
+        """
+        try:
+            payload = {
+                "userIds": [int(user_id)],
+                "packId": campaign.pack_id,
+                "packName": campaign.pack_name,
+                "desc": campaign.desc,
+                "useFlag": campaign.use_flag
+            }
+            
+            response = self._post(
+                'api1',
+                campaign.api1_url or self.api1_url,
+                headers={'Content-Type': 'application/json'},
+                json=payload
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                message = result.get('message', '')
+                data = result.get('data', '')
+                
+                # 检查是否成功
+                if result.get('success') and result.get('code') == 0:
+                    return True, "成功", None
+                # 检查是否为已领取状态（不算错误）
+                elif self.is_already_received(message, data):
+                    return True, "已领取", None
+                else:
+                    return False, f"失败: {message or data or '未知错误'}", ERROR_BUSINESS
+            else:
+                return False, f"HTTP错误: {response.status_code}", classify_http_status(response.status_code)
+        
+        except SendCancelled:
+            raise
+        except requests.exceptions.Timeout as e:
+            return False, f"请求超时: {str(e)}", ERROR_TIMEOUT
+        except requests.exceptions.RequestException as e:
+            return False, f"请求异常: {str(e)}", ERROR_CONNECTION
+        except Exception as e:
+            return False, f"异常: {str(e)}", ERROR_OTHER
+    
+    def call_api2(self, user_id: str, campaign: Campaign) -> Tuple[bool, str, Optional[str]]:
+        """
+        调用接口2：发放权益
+        
+        Returns:
+            (success, message, category): 成功标志、消息、失败类型（成功时为 None）
+        """
+        try:
+            data = {'userId': user_id}
+            
+            response = self._post(
+                'api2',
+                campaign.api2_url or self.api2_url,
+                data=data
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                message = result.get('message')
+                data_str = result.get('data', '')
+                
+                # 检查是否成功
+                if result.get('code') == 0:
+                    # 检查data中是否包含已购买信息（接口2的data可能包含"已购买: X"）
+                    if self.is_already_received(str(message) if message else "", data_str):
+                        return True, "已领取", None
+                    return True, "成功", None
+                # 检查是否为已领取状态（不算错误）
+                elif self.is_already_received(str(message) if message else "", data_str):
+                    return True, "已领取", None
+                else:
+                    return False, f"失败: {message or data_str or '未知错误'}", ERROR_BUSINESS
+            else:
+                return False, f"HTTP错误: {response.status_code}", classify_http_status(response.status_code)
+        
+        except SendCancelled:
+            raise
+        except requests.exceptions.Timeout as e:
+            return False, f"请求超时: {str(e)}", ERROR_TIMEOUT
+        except requests.exceptions.RequestException as e:
+            return False, f"请求异常: {str(e)}", ERROR_CONNECTION
+        except Exception as e:
+            return False, f"异常: {str(e)}", ERROR_OTHER
+
+    def _call_with_retry(self, endpoint: str,
+                         call: Callable[[str, Campaign], Tuple[bool, str, Optional[str]]],
+                         user_id: str, campaign: Campaign) -> Tuple[bool, str, Optional[str]]:
+        """按重试策略调用接口，临时性错误退避后重试"""
+        attempt = 0
+        while True:
+            success, message, category = call(user_id, campaign)
+            self.metrics[endpoint].record_result(category)
+            if success:
+                return success, message, category
+            attempt += 1
+            if not self.retry_policy.should_retry(category, attempt):
+                if attempt > 1:
+                    message = f"{message}（已重试 {attempt - 1} 次）"
+                return success, message, category
+            delay = self.retry_policy.delay(attempt)
+            if self.stop_event is not None:
+                if self.stop_event.wait(delay):
+                    raise SendCancelled()
+            else:
+                time.sleep(delay)
+
+    def _api2_key(self, user_id: str, campaign: Campaign) -> Tuple[str, str]:
+        return campaign.api2_url or self.api2_url, user_id
+
+    def mark_api2_done(self, user_id: str, campaign: Campaign, message: str = "已完成(断点)"):
+        """记录该用户的接口2已成功（断点续传时由进度记录得知），之后各活动不再调用"""
+        call = SharedCall()
+        call.result = (True, message, None)
+        call.done.set()
+        with self.api2_lock:
+            self.api2_calls[self._api2_key(user_id, campaign)] = call
+            self._trim_api2_calls()
+
+    def _trim_api2_calls(self):
+        while len(self.api2_calls) > self.API2_CACHE_SIZE:
+            self.api2_calls.popitem(last=False)
+
+    def _call_api2_once(self, user_id: str, campaign: Campaign) -> Tuple[bool, str, Optional[str]]:
+        """
+        接口2只按用户ID发放权益，同一用户在多个活动中只调用一次：
+        第一个到达的任务负责调用，其余任务等待并复用结果。
+        失败或被取消的结果不保留，重试时重新调用
+        """
+        key = self._api2_key(user_id, campaign)
+        with self.api2_lock:
+            call = self.api2_calls.get(key)
+            owner = call is None
+            if owner:
+                call = self.api2_calls[key] = SharedCall()
+                self._trim_api2_calls()
+            else:
+                self.api2_calls.move_to_end(key)
+        
+        if not owner:
+            while not call.done.wait(0.1):
+                if self.stop_event is not None and self.stop_event.is_set():
+                    raise SendCancelled()
+            if call.result is None:
+                raise SendCancelled()
+            return call.result
+        
+        try:
+            call.result = self._call_with_retry('api2', self.call_api2, user_id, campaign)
+        finally:
+            if call.result is None or not call.result[0]:
+                with self.api2_lock:
+                    if self.api2_calls.get(key) is call:
+                        del self.api2_calls[key]
+            call.done.set()
+        return call.result
+
+    def process_user(self, user_id: str, campaign: Campaign, skip_api1: bool = False) -> Dict:
+        """
+        处理单个用户在某个活动下的发放：先调用接口1，成功后再调用接口2
+        （接口2按用户发放，同一用户在多个活动中只调用一次）
+        
+        Args:
+            skip_api1: 接口1已在之前的运行中成功时跳过接口1，只调用接口2
+        
+        Returns:
+            结果字典：user_id、campaign（活动名称）、pack_id、api1_ok、api1_msg、
+            api2_ok（未执行为 None）、api2_msg、ok、category（失败类型，成功时为 None）
+        """
+        if skip_api1:
+            api1_ok, api1_msg, category = True, "已完成(断点)", None
+        else:
+            api1_ok, api1_msg, category = self._call_with_retry('api1', self.call_api1, user_id, campaign)
+        if not api1_ok:
+            # 接口1失败，不调用接口2
+            return {
+                'user_id': user_id, 'campaign': campaign.name, 'pack_id': campaign.pack_id,
+                'api1_ok': False, 'api1_msg': api1_msg,
+                'api2_ok': None, 'api2_msg': "未执行",
+                'ok': False, 'category': category,
+            }
+        
+        api2_ok, api2_msg, category = self._call_api2_once(user_id, campaign)
+        return {
+            'user_id': user_id, 'campaign': campaign.name, 'pack_id': campaign.pack_id,
+            'api1_ok': True, 'api1_msg': api1_msg,
+            'api2_ok': api2_ok, 'api2_msg': api2_msg,
+            'ok': api2_ok, 'category': category,
+        }
+
+    def _window(self, workers: int) -> int:
+        """允许同时在途的用户数"""
+        if not self.controllers:
+            return workers
+        # 每个用户依次调用两个接口，在途用户数取两个接口上限之和即可让两边都跑满
+        return max(1, min(workers, sum(c.limit for c in self.controllers.values())))
+
+    def _run_pass(self, tasks, workers: int, on_result: Callable[[int, Dict], bool]):
+        """
+        并发执行一轮任务
+        
+        Args:
+            tasks: 迭代 (idx, user_id, campaign, skip_api1)
+            on_result: 在当前线程中处理每个结果，返回 False 时不再提交新任务
+        """
+        pending = {}
+        accepting = True
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pack-worker") as pool:
+            while True:
+                # 补充在途任务
+                while accepting and not self.stop_event.is_set() and len(pending) < self._window(workers):
+                    item = next(tasks, None)
+                    if item is None:
+                        accepting = False
+                        break
+                    idx, user_id, campaign, skip_api1 = item
+                    pending[pool.submit(self.process_user, user_id, campaign, skip_api1)] = idx
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except SendCancelled:
+                        continue
+                    if not on_result(idx, result):
+                        accepting = False
+
+    def run(self, user_ids: Iterable[str], emit: Callable[[Dict], None],
+            stop_event: threading.Event,
+            campaigns: List[Campaign],
+            journals: Optional[Dict[int, ProgressJournal]] = None,
+            resume: bool = True, workers: int = 1,
+            continue_on_error: bool = False,
+            ledger: Optional[GrantLedger] = None,
+            force_resend: bool = False) -> Dict:
+        """
+        并发处理用户列表（最多 workers 个发放同时在途）；每提交一个发放前检查停止标志。
+        自适应模式下 workers 为上限，实际在途数跟随各接口的并发上限变化
+        
+        用户列表只遍历一次，每个用户依次展开为各个活动的发放任务，
+        所有活动共享连接、限流、熔断与工作线程；结果带 campaign/pack_id 字段。
+        接口2只按用户ID发放，同一用户在多个活动中只调用一次（断点续传时
+        任一活动的进度记录中接口2已成功也不再调用）。
+        
+        默认遇到失败后不再提交新任务。continue_on_error 为真时失败的发放先放入
+        重试队列（结果带 deferred 标记），全部处理完后再统一重试一轮
+        （结果带 retried 标记）。
+        
+        journals 按 pack_id 提供进度记录，每个发放结果都会写入对应记录；
+        resume 为真时，记录中已完成的发放直接跳过，不再调用接口。
+        
+        传入 ledger 时，台账中该礼包已发放过的用户在任何网络请求之前跳过
+        （force_resend 为真时仍然发送），发放成功的用户写入台账。
+        emit 只在调用 run 的线程中执行。
+        
+        Returns:
+            汇总字典：processed、skipped、already_granted、stopped、failed、deferred、
+            categories（失败类型计数）、campaigns（按活动名称的成功/失败/跳过计数）、
+            failed_index（未失败为 None）、failed_result、metrics（各接口指标）
+        """
+        for metrics in self.metrics.values():
+            metrics.reset()
+        with self.api2_lock:
+            self.api2_calls.clear()
+        journals = journals or {}
+        summary = {'processed': 0, 'skipped': 0, 'already_granted': 0, 'stopped': False, 'failed': 0,
+                   'deferred': 0, 'categories': {},
+                   'campaigns': {campaign.name: {'ok': 0, 'failed': 0, 'skipped': 0, 'already_granted': 0}
+                                 for campaign in campaigns},
+                   'failed_index': None, 'failed_result': None}
+        self.stop_event = stop_event
+        workers = max(1, min(workers, self.MAX_WORKERS))
+        deferred: List[Tuple[int, str, Campaign, bool]] = []
+        
+        def tasks():
+            for idx, user_id in enumerate(user_ids):
+                if resume:
+                    for campaign in campaigns:
+                        journal = journals.get(campaign.pack_id)
+                        if journal is not None and journal.api2_done(user_id):
+                            self.mark_api2_done(user_id, campaign)
+                for campaign in campaigns:
+                    counts = summary['campaigns'][campaign.name]
+                    journal = journals.get(campaign.pack_id)
+                    if resume and journal is not None and journal.is_done(user_id):
+                        summary['skipped'] += 1
+                        counts['skipped'] += 1
+                        continue
+                    if (ledger is not None and not force_resend
+                            and ledger.is_granted(campaign.pack_id, user_id)):
+                        summary['already_granted'] += 1
+                        counts['already_granted'] += 1
+                        continue
+                    skip_api1 = resume and journal is not None and journal.api1_done(user_id)
+                    yield idx, user_id, campaign, skip_api1
+        
+        def record_failure(idx: int, result: Dict):
+            summary['failed'] += 1
+            summary['campaigns'][result['campaign']]['failed'] += 1
+            category = result['category'] or ERROR_OTHER
+            summary['categories'][category] = summary['categories'].get(category, 0) + 1
+            if summary['failed_index'] is None or idx < summary['failed_index']:
+                summary['failed_index'] = idx
+                summary['failed_result'] = result
+        
+        def record_result(result: Dict):
+            journal = journals.get(result['pack_id'])
+            if journal is not None:
+                journal.record(result)
+            if result['ok']:
+                summary['campaigns'][result['campaign']]['ok'] += 1
+                if ledger is not None:
+                    ledger.mark(result['pack_id'], result['user_id'])
+        
+        campaigns_by_name = {campaign.name: campaign for campaign in campaigns}
+        
+        def on_first_pass(idx: int, result: Dict) -> bool:
+            summary['processed'] += 1
+            record_result(result)
+            if not result['ok'] and continue_on_error:
+                # 放入重试队列，全部处理完后再重试
+                result['deferred'] = True
+                deferred.append((idx, result['user_id'], campaigns_by_name[result['campaign']],
+                                 result['api1_ok']))
+                emit(result)
+                return True
+            emit(result)
+            if not result['ok']:
+                record_failure(idx, result)
+                return False
+            return True
+        
+        def on_retry_pass(idx: int, result: Dict) -> bool:
+            record_result(result)
+            result['retried'] = True
+            emit(result)
+            if not result['ok']:
+                record_failure(idx, result)
+            return True
+        
+        self._run_pass(tasks(), workers, on_first_pass)
+        
+        if deferred and not stop_event.is_set():
+            summary['deferred'] = len(deferred)
+            deferred.sort(key=lambda task: task[0])
+            self._run_pass(iter(deferred), workers, on_retry_pass)
+        
+        summary['metrics'] = self.metrics_summary()
+        if continue_on_error:
+            # 继续模式下失败不会终止执行
+            summary['stopped'] = stop_event.is_set()
+            summary['failed_index'] = None
+        else:
+            summary['stopped'] = stop_event.is_set() and summary['failed_index'] is None
+        return summary
 
 
 class UserPackSenderApp:
+    # 界面从结果队列取数据的间隔（毫秒）与每次最多处理的条数
+    POLL_INTERVAL_MS = 100
+    MAX_EVENTS_PER_POLL = 500
+    
     def __init__(self, root):
         self.root = root
         self.root.title("用户礼包发放工具")
-        self.root.geometry("800x700")
+        self.root.geometry("900x750")
         
-        # 接口配置
-        self.api1_url = "http://10.102.32.14/pack/sendSingle"
-        self.api2_url = "http://10.102.40.32/service/content/ledu/right/giveByKefu"
+        # 接口与活动配置（配置文件有误时使用默认礼包）
+        try:
+            self.config = load_campaign_config()
+        except ValueError as e:
+            messagebox.showerror("配置错误", f"{e}\n\n将使用默认礼包")
+            self.config = {'path': "", 'api1_url': API1_URL, 'api2_url': API2_URL,
+                           'campaigns': [default_campaign()]}
         
-        # 接口1固定参数
-        self.pack_id = 4129
-        self.pack_name = "乐读补偿礼包_含非洲鼓-不包含乐读_魂守"
-        self.desc = "客服已沟通补发"
-        self.use_flag = 0
+        self.engine = PackSenderEngine(self.config['api1_url'], self.config['api2_url'])
         
         # 统计信息
         self.success_count = 0
         self.error_count = 0
+        self.skipped_count = 0
+        self.already_granted_count = 0
+        self.deferred_count = 0
+        
+        # 结果存储与窗口化显示状态
+        self.result_store = ResultStore()
+        self.view_offset = 0
+        self.visible_rows = 15
+        self.follow_tail = True
+        
+        # 后台执行相关：工作线程通过队列把结果交给界面线程
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pack-sender")
+        self.result_queue: "queue.Queue" = queue.Queue()
+        self.stop_event = threading.Event()
+        self.running = False
         
         # 创建界面
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_widgets(self):
         # 主框架
@@ -51,53 +1334,179 @@ class UserPackSenderApp:
         self.execute_btn = ttk.Button(btn_frame, text="开始执行", command=self.execute_sending)
         self.execute_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.stop_btn = ttk.Button(btn_frame, text="停止", command=self.stop_sending, state='disabled')
+        self.stop_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
         self.clear_btn = ttk.Button(btn_frame, text="清空结果", command=self.clear_results)
         self.clear_btn.pack(side=tk.LEFT, padx=(0, 5))
         
+        self.clear_journal_btn = ttk.Button(btn_frame, text="清空进度记录", command=self.clear_journal)
+        self.clear_journal_btn.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # 断点续跑：跳过进度记录中已完成的用户
+        self.resume_var = tk.BooleanVar(value=True)
+        self.resume_check = ttk.Checkbutton(btn_frame, text="跳过已完成用户（断点续跑）", variable=self.resume_var)
+        self.resume_check.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # 强制重发：忽略已发放台账，台账中的用户也重新调用接口
+        self.force_resend_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            btn_frame, text="强制重发（忽略已发放台账）", variable=self.force_resend_var
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        
+        # 活动选择区域：可多选，每个用户对所选活动依次发放
+        campaign_frame = ttk.LabelFrame(main_frame, text="发放活动（可多选）", padding="10")
+        campaign_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        self.campaign_listbox = tk.Listbox(campaign_frame, selectmode=tk.MULTIPLE,
+                                           exportselection=False, height=3)
+        self.campaign_listbox.grid(row=0, column=0, rowspan=2, sticky=(tk.W, tk.E))
+        campaign_scrollbar = ttk.Scrollbar(campaign_frame, orient=tk.VERTICAL,
+                                           command=self.campaign_listbox.yview)
+        campaign_scrollbar.grid(row=0, column=1, rowspan=2, sticky=(tk.N, tk.S))
+        self.campaign_listbox.configure(yscrollcommand=campaign_scrollbar.set)
+        
+        ttk.Button(campaign_frame, text="重新加载配置", command=self.reload_config).grid(
+            row=0, column=2, sticky=tk.W, padx=(10, 0))
+        self.config_path_label = ttk.Label(campaign_frame, text="", foreground="gray")
+        self.config_path_label.grid(row=1, column=2, sticky=tk.W, padx=(10, 0))
+        campaign_frame.columnconfigure(0, weight=1)
+        self.refresh_campaign_list()
+        
+        # 运行参数区域
+        settings_frame = ttk.LabelFrame(main_frame, text="运行参数", padding="10")
+        settings_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Label(settings_frame, text="并发数:").grid(row=0, column=0, sticky=tk.W)
+        self.workers_var = tk.IntVar(value=DEFAULT_WORKERS)
+        ttk.Spinbox(settings_frame, from_=1, to=PackSenderEngine.MAX_WORKERS,
+                    textvariable=self.workers_var, width=5).grid(row=0, column=1, sticky=tk.W, padx=(5, 15))
+        
+        ttk.Label(settings_frame, text="接口1限速(次/秒):").grid(row=0, column=2, sticky=tk.W)
+        self.api1_rate_var = tk.DoubleVar(value=DEFAULT_RATE_LIMIT)
+        ttk.Spinbox(settings_frame, from_=0, to=1000, increment=5,
+                    textvariable=self.api1_rate_var, width=6).grid(row=0, column=3, sticky=tk.W, padx=(5, 15))
+        
+        ttk.Label(settings_frame, text="接口2限速(次/秒):").grid(row=0, column=4, sticky=tk.W)
+        self.api2_rate_var = tk.DoubleVar(value=DEFAULT_RATE_LIMIT)
+        ttk.Spinbox(settings_frame, from_=0, to=1000, increment=5,
+                    textvariable=self.api2_rate_var, width=6).grid(row=0, column=5, sticky=tk.W, padx=(5, 15))
+        
+        ttk.Label(settings_frame, text="（限速为 0 表示不限）", foreground="gray").grid(row=0, column=6, sticky=tk.W)
+        
+        # 自适应并发：并发数作为上限，按接口延迟和错误率自动调整
+        self.adaptive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            settings_frame, text="自适应并发（并发数作为上限）", variable=self.adaptive_var
+        ).grid(row=1, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        
+        ttk.Label(settings_frame, text="失败重试次数:").grid(row=1, column=4, sticky=tk.W, pady=(5, 0))
+        self.retries_var = tk.IntVar(value=RetryPolicy().max_retries)
+        ttk.Spinbox(settings_frame, from_=0, to=10,
+                    textvariable=self.retries_var, width=6).grid(row=1, column=5, sticky=tk.W, padx=(5, 15), pady=(5, 0))
+        
+        # 失败后继续：失败用户放入重试队列，最后统一重试
+        self.continue_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            settings_frame, text="失败后继续（失败用户最后统一重试）", variable=self.continue_var
+        ).grid(row=2, column=0, columnspan=4, sticky=tk.W, pady=(5, 0))
+        
         # 统计信息区域
         stats_frame = ttk.LabelFrame(main_frame, text="统计信息", padding="10")
-        stats_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
+        stats_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 10))
         
         self.stats_label = ttk.Label(stats_frame, text="成功: 0 | 错误: 0", font=("Arial", 12, "bold"))
         self.stats_label.grid(row=0, column=0, sticky=tk.W)
         
+        # 各接口延迟与吞吐
+        self.metrics_label = ttk.Label(stats_frame, text="", foreground="gray", justify=tk.LEFT)
+        self.metrics_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
         # 结果显示区域
         result_frame = ttk.LabelFrame(main_frame, text="处理结果", padding="10")
-        result_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        result_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # 创建Treeview显示结果
-        columns = ('用户ID', '接口1', '接口2', '状态')
+        # 结果筛选
+        filter_frame = ttk.Frame(result_frame)
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=tk.W, pady=(0, 5))
+        self.filter_var = tk.StringVar(value=ResultStore.FILTER_ALL)
+        for text, value in (("全部", ResultStore.FILTER_ALL),
+                            ("仅失败", ResultStore.FILTER_FAILED),
+                            ("仅已领取", ResultStore.FILTER_CLAIMED)):
+            ttk.Radiobutton(
+                filter_frame, text=text, value=value,
+                variable=self.filter_var, command=self.on_filter_change
+            ).pack(side=tk.LEFT, padx=(0, 10))
+        self.results_path_label = ttk.Label(filter_frame, text="", foreground="gray")
+        self.results_path_label.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # 创建Treeview显示结果：只渲染可见的行，滚动时按偏移量重新取数据
+        columns = ('用户ID', '活动', '接口1', '接口2', '状态')
         self.result_tree = ttk.Treeview(result_frame, columns=columns, show='headings', height=15)
         
         # 定义列
         self.result_tree.heading('用户ID', text='用户ID')
+        self.result_tree.heading('活动', text='活动')
         self.result_tree.heading('接口1', text='接口1状态')
         self.result_tree.heading('接口2', text='接口2状态')
         self.result_tree.heading('状态', text='整体状态')
         
         # 设置列宽
-        self.result_tree.column('用户ID', width=150)
+        self.result_tree.column('用户ID', width=120)
+        self.result_tree.column('活动', width=120)
         self.result_tree.column('接口1', width=150)
         self.result_tree.column('接口2', width=150)
         self.result_tree.column('状态', width=200)
         
-        # 滚动条
-        result_scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.result_tree.yview)
-        self.result_tree.configure(yscrollcommand=result_scrollbar.set)
+        # 配置标签颜色
+        self.result_tree.tag_configure('success', foreground='green')
+        self.result_tree.tag_configure('error', foreground='red')
+        
+        # 滚动条（位置由结果存储的行数决定，不依赖 Treeview 自身的内容）
+        self.result_scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.on_result_scroll)
+        self.result_tree.bind('<Configure>', self.on_result_configure)
+        self.result_tree.bind('<MouseWheel>', self.on_result_wheel)
+        self.result_tree.bind('<Button-4>', self.on_result_wheel)
+        self.result_tree.bind('<Button-5>', self.on_result_wheel)
         
         # 布局
-        self.result_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        result_scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.result_tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.result_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
         
         # 配置权重
         result_frame.columnconfigure(0, weight=1)
-        result_frame.rowconfigure(0, weight=1)
+        result_frame.rowconfigure(1, weight=1)
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(0, weight=1)
-        main_frame.rowconfigure(3, weight=1)
+        main_frame.rowconfigure(5, weight=1)
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
     
+    def refresh_campaign_list(self):
+        """按当前配置重建活动列表，默认选中第一个活动"""
+        self.campaign_listbox.delete(0, tk.END)
+        for campaign in self.config['campaigns']:
+            self.campaign_listbox.insert(tk.END, f"{campaign.name}（礼包 {campaign.pack_id}）")
+        self.campaign_listbox.selection_set(0)
+        self.config_path_label.config(text=f"配置文件: {self.config['path']}" if self.config['path'] else "")
+    
+    def reload_config(self):
+        """重新读取活动配置文件（修改配置后无需重启）"""
+        if self.running:
+            return
+        try:
+            self.config = load_campaign_config(self.config['path'] or None)
+        except ValueError as e:
+            messagebox.showerror("配置错误", str(e))
+            return
+        self.engine.api1_url = self.config['api1_url']
+        self.engine.api2_url = self.config['api2_url']
+        self.refresh_campaign_list()
+    
+    def selected_campaigns(self) -> List[Campaign]:
+        """当前选中的活动（按配置文件中的顺序）"""
+        return [self.config['campaigns'][index] for index in self.campaign_listbox.curselection()]
+    
     def parse_user_ids(self) -> List[str]:
         """解析用户ID列表"""
         text = self.user_id_text.get("1.0", tk.END).strip()
@@ -113,95 +1522,11 @@ class UserPackSenderApp:
         
         return user_ids
     
-    def is_already_received(self, message: str, data: str = "") -> bool:
-        """判断是否为已领取状态（不算错误）"""
-        if not message and not data:
-            return False
-        
-        message_str = str(message).lower() if message else ""
-        data_str = str(data).lower() if data else ""
-        combined = message_str + " " + data_str
-        
-        # 检查是否包含已领取相关的关键词
-        received_keywords = ["已领取", "已购买", "already received", "already purchased"]
-        return any(keyword in combined for keyword in received_keywords)
-    
-    def call_api1(self, user_id: str) -> Tuple[bool, str]:
-        """调用接口1：发送礼包"""
-        try:
-            payload = {
-                "userIds": [int(user_id)],
-                "packId": self.pack_id,
-                "packName": self.pack_name,
-                "desc": self.desc,
-                "useFlag": self.use_flag
-            }
-            
-            response = requests.post(
-                self.api1_url,
-                headers={'Content-Type': 'application/json'},
-                json=payload,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                message = result.get('message', '')
-                data = result.get('data', '')
-                
-                # 检查是否成功
-                if result.get('success') and result.get('code') == 0:
-                    return True, "成功"
-                # 检查是否为已领取状态（不算错误）
-                elif self.is_already_received(message, data):
-                    return True, "已领取"
-                else:
-                    return False, f"失败: {message or data or '未知错误'}"
-            else:
-                return False, f"HTTP错误: {response.status_code}"
-        
-        except requests.exceptions.RequestException as e:
-            return False, f"请求异常: {str(e)}"
-        except Exception as e:
-            return False, f"异常: {str(e)}"
-    
-    def call_api2(self, user_id: str) -> Tuple[bool, str]:
-        """调用接口2：发放权益"""
-        try:
-            data = {'userId': user_id}
-            
-            response = requests.post(
-                self.api2_url,
-                data=data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                message = result.get('message')
-                data_str = result.get('data', '')
-                
-                # 检查是否成功
-                if result.get('code') == 0:
-                    # 检查data中是否包含已购买信息（接口2的data可能包含"已购买: X"）
-                    if self.is_already_received(str(message) if message else "", data_str):
-                        return True, "已领取"
-                    return True, "成功"
-                # 检查是否为已领取状态（不算错误）
-                elif self.is_already_received(str(message) if message else "", data_str):
-                    return True, "已领取"
-                else:
-                    return False, f"失败: {message or data_str or '未知错误'}"
-            else:
-                return False, f"HTTP错误: {response.status_code}"
-        
-        except requests.exceptions.RequestException as e:
-            return False, f"请求异常: {str(e)}"
-        except Exception as e:
-            return False, f"异常: {str(e)}"
-    
     def execute_sending(self):
-        """执行发放流程"""
+        """执行发放流程（网络请求在后台线程中执行）"""
+        if self.running:
+            return
+        
         # 解析用户ID
         user_ids = self.parse_user_ids()
         
@@ -209,127 +1534,534 @@ class UserPackSenderApp:
             messagebox.showwarning("警告", "请输入至少一个用户ID")
             return
         
+        campaigns = self.selected_campaigns()
+        if not campaigns:
+            messagebox.showwarning("警告", "请至少选择一个发放活动")
+            return
+        
         # 重置统计
         self.success_count = 0
         self.error_count = 0
+        self.skipped_count = 0
+        self.already_granted_count = 0
+        self.deferred_count = 0
+        self.update_stats()
+        
+        # 清空结果
+        self.result_store.clear()
+        self.view_offset = 0
+        self.follow_tail = True
+        self.refresh_result_view()
         
-        # 清空结果树
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
+        # 读取运行参数
+        try:
+            workers = int(self.workers_var.get())
+            max_retries = int(self.retries_var.get())
+            rate_limits = {'api1': float(self.api1_rate_var.get()), 'api2': float(self.api2_rate_var.get())}
+        except (tk.TclError, ValueError):
+            messagebox.showwarning("警告", "并发数、限速和重试次数必须是数字")
+            return
+        if workers < 1:
+            messagebox.showwarning("警告", "并发数至少为 1")
+            return
+        self.engine.set_rate_limits(rate_limits)
+        self.engine.set_adaptive(self.adaptive_var.get(), workers)
+        self.engine.retry_policy = RetryPolicy(max_retries=max(0, max_retries))
         
-        # 禁用执行按钮
+        # 切换按钮状态
         self.execute_btn.config(state='disabled')
+        self.stop_btn.config(state='normal')
         
-        # 更新UI
-        self.root.update()
+        self.running = True
+        self.stop_event.clear()
+        self.executor.submit(
+            self._send_worker, user_ids, campaigns, self.resume_var.get(), workers,
+            self.continue_var.get(), self.force_resend_var.get()
+        )
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_results)
+    
+    def _send_worker(self, user_ids: List[str], campaigns: List[Campaign], resume: bool,
+                     workers: int, continue_on_error: bool, force_resend: bool):
+        """后台线程：运行发放引擎，结果与结束信息都放入队列"""
+        journals: Dict[int, ProgressJournal] = {}
+        ledger = None
+        writer = None
         
-        try:
-            # 串行处理每个用户ID
-            for idx, user_id in enumerate(user_ids):
-                # 调用接口1
-                api1_success, api1_msg = self.call_api1(user_id)
-                
-                # 如果接口1失败，立即终止
-                if not api1_success:
-                    self.error_count += 1
-                    item = self.result_tree.insert('', tk.END, values=(
-                        user_id,
-                        f"✗ {api1_msg}",
-                        "未执行",
-                        "✗ 失败"
-                    ), tags=('error',))
-                    
-                    # 更新统计
-                    self.update_stats()
-                    
-                    # 显示错误信息并终止
-                    error_msg = f"处理到用户ID {user_id} 时发生错误（第 {idx + 1} 个用户）\n\n"
-                    error_msg += f"接口1失败: {api1_msg}\n"
-                    error_msg += "已终止执行，未调用接口2"
-                    messagebox.showerror("执行失败", error_msg)
-                    break
-                
-                # 接口1成功，继续调用接口2
-                api2_success, api2_msg = self.call_api2(user_id)
-                
-                # 判断整体状态
-                if api2_success:
-                    overall_status = "✓ 成功"
-                    self.success_count += 1
-                    tag = 'success'
-                else:
-                    overall_status = "✗ 失败"
-                    self.error_count += 1
-                    tag = 'error'
-                    
-                    # 接口2失败，立即终止
-                    # 格式化接口1的显示消息
-                    api1_display = f"✓ {api1_msg}" if api1_success else f"✗ {api1_msg}"
-                    
-                    item = self.result_tree.insert('', tk.END, values=(
-                        user_id,
-                        api1_display,
-                        f"✗ {api2_msg}",
-                        overall_status
-                    ), tags=(tag,))
-                    
-                    # 更新统计
-                    self.update_stats()
-                    
-                    # 显示错误信息并终止
-                    error_msg = f"处理到用户ID {user_id} 时发生错误（第 {idx + 1} 个用户）\n\n"
-                    error_msg += f"接口1: {api1_msg}\n"
-                    error_msg += f"接口2失败: {api2_msg}"
-                    messagebox.showerror("执行失败", error_msg)
-                    break
-                
-                # 两个接口都成功，格式化显示消息
-                api1_display = f"✓ {api1_msg}" if api1_success else f"✗ {api1_msg}"
-                api2_display = f"✓ {api2_msg}" if api2_success else f"✗ {api2_msg}"
-                
-                item = self.result_tree.insert('', tk.END, values=(
-                    user_id,
-                    api1_display,
-                    api2_display,
-                    overall_status
-                ), tags=(tag,))
-                
-                # 更新统计
-                self.update_stats()
-                
-                # 滚动到最新结果
-                self.result_tree.see(item)
-                self.root.update()
-            
-            # 如果全部成功
-            if self.error_count == 0:
-                messagebox.showinfo("执行完成", f"所有用户处理完成！\n成功: {self.success_count} 个")
+        def emit(result: Dict):
+            # 结果在后台线程中流式写入文件，界面只负责显示
+            if not result.get('deferred'):
+                writer.write(result)
+            self.result_queue.put(('result', result))
         
+        try:
+            for campaign in campaigns:
+                journals[campaign.pack_id] = ProgressJournal.for_pack(campaign.pack_id)
+            ledger = GrantLedger.open_default()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # 单个活动沿用按礼包命名，多个活动合并到一个文件（每行带活动名和礼包ID）
+            run_name = str(campaigns[0].pack_id) if len(campaigns) == 1 else "multi"
+            results_path = os.path.join(get_data_dir(), f"results_{run_name}_{timestamp}.csv")
+            writer = ResultWriter.open(results_path)
+            self.result_queue.put(('results_path', results_path))
+            summary = self.engine.run(
+                user_ids,
+                emit,
+                self.stop_event,
+                campaigns,
+                journals=journals,
+                resume=resume,
+                workers=workers,
+                continue_on_error=continue_on_error,
+                ledger=ledger,
+                force_resend=force_resend
+            )
+            # 每个用户在每个活动下各算一次发放，与 processed/skipped 的口径一致
+            summary['total'] = len(user_ids) * len(campaigns)
+            summary['metrics_path'] = os.path.join(get_data_dir(), f"metrics_{run_name}_{timestamp}.json")
+            write_run_summary(summary, summary['metrics_path'])
+            self.result_queue.put(('done', summary))
         except Exception as e:
-            messagebox.showerror("异常", f"执行过程中发生异常: {str(e)}")
-        
+            self.result_queue.put(('exception', str(e)))
         finally:
-            # 重新启用执行按钮
-            self.execute_btn.config(state='normal')
+            for journal in journals.values():
+                journal.close()
+            if ledger is not None:
+                ledger.close()
+            if writer is not None:
+                writer.close()
+    
+    def poll_results(self):
+        """界面线程：按固定节奏批量取出结果并刷新界面"""
+        added = False
+        finished = None
+        
+        for _ in range(self.MAX_EVENTS_PER_POLL):
+            try:
+                kind, payload = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
             
-            # 配置标签颜色
-            self.result_tree.tag_configure('success', foreground='green')
-            self.result_tree.tag_configure('error', foreground='red')
+            if kind == 'result':
+                added = self.add_result(payload) or added
+            elif kind == 'results_path':
+                self.results_path_label.config(text=f"结果文件: {payload}")
+            else:
+                finished = (kind, payload)
+                break
+        
+        # 熔断状态可能在没有新结果时变化，每次都刷新统计
+        self.update_stats()
+        if added:
+            self.refresh_result_view()
+        
+        if finished is not None:
+            self.finish_sending(*finished)
+        else:
+            self.root.after(self.POLL_INTERVAL_MS, self.poll_results)
+    
+    def add_result(self, result: Dict) -> bool:
+        """记录单个用户的处理结果并更新计数；放入重试队列的结果只计数不显示"""
+        if result.get('deferred'):
+            self.deferred_count += 1
+            return False
+        if result.get('retried'):
+            self.deferred_count -= 1
+        
+        if result['ok']:
+            self.success_count += 1
+        else:
+            self.error_count += 1
+        self.result_store.add(result)
+        return True
+    
+    def format_row(self, row: Tuple) -> Tuple[Tuple, str]:
+        """把结果存储中的一行转换为 (显示值, 颜色标签)"""
+        store = ResultStore
+        api1_display = f"✓ {row[store.API1_MSG]}" if row[store.API1_OK] else f"✗ {row[store.API1_MSG]}"
+        if row[store.API2_OK] is None:
+            api2_display = row[store.API2_MSG]
+        elif row[store.API2_OK]:
+            api2_display = f"✓ {row[store.API2_MSG]}"
+        else:
+            api2_display = f"✗ {row[store.API2_MSG]}"
+        
+        if row[store.OK]:
+            overall_status, tag = "✓ 成功", 'success'
+        else:
+            category_name = ERROR_CATEGORY_NAMES.get(row[store.CATEGORY], "")
+            overall_status = f"✗ 失败（{category_name}）" if category_name else "✗ 失败"
+            tag = 'error'
+        
+        return (row[store.USER_ID], row[store.CAMPAIGN], api1_display, api2_display, overall_status), tag
+    
+    def refresh_result_view(self):
+        """只重建可见区域的行；跟随末尾时自动滚动到最新结果"""
+        filter_name = self.filter_var.get()
+        total = self.result_store.count(filter_name)
+        max_offset = max(0, total - self.visible_rows)
+        if self.follow_tail:
+            self.view_offset = max_offset
+        self.view_offset = max(0, min(self.view_offset, max_offset))
+        
+        self.result_tree.delete(*self.result_tree.get_children())
+        for row in self.result_store.get(filter_name, self.view_offset, self.view_offset + self.visible_rows):
+            values, tag = self.format_row(row)
+            self.result_tree.insert('', tk.END, values=values, tags=(tag,))
+        
+        if total:
+            self.result_scrollbar.set(self.view_offset / total,
+                                      min(1.0, (self.view_offset + self.visible_rows) / total))
+        else:
+            self.result_scrollbar.set(0.0, 1.0)
+    
+    def scroll_results_to(self, offset: int):
+        """滚动到指定偏移；滚到末尾时恢复跟随最新结果"""
+        total = self.result_store.count(self.filter_var.get())
+        max_offset = max(0, total - self.visible_rows)
+        self.view_offset = max(0, min(offset, max_offset))
+        self.follow_tail = self.view_offset >= max_offset
+        self.refresh_result_view()
+    
+    def on_result_scroll(self, action: str, *args):
+        """滚动条回调：moveto 按比例定位，scroll 按行或按页移动"""
+        if action == 'moveto':
+            total = self.result_store.count(self.filter_var.get())
+            self.scroll_results_to(int(float(args[0]) * total))
+        elif action == 'scroll':
+            step = int(args[0])
+            if args[1] == 'pages':
+                step *= self.visible_rows
+            self.scroll_results_to(self.view_offset + step)
+    
+    def on_result_wheel(self, event):
+        """鼠标滚轮（Windows/macOS 使用 delta，Linux 使用 Button-4/5）"""
+        if getattr(event, 'num', None) == 4:
+            step = -3
+        elif getattr(event, 'num', None) == 5:
+            step = 3
+        else:
+            step = -3 if event.delta > 0 else 3
+        self.scroll_results_to(self.view_offset + step)
+        return "break"
+    
+    def on_result_configure(self, event):
+        """结果区域大小变化时重新计算可见行数"""
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or 20
+        try:
+            row_height = int(row_height)
+        except (TypeError, ValueError):
+            row_height = 20
+        # 减去表头高度
+        visible_rows = max(1, (event.height - 25) // row_height)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh_result_view()
+    
+    def on_filter_change(self):
+        """切换筛选条件后从最新结果开始显示"""
+        self.follow_tail = True
+        self.refresh_result_view()
+    
+    def finish_sending(self, kind: str, payload):
+        """界面线程：一次发放结束后的收尾与提示"""
+        self.running = False
+        self.execute_btn.config(state='normal')
+        self.stop_btn.config(state='disabled')
+        self.update_stats()
+        
+        if kind == 'exception':
+            messagebox.showerror("异常", f"执行过程中发生异常: {payload}")
+            return
+        
+        self.skipped_count = payload['skipped']
+        self.already_granted_count = payload['already_granted']
+        self.update_stats()
+        self.metrics_label.config(
+            text="\n".join(self.engine.metrics_status() + [f"指标汇总已保存: {payload['metrics_path']}"])
+        )
+        
+        if payload['stopped']:
+            unit = "个用户" if len(payload['campaigns']) == 1 else "个发放（用户×活动）"
+            stop_msg = (
+                f"已手动停止执行\n已处理: {payload['processed']} / {payload['total']} {unit}\n"
+                f"成功: {self.success_count} | 错误: {self.error_count}"
+            )
+            if self.deferred_count:
+                stop_msg += f"\n待重试（未完成）: {self.deferred_count} 个"
+            messagebox.showinfo("已停止", stop_msg)
+        elif payload['failed_index'] is not None:
+            result = payload['failed_result']
+            error_msg = f"处理到用户ID {result['user_id']}（活动 {result['campaign']}）时发生错误（第 {payload['failed_index'] + 1} 个用户）\n\n"
+            if result['api2_ok'] is None:
+                error_msg += f"接口1失败: {result['api1_msg']}\n"
+                error_msg += "已终止执行，未调用接口2"
+            else:
+                error_msg += f"接口1: {result['api1_msg']}\n"
+                error_msg += f"接口2失败: {result['api2_msg']}"
+            messagebox.showerror("执行失败", error_msg)
+        elif payload['failed']:
+            # 失败后继续模式：汇总失败类型
+            warn_msg = (
+                f"处理完成，但有 {payload['failed']} 个用户失败（已在最后统一重试）\n"
+                f"成功: {self.success_count} 个\n\n失败类型:\n"
+            )
+            warn_msg += "\n".join(
+                f"  {ERROR_CATEGORY_NAMES.get(category, category)}: {count}"
+                for category, count in sorted(payload['categories'].items(), key=lambda x: -x[1])
+            )
+            messagebox.showwarning("执行完成（有失败）", warn_msg)
+        elif self.error_count == 0:
+            done_msg = f"所有用户处理完成！\n成功: {self.success_count} 个"
+            if self.skipped_count:
+                done_msg += f"\n跳过（之前已完成）: {self.skipped_count} 个"
+            if self.already_granted_count:
+                done_msg += f"\n跳过（台账中已发放）: {self.already_granted_count} 个"
+            if len(payload['campaigns']) > 1:
+                done_msg += "\n\n各活动:\n" + "\n".join(self.format_campaign_counts(payload['campaigns']))
+            messagebox.showinfo("执行完成", done_msg)
+    
+    @staticmethod
+    def format_campaign_counts(campaign_counts: Dict[str, Dict]) -> List[str]:
+        """按活动输出成功/失败/跳过计数"""
+        lines = []
+        for name, counts in campaign_counts.items():
+            line = f"  {name}: 成功 {counts['ok']} | 失败 {counts['failed']}"
+            skipped = counts['skipped'] + counts['already_granted']
+            if skipped:
+                line += f" | 跳过 {skipped}"
+            lines.append(line)
+        return lines
+    
+    def stop_sending(self):
+        """请求停止：当前用户处理完后终止"""
+        if self.running:
+            self.stop_event.set()
+            self.stop_btn.config(state='disabled')
     
     def update_stats(self):
         """更新统计信息"""
-        self.stats_label.config(text=f"成功: {self.success_count} | 错误: {self.error_count}")
+        text = f"成功: {self.success_count} | 错误: {self.error_count}"
+        if self.skipped_count:
+            text += f" | 跳过: {self.skipped_count}"
+        if self.already_granted_count:
+            text += f" | 已发放过: {self.already_granted_count}"
+        if self.deferred_count:
+            text += f" | 待重试: {self.deferred_count}"
+        if self.running:
+            for status in (self.engine.concurrency_status(), self.engine.endpoint_status()):
+                if status:
+                    text += f" | {status}"
+            self.metrics_label.config(text="\n".join(self.engine.metrics_status()))
+        self.stats_label.config(text=text)
     
     def clear_results(self):
         """清空结果"""
-        for item in self.result_tree.get_children():
-            self.result_tree.delete(item)
+        if self.running:
+            return
+        self.result_store.clear()
+        self.follow_tail = True
+        self.refresh_result_view()
+        self.results_path_label.config(text="")
         self.success_count = 0
         self.error_count = 0
+        self.skipped_count = 0
+        self.already_granted_count = 0
+        self.deferred_count = 0
         self.update_stats()
+    
+    def clear_journal(self):
+        """清空所选活动的进度记录，下次执行从头发放"""
+        if self.running:
+            return
+        campaigns = self.selected_campaigns()
+        if not campaigns:
+            messagebox.showwarning("警告", "请先选择要清空进度记录的活动")
+            return
+        pack_ids = "、".join(str(campaign.pack_id) for campaign in campaigns)
+        if not messagebox.askyesno("确认", f"确定清空礼包 {pack_ids} 的进度记录吗？\n清空后已完成的用户会被重新发放。"):
+            return
+        for campaign in campaigns:
+            journal = ProgressJournal.for_pack(campaign.pack_id)
+            journal.clear()
+            journal.close()
+        messagebox.showinfo("完成", "进度记录已清空")
+    
+    def on_close(self):
+        """关闭窗口：通知后台线程停止，不等待当前请求返回"""
+        self.stop_event.set()
+        self.executor.shutdown(wait=False)
+        self.root.destroy()
+
+
+def iter_user_ids(stream: IO[str], invalid: List[str]) -> Iterator[str]:
+    """
+    从文件流逐行读取用户ID：去除空行、校验为整数并去重
+    
+    无效的行追加到 invalid，不会进入发放流程；已出现过的ID直接跳过。
+    去重集合保存整数而不是字符串，以减少内存占用。
+    """
+    seen = set()
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            user_id = int(line)
+        except ValueError:
+            invalid.append(line)
+            continue
+        if user_id in seen:
+            continue
+        seen.add(user_id)
+        yield str(user_id)
+
+
+def run_cli(args) -> int:
+    """无界面模式：从文件或标准输入读取用户ID，结果写入 JSONL/CSV"""
+    try:
+        config = load_campaign_config(args.config)
+    except ValueError as e:
+        print(f"配置错误: {e}", file=sys.stderr)
+        return 2
+    if args.all_campaigns:
+        campaigns = config['campaigns']
+    elif args.campaign:
+        by_name = {campaign.name: campaign for campaign in config['campaigns']}
+        unknown = [name for name in args.campaign if name not in by_name]
+        if unknown:
+            print(f"配置中没有这些活动: {', '.join(unknown)}（可选: {', '.join(by_name)}）", file=sys.stderr)
+            return 2
+        campaigns = [by_name[name] for name in dict.fromkeys(args.campaign)]
+    else:
+        campaigns = config['campaigns'][:1]
+    try:
+        input_stream = sys.stdin if args.input == "-" else open(args.input, 'r', encoding='utf-8')
+    except OSError as e:
+        print(f"无法读取用户ID文件: {e}", file=sys.stderr)
+        return 2
+    
+    engine = PackSenderEngine(
+        config['api1_url'], config['api2_url'],
+        rate_limits={'api1': args.rate1, 'api2': args.rate2}
+    )
+    engine.set_adaptive(args.adaptive, args.workers)
+    engine.retry_policy = RetryPolicy(max_retries=args.retries)
+    
+    stop_event = threading.Event()
+    
+    def handle_sigint(signum, frame):
+        # 第一次 Ctrl+C 处理完在途用户后停止，第二次直接退出
+        print("\n收到中断信号，等待在途用户处理完成后停止（再次按 Ctrl+C 强制退出）", file=sys.stderr)
+        stop_event.set()
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+    
+    signal.signal(signal.SIGINT, handle_sigint)
+    
+    if args.output == "-":
+        writer = ResultWriter(sys.stdout, args.format or "jsonl")
+    else:
+        writer = ResultWriter.open(args.output, args.format)
+    journals = {} if args.no_journal else {
+        campaign.pack_id: ProgressJournal.for_pack(campaign.pack_id) for campaign in campaigns
+    }
+    ledger = None if args.no_ledger else GrantLedger.open_default()
+    
+    invalid: List[str] = []
+    counts = {'ok': 0, 'failed': 0}
+    started = time.monotonic()
+    last_progress = [started]
+    
+    def print_progress():
+        elapsed = max(time.monotonic() - started, 1e-6)
+        done = counts['ok'] + counts['failed']
+        print(
+            f"[{datetime.now().strftime('%H:%M:%S')}] 已处理: {done} | 成功: {counts['ok']} | "
+            f"失败: {counts['failed']} | 无效ID: {len(invalid)} | {done / elapsed:.1f} 个/秒",
+            file=sys.stderr
+        )
+        for line in engine.metrics_status():
+            print(f"    {line}", file=sys.stderr)
+    
+    def emit(result: Dict):
+        # 放入重试队列的失败结果等最终重试后再写出
+        if result.get('deferred'):
+            return
+        writer.write(result)
+        counts['ok' if result['ok'] else 'failed'] += 1
+        now = time.monotonic()
+        if now - last_progress[0] >= args.progress_interval:
+            last_progress[0] = now
+            print_progress()
+    
+    try:
+        summary = engine.run(
+            iter_user_ids(input_stream, invalid), emit, stop_event, campaigns,
+            journals=journals, resume=not args.no_resume,
+            workers=args.workers, continue_on_error=args.continue_on_error,
+            ledger=ledger, force_resend=args.force_resend
+        )
+    finally:
+        for journal in journals.values():
+            journal.close()
+        if ledger is not None:
+            ledger.close()
+        writer.close()
+        if input_stream is not sys.stdin:
+            input_stream.close()
+    
+    print_progress()
+    print(f"跳过（之前已完成）: {summary['skipped']} 个", file=sys.stderr)
+    print(f"跳过（台账中已发放）: {summary['already_granted']} 个", file=sys.stderr)
+    if len(campaigns) > 1:
+        for line in UserPackSenderApp.format_campaign_counts(summary['campaigns']):
+            print(line, file=sys.stderr)
+    if args.metrics_output:
+        write_run_summary(summary, args.metrics_output)
+        print(f"指标汇总已保存: {args.metrics_output}", file=sys.stderr)
+    for line in invalid[:20]:
+        print(f"无效ID: {line}", file=sys.stderr)
+    if len(invalid) > 20:
+        print(f"... 另有 {len(invalid) - 20} 个无效ID", file=sys.stderr)
+    
+    if summary['stopped']:
+        print("已手动停止", file=sys.stderr)
+        return 130
+    if summary['failed_index'] is not None:
+        result = summary['failed_result']
+        print(f"用户ID {result['user_id']}（活动 {result['campaign']}）处理失败，已终止执行: "
+              f"接口1: {result['api1_msg']} | 接口2: {result['api2_msg']}", file=sys.stderr)
+    return 1 if summary['failed'] or invalid else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="用户礼包发放工具（不带 --cli 时启动图形界面）")
+    parser.add_argument("--cli", action="store_true", help="无界面模式")
+    parser.add_argument("--input", default="-", help="用户ID文件，每行一个；- 表示标准输入（默认）")
+    parser.add_argument("--output", default="-", help="结果文件（.jsonl 或 .csv）；- 表示标准输出（默认）")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="结果格式，默认按输出文件扩展名判断")
+    parser.add_argument("--config", help="活动配置文件（JSON），默认使用数据目录下的 campaigns.json")
+    parser.add_argument("--campaign", action="append", help="要发放的活动名称，可重复指定；默认为配置中的第一个活动")
+    parser.add_argument("--all-campaigns", action="store_true", help="发放配置中的全部活动")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="并发数（自适应模式下为上限）")
+    parser.add_argument("--rate1", type=float, default=DEFAULT_RATE_LIMIT, help="接口1限速（次/秒，0 表示不限）")
+    parser.add_argument("--rate2", type=float, default=DEFAULT_RATE_LIMIT, help="接口2限速（次/秒，0 表示不限）")
+    parser.add_argument("--adaptive", action="store_true", help="自适应并发")
+    parser.add_argument("--retries", type=int, default=RetryPolicy().max_retries, help="临时性错误的重试次数")
+    parser.add_argument("--continue-on-error", action="store_true", help="失败后继续，失败用户最后统一重试")
+    parser.add_argument("--no-resume", action="store_true", help="不跳过进度记录中已完成的用户")
+    parser.add_argument("--no-journal", action="store_true", help="不读写进度记录")
+    parser.add_argument("--no-ledger", action="store_true", help="不读写已发放台账")
+    parser.add_argument("--force-resend", action="store_true", help="台账中已发放的用户也重新发送")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="进度输出间隔（秒）")
+    parser.add_argument("--metrics-output", help="运行结束后把汇总与各接口指标写入该 JSON 文件")
+    return parser.parse_args(argv)
 
 
 def main():
+    args = parse_args()
+    if args.cli:
+        sys.exit(run_cli(args))
+    
     root = tk.Tk()
     app = UserPackSenderApp(root)
     root.mainloop()
@@ -337,4 +2069,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-